@@ -3,6 +3,8 @@ import customtkinter as ctk
 from customtkinter import CTkImage
 import threading, serial, json, os, time
 from PIL import Image
+from overlay import ResultOverlay
+from session_restore import session_marker
 
 # ------------------ Setup ------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -25,6 +27,7 @@ ctk.set_default_color_theme("green")
 
 root = ctk.CTk()
 root.title("Mr. Pillai - Andar Bahar (Modern)")
+result_overlay = ResultOverlay(root, size=(380, 100), font=("Arial Black", 20), duration=1600)  # built once
 try:
     root.state("zoomed")
 except Exception:
@@ -35,7 +38,6 @@ root.configure(fg_color="#071a13")
 joker_card = None
 side_toggle = True  # True -> ANDAR, False -> BAHAR
 game_over = False
-winner_popup = None
 
 BEAD_ROWS = 6
 bead_columns = []
@@ -62,6 +64,9 @@ def save_history_compact(symbol):
         pass
 
 
+save_history_compact(session_marker())  # this run starts with empty counters: a new session (session_restore.py)
+
+
 # ------------------ Layout ------------------
 header = ctk.CTkFrame(root, fg_color="#06241d", corner_radius=10)
 header.pack(fill="x", padx=16, pady=(12, 8))
@@ -202,24 +207,7 @@ def evaluate_for_match(card_name, side):
 
 
 def show_popup(text):
-    global winner_popup
-    if winner_popup and winner_popup.winfo_exists():
-        try:
-            winner_popup.destroy()
-        except:
-            pass
-    winner_popup = ctk.CTkToplevel(root)
-    winner_popup.overrideredirect(True)
-    winner_popup.geometry('380x100')
-    winner_popup.configure(fg_color='#00271f')
-    lbl = ctk.CTkLabel(winner_popup, text=text, text_color='#ffd36e',
-                       font=('Arial Black', 20))
-    lbl.pack(expand=True)
-    x = root.winfo_screenwidth() // 2 - 190
-    y = root.winfo_screenheight() // 2 - 60
-    winner_popup.geometry(f'380x100+{x}+{y}')
-    root.after(1600, lambda: (winner_popup.destroy()
-                              if winner_popup and winner_popup.winfo_exists() else None))
+    result_overlay.show(text)
 
 
 def reset_game():
@@ -263,8 +251,6 @@ def serial_reader():
                 chunk = buffer[:4].strip()
                 buffer = buffer[4:]
 
-                print("[DEBUG] Chunk:", repr(chunk))
-
                 if chunk in card_map:
                     card_name = card_map[chunk]
                     root.after(0, status_label.configure, {"text": f"Card detected: {card_name}"})
@@ -3,7 +3,7 @@
 Modern single-page CustomTkinter UI for Mr. Pillai - Andar Bahar
 - Non-blocking serial reader (works if shoe doesn't send newline)
 - Scrollable single-page layout (title, joker, andar/bahar, controls, history)
-- Image caching + safe loading (PIL -> CTkImage)
+- Card images preloaded once at both sizes in the background (card_atlas.py)
 - Simple "pop" animation for win popup
 - Keyboard shortcuts: '/' reset, '1' manual ANDAR, '2' manual BAHAR
 """
@@ -12,10 +12,20 @@ import os
 import time
 import json
 import threading
-import serial
 import customtkinter as ctk
-from customtkinter import CTkImage
-from PIL import Image, ImageTk
+from serial_ingest import open_serial, iter_chunks, LatencyMeter, READ_TIMEOUT
+from shoe_tokenizer import ShoeTokenizer
+from history_writer import HistoryWriter
+from round_store import RoundStore, DB_NAME
+from session_restore import session_marker, session_label, session_symbols, bead_columns_from
+from round_journal import RoundJournal
+from cards import card_ids_from_map, NAMES
+from andar_bahar_engine import AndarBaharEngine
+from bead_plate import BeadPlate, AB_STYLES
+from card_atlas import CardAtlas, AB_SIZES, PENDING
+from backgrounds import load_background_async
+from overlay import ResultOverlay
+from scene import Scene
 
 # ------------------ Configuration ------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -29,280 +39,237 @@ try:
 except Exception as e:
     print("Failed to load card_map.json:", e)
     card_map = {}
+card_ids = card_ids_from_map(card_map)  # shoe code -> card id (see cards.py)
+tokenizer = ShoeTokenizer(card_map)
 
-# Try opening serial port (non-blocking)
+# Open serial port (blocking reads with a short timeout; see serial_ingest)
 SERIAL_PORT = "COM3"
 BAUDRATE = 9600
-try:
-    ser = serial.Serial(SERIAL_PORT, BAUDRATE, timeout=0)  # non-blocking read
-    print(f"✅ Connected to serial port {SERIAL_PORT}")
-except Exception as e:
-    print("⚠️ Serial not connected:", e)
-    ser = None
+ser = open_serial(SERIAL_PORT, BAUDRATE, READ_TIMEOUT)
+latency = LatencyMeter()
+HISTORY_FILE = os.path.join(BASE_DIR, "andar_history.txt")
+history = HistoryWriter(HISTORY_FILE)  # background appender; closed in on_close
+TABLE_ID = "AB-1"
+session_id = time.strftime("%Y%m%d-%H%M%S")  # shoe id of the rounds in the round store; new id on every New Session
+store = RoundStore(os.path.join(BASE_DIR, DB_NAME))  # SQLite round store; closed in on_close
+journal = RoundJournal(os.path.join(BASE_DIR, "andar_round.journal"))  # round in progress, for crash recovery
 
 # ------------------ State ------------------
-joker_card = None
-side_toggle = True       # True -> ANDAR, False -> BAHAR
-game_over = False
-winner_popup = None
+engine = AndarBaharEngine()  # joker, side toggle, result, win tallies; Tk thread only
+round_cards = []  # (card id, JOKER/ANDAR/BAHAR, time) of the current round, for the round store
 BEAD_ROWS = 6
 bead_columns = []
-game_counter = 0
-_image_cache = {}
 stop_event = threading.Event()
-andar_count = 0
-bahar_count = 0
 
 # ------------------ Helpers ------------------
-def card_rank(card_name: str):
-    """Normalize card rank (used for matching)."""
-    if not card_name:
-        return ""
-    name = os.path.splitext(os.path.basename(card_name))[0].lower()
-    if "_" in name:
-        return name.split("_")[-1]
-    else:
-        return ''.join(ch for ch in name if ch.isalnum()).rstrip("shcd")
-
-
 def save_history_compact(symbol):
-    try:
-        with open(os.path.join(BASE_DIR, "andar_history.txt"), "a", encoding="utf-8") as f:
-            f.write(symbol + "\n")
-    except Exception:
-        pass
+    """Queue one A/B symbol for andar_history.txt (written by the history thread)."""
+    history.write(symbol)
 
 # (keep this near your root initialization)
 ctk.set_appearance_mode("dark")
 root = ctk.CTk()
 root.geometry("1200x700")
 root.title("Mr. Pillai — Andar Bahar")
+result_overlay = ResultOverlay(root)  # built once; show_popup() only reconfigures it
 
-# --- Load the background image ---
-# --- Transparent main content container ---
-main_frame = ctk.CTkFrame(root, fg_color="transparent")
-main_frame.place(relx=0.5, rely=0.5, anchor="center", relwidth=1, relheight=1)
-
+# --- One canvas for the whole table (scene.py) ---
+# titles, counters, status and card slots are canvas items drawn over the
+# background, not CTkLabels; updates are itemconfigure calls
+main_canvas = ctk.CTkCanvas(root, width=1200, height=700, highlightthickness=0, bg="#000000")
+main_canvas.pack(fill="both", expand=True)
+scene = Scene(main_canvas, scaling=ctk.ScalingTracker.get_widget_scaling(root), family=ctk.CTkFont().cget("family"))
 
-
-bg_img = ctk.CTkImage(Image.open("a.jpg"), size=(1080, 1920))
-bg_label = ctk.CTkLabel(main_frame, image=bg_img, text="")
-bg_label.place(relx=0.5, rely=0.5, anchor="center")
-bg_label.lift()  # push behind all other widgets in main_frame
+# the window shows at once; the pre-scaled a.jpg is swapped in when loaded
+load_background_async(root, "a.jpg", (1080, 1920), scene.set_background)
 
 
 
 # ------------------ TITLE ------------------
-title = ctk.CTkLabel(
-    main_frame,
-    text="ANDAR (PILLAI) BAHAR ",
-    font=ctk.CTkFont(size=95, weight="bold"),
-    text_color="#E2DDFF"
-)
-title.pack(pady=(20, 15))
+title = scene.text(0.5, 0, "ANDAR (PILLAI) BAHAR ", size=95, weight="bold", fill="#E2DDFF", anchor="n", dy=20)
 
 
-status_label = ctk.CTkLabel(root,
-                            text="Waiting...",
-                            font=ctk.CTkFont(size=14),
-                            text_color="#D6F2FF")
-status_label.place(relx=0.5, rely=0.14, anchor="center")
+status_label = scene.text(0.5, 0.14, "Waiting...", size=14, fill="#D6F2FF")
 
 # Counter display labels
-andar_counter_label = ctk.CTkLabel(root,
-text="Andar Wins: 0",
-                                   font=ctk.CTkFont(size=16, weight="bold"),
-                                   text_color="#8ef0c6")
-andar_counter_label.place(relx=0.25, rely=0.08, anchor="center")
+andar_counter_label = scene.text(0.25, 0.08, "Andar Wins: 0", size=16, weight="bold", fill="#8ef0c6")
+bahar_counter_label = scene.text(0.75, 0.08, "Bahar Wins: 0", size=16, weight="bold", fill="#ff9c9c")
 
-bahar_counter_label = ctk.CTkLabel(root, text="Bahar Wins: 0",
-                                   font=ctk.CTkFont(size=16, weight="bold"),
-                                   text_color="#ff9c9c")
-bahar_counter_label.place(relx=0.75, rely=0.08, anchor="center")
+# live win probability for the current round (see update_win_probability)
+andar_prob_label = scene.text(0.25, 0.115, "", size=14, fill="#8ef0c6")
+bahar_prob_label = scene.text(0.75, 0.115, "", size=14, fill="#ff9c9c")
 
 # ------------------ FLOATING CARDS AND CONTROLS ------------------
 
 # ANDAR
-andar_label = ctk.CTkLabel(root, text="ANDAR",
-                           font=ctk.CTkFont(size=40, weight="bold"),
-                           text_color="#8ef0c6")
-andar_label.place(relx=0.25, rely=0.40, anchor="center")
-
-andar_img_label = ctk.CTkLabel(root, text="", width=200, height=300,
-                               fg_color="#B8C7FF", corner_radius=10)
-andar_img_label.place(relx=0.25, rely=0.53, anchor="center")
+andar_label = scene.text(0.25, 0.40, "ANDAR", size=40, weight="bold", fill="#8ef0c6")
+andar_img_label = scene.card_slot(0.25, 0.53, box=(200, 300), box_fill="#B8C7FF")
 
 # JOKER
-joker_label = ctk.CTkLabel(root, text="JOKER",
-                           font=ctk.CTkFont(size=50, weight="bold"),
-                           text_color="#ffd36e")
-joker_label.place(relx=0.5,  rely=0.40, anchor="center")
-
-joker_img_label = ctk.CTkLabel(root, text="NEXT ROUND", width=220, height=320,
-                               fg_color="#5C7FFF", corner_radius=10)
-joker_img_label.place(relx=0.5,  rely=0.53, anchor="center")
-
-joker_text = ctk.CTkLabel(root, text="",
-                          font=ctk.CTkFont(size=14), text_color="#8fffd6")
-joker_text.place(relx=0.5, rely=0.52, anchor="center")
+joker_label = scene.text(0.5, 0.40, "JOKER", size=50, weight="bold", fill="#ffd36e")
+joker_img_label = scene.card_slot(0.5, 0.53, text="NEXT ROUND", box=(220, 320), box_fill="#5C7FFF")
+joker_text = scene.text(0.5, 0.52, "", size=14, fill="#8fffd6")
 
 # BAHAR
-bahar_label = ctk.CTkLabel(root, text="BAHAR",
-                           font=ctk.CTkFont(size=40, weight="bold"),
-                           text_color="#ff9c9c")
-bahar_label.place(relx=0.75, rely=0.40, anchor="center")
-
-bahar_img_label = ctk.CTkLabel(root, text="", width=200, height=300,
-                               fg_color="#B8C7FF", corner_radius=10)
-bahar_img_label.place(relx=0.75, rely=0.53, anchor="center")
+bahar_label = scene.text(0.75, 0.40, "BAHAR", size=40, weight="bold", fill="#ff9c9c")
+bahar_img_label = scene.card_slot(0.75, 0.53, box=(200, 300), box_fill="#B8C7FF")
 
 # Buttons a bit higher
-ctk.CTkButton(root, text="New Round (/)", width=180,
-              command=lambda: reset_game()).place(relx=0.36, rely=.9, anchor="center")
-ctk.CTkButton(root, text="Manual Andar (1)", width=160,
-              command=lambda: manual_result("ANDAR")).place(relx=0.5, rely=.9, anchor="center")
-ctk.CTkButton(root, text="Manual Bahar (2)", width=160,
-              command=lambda: manual_result("BAHAR")).place(relx=0.64, rely=.9, anchor="center")
+scene.window(0.36, .9, ctk.CTkButton(root, text="New Round (/)", width=180, command=lambda: reset_game()))
+scene.window(0.5, .9, ctk.CTkButton(root, text="Manual Andar (1)", width=160,
+                                    command=lambda: manual_result("ANDAR")))
+scene.window(0.64, .9, ctk.CTkButton(root, text="Manual Bahar (2)", width=160,
+                                     command=lambda: manual_result("BAHAR")))
+scene.window(0.5, .96, ctk.CTkButton(root, text="New Session (Ctrl+N)", width=180, command=lambda: new_session()))
 
 #history
+BEAD_WIDTH = 867  # visible width of the bead plate; its column slots must fit in it
 bead_canvas = ctk.CTkCanvas(root, height=160, bg="#1F51FF", highlightthickness=0)
-bead_canvas.place(relx=0.5, rely=0.75, anchor="center", width=867)
+scene.window(0.5, 0.75, bead_canvas, width=BEAD_WIDTH)
+bead = BeadPlate(bead_canvas, bead_columns, BEAD_ROWS, AB_STYLES,
+                 max_width=BEAD_WIDTH)  # incremental; redraw() only on restore / new session
 
 # ------------------ Image loading / caching ------------------
-def load_ctk_image(card_name, target_w=180, target_h=260):
-    """Load a PNG from cards/ into a CTkImage (cached)."""
-    if not card_name:
-        return None
-    key = f"{card_name}_{target_w}x{target_h}"
-    if key in _image_cache:
-        return _image_cache[key]
-    img_path = os.path.join(CARDS_DIR, f"{card_name}.png")
-    if not os.path.exists(img_path):
-        _image_cache[key] = None
-        return None
-    try:
-        pil_img = Image.open(img_path).convert("RGBA")
-        ratio = pil_img.width / pil_img.height
-        if ratio > (target_w / target_h):
-            new_w = target_w
-            new_h = int(target_w / ratio)
-        else:
-            new_h = target_h
-            new_w = int(target_h * ratio)
-        pil_img = pil_img.resize((new_w, new_h), Image.LANCZOS)
-        ctk_img = CTkImage(light_image=pil_img, dark_image=pil_img, size=(new_w, new_h))
-        _image_cache[key] = ctk_img
-        return ctk_img
-    except Exception as e:
-        print("Image load error:", e)
-        _image_cache[key] = None
-        return None
-
-def set_card_widget(widget, card_name):
-    """Safely set a CTkLabel widget to show a card image or text fallback."""
-    img = load_ctk_image(card_name)
+# PIL images: the scene makes the PhotoImage on the Tk thread, at CTk's scaling
+card_atlas = CardAtlas(CARDS_DIR, AB_SIZES, scale=scene.scaling)  # every card at both sizes, decoded once
+card_atlas.preload(card_map.values())
+
+def show_card(slot, card_name, img):
+    """Put a card image (or its name, when there is none) on a card slot still meant for that card."""
+    if slot.card_name != card_name:
+        return  # the slot has moved on to another card since
     if img:
-        widget.configure(image=img, text="")
-        widget.image = img
+        slot.configure(image=img, text="")
     else:
-        widget.configure(image=None, text=card_name or "(no image)")
+        slot.configure(image=None, text=card_name or "(no image)")
+
+def set_card_widget(slot, card_name, target_w=180, target_h=260):
+    """Set a card slot to show a card image or text fallback.
+
+    Never decodes on the Tk thread: a card the cache does not hold shows its
+    name until the atlas worker has decoded it, then the image is swapped in.
+    """
+    slot.card_name = card_name
+    img = card_atlas.peek(card_name, target_w, target_h,
+                          lambda img: root.after(0, show_card, slot, card_name, img))
+    show_card(slot, card_name, None if img is PENDING else img)
 
 # ------------------ Bead drawing ------------------
 def draw_bead_plate():
-    try:
-        bead_canvas.delete("all")
-    except Exception:
-        pass
-    cols = max(1, len(bead_columns))
-    cell_w = 34
-    cell_h = 34
-    pad_x = 8
-    pad_y = 12
-    width = cols * (cell_w + 8) + pad_x * 2
-    height = BEAD_ROWS * (cell_h + 6) + pad_y * 2
-    try:
-        bead_canvas.configure(width=min(width, 1200), height=height)
-    except Exception:
-        pass
-    for ci, col in enumerate(bead_columns):
-        for ri in range(BEAD_ROWS):
-            x = pad_x + ci * (cell_w + 8)
-            y = pad_y + ri * (cell_h + 6)
-            bead_canvas.create_rectangle(x, y, x + cell_w, y + cell_h, fill="#02221b", outline="#00160f")
-            if ri < len(col):
-                val = col[ri]
-                if val == "A":
-                    fill = "#2bd6a6"; txt = "A"; txt_color = "#002218"
-                else:
-                    fill = "#ff6b6b"; txt = "B"; txt_color = "#3a0000"
-                cx = x + cell_w // 2
-                cy = y + cell_h // 2
-                r = min(cell_w, cell_h) // 2 - 4
-                bead_canvas.create_oval(cx-r, cy-r, cx+r, cy+r, fill=fill, outline="#001614")
-                bead_canvas.create_text(cx, cy, text=txt, fill=txt_color, font=("Consolas", 20, "bold"))
+    """Full redraw of the bead plate (startup, restore); new results go through append_bead()."""
+    bead.redraw()
 
 def append_bead(symbol):
-    if not bead_columns:
-        bead_columns.append([])
-    last = bead_columns[-1]
-    if len(last) < BEAD_ROWS:
-        last.append(symbol)
-    else:
-        bead_columns.append([symbol])
-    draw_bead_plate()
+    bead.append(symbol)  # draws only the new bead
     save_history_compact(symbol)
 
 # ------------------ Game logic ------------------
-def manual_result(side):
-    global game_over, game_counter, andar_count, bahar_count
-    if game_over:
+def update_win_probability():
+    """Live P(ANDAR wins) / P(BAHAR wins) from the engine, shown under the win counters."""
+    probs = engine.win_probability()
+    if probs is None:
+        andar_prob_label.configure(text="")
+        bahar_prob_label.configure(text="")
+        return
+    andar_prob_label.configure(text=f"P(win) {probs[0] * 100:.1f}%")
+    bahar_prob_label.configure(text=f"P(win) {probs[1] * 100:.1f}%")
+
+
+def on_card(card_id, card_name):
+    """Tk thread: feed one shoe card to the engine and show it."""
+    if engine.joker is None:
+        engine.set_joker(card_id)
+        journal.joker(card_id)
+        round_cards.append((card_id, "JOKER", time.time()))
+        joker_text.configure(text=f"Joker: {card_name}")
+        set_card_widget(joker_img_label, card_name, 200, 280)
+        log(f"Joker set → {card_name}")
+        update_win_probability()
         return
-    game_over = True
+    was_over = engine.game_over
+    side = engine.deal(card_id)
+    journal.card(card_id)
+    round_cards.append((card_id, side, time.time()))
+    set_card_widget(andar_img_label if side == "ANDAR" else bahar_img_label, card_name)
+    update_win_probability()
+    log(f"Card dealt → {card_name} ({side})")
+    if not was_over and engine.game_over:
+        record_round(side)
+        show_result(side)
 
-    # update win counters
-    if side == "ANDAR":
-        andar_count += 1
-        andar_counter_label.configure(text=f"Andar Wins: {andar_count}")
-        append_bead("A")
-    else:
-        bahar_count += 1
-        bahar_counter_label.configure(text=f"Bahar Wins: {bahar_count}")
-        append_bead("B")
 
-    # update total game counter
-    game_counter += 1
-    game_label.configure(text=f"Game: {game_counter}")
+def manual_result(side):
+    if engine.declare(side):
+        record_round(side, manual=True)
+        show_result(side)
+
 
+def record_round(side, manual=False):
+    """Queue the round the engine just decided for the round store."""
+    store.add_round("AB", TABLE_ID, side, round_cards, joker=engine.joker, shoe_id=session_id,
+                    round_no=engine.rounds, started=round_cards[0][2] if round_cards else None,
+                    manual=manual)
+
+
+def show_result(side):
+    """Reflect the round the engine just decided in counters, bead plate and popup."""
+    update_win_probability()
+    update_counters()
+    append_bead("A" if side == "ANDAR" else "B")
+    journal.result(side)
     show_popup(f"{side} WINS!")
 
 
+def update_counters():
+    andar_counter_label.configure(text=f"Andar Wins: {engine.andar_count}")
+    bahar_counter_label.configure(text=f"Bahar Wins: {engine.bahar_count}")
+
+
+def restore_session():
+    """Rebuild bead plate and win counters from this session's tail of andar_history.txt (no redraw)."""
+    global session_id
+    t0 = time.perf_counter()
+    label = session_label(HISTORY_FILE)
+    if label:
+        session_id = label  # keep storing rounds under the restored session
+    else:
+        history.write(session_marker(session_id))  # no session yet: open one, so the next start finds its label
+    symbols = session_symbols(HISTORY_FILE, "AB")
+    bead_columns[:] = bead_columns_from(symbols, BEAD_ROWS)
+    engine.restore(symbols.count("A"), symbols.count("B"))
+    update_counters()
+    log(f"Session restored: {len(symbols)} rounds in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+
+def recover_round():
+    """Replay a round the journal says was still in progress when the app last stopped."""
+    rec = journal.recover()
+    journal.begin()
+    if rec is None:
+        return
+    joker, cards = rec
+    names = {cid: card_map[code] for code, cid in card_ids.items()}
+    for cid in ([joker] if joker is not None else []) + cards:
+        on_card(cid, names.get(cid, NAMES[cid]))
+    log(f"Recovered round in progress: joker + {len(cards)} card(s)")
+
+
+def new_session(event=None):
+    """New Session button / Ctrl+N: mark a new session in the history file and clear bead plate and counters."""
+    global session_id
+    session_id = time.strftime("%Y%m%d-%H%M%S")
+    history.write(session_marker(session_id))
+    bead_columns.clear()
+    engine.restore(0, 0)
+    update_counters()
+    reset_game()
+    draw_bead_plate()
+
+
+
 
 def show_popup(text):
-    global winner_popup
-    # small animated popup
-    try:
-        if winner_popup and winner_popup.winfo_exists():
-            winner_popup.destroy()
-    except Exception:
-        pass
-    winner_popup = ctk.CTkToplevel(root)
-    winner_popup.overrideredirect(True)
-    winner_popup.configure(fg_color="#00271f", corner_radius=12)
-    lbl = ctk.CTkLabel(winner_popup, text=text, font=ctk.CTkFont(size=22, weight="bold"), text_color="#ffd36e")
-    lbl.pack(ipadx=20, ipady=16)
-    # center
-    x = root.winfo_screenwidth() // 2 - 150
-    y = root.winfo_screenheight() // 2 - 60
-    winner_popup.geometry(f"300x100+{x}+{y}")
-
-    # simple pop scale animation: expand then shrink
-    def close():
-        try:
-            if winner_popup and winner_popup.winfo_exists():
-                winner_popup.destroy()
-        except Exception:
-            pass
-    root.after(1400, close)
+    result_overlay.show(text)
 
 def log(msg: object) -> None:
     ts = time.strftime("%Y-%m-%d %H:%M:%S")
@@ -312,119 +279,65 @@ def log(msg: object) -> None:
     print(line.strip())
 
 def reset_game(event=None):
-    global joker_card, side_toggle, game_over, winner_popup
-    if winner_popup and winner_popup.winfo_exists():
-        try:
-            winner_popup.destroy()
-        except Exception:
-            pass
-    joker_card = None
-    side_toggle = True
-    game_over = False
+    result_overlay.hide()
+    engine.reset()
+    journal.begin()
+    round_cards.clear()
+    update_win_probability()
     joker_text.configure(text="")
     joker_img_label.configure(text="", image=None)
     andar_img_label.configure(text="", image=None)
     bahar_img_label.configure(text="", image=None)
+    for slot in (joker_img_label, andar_img_label, bahar_img_label):
+        slot.card_name = None  # an image still decoding is not shown
 #    status_label.configure(text="New round — waiting for Joker")
     #log("Game reset (history preserved).")
 
-def manual_result(side):
-    global game_over
-    if game_over:
-        return
-    game_over = True
-    show_popup(f"{side} WINS!")
-    append_bead("A" if side == "ANDAR" else "B")
 #    #log(f"Manual result → {side}")
 
 root.bind("/", lambda e: reset_game())
 root.bind("1", lambda e: manual_result("ANDAR"))
 root.bind("2", lambda e: manual_result("BAHAR"))
+root.bind("<Control-n>", new_session)
 
 # ------------------ Serial reader (robust) ------------------
 def serial_reader():
-    global joker_card, side_toggle, game_over
-    buffer = ""
-    while not stop_event.is_set():
-        if not ser:
-            time.sleep(1)
-            continue
+    # iter_chunks blocks in the driver until bytes arrive and drains them in one read;
+    # the tokenizer finds card_map codes in one pass, framed by \r/\n or not
+    for data, t_arrival in iter_chunks(ser, stop_event):
         try:
-            # read any available bytes; non-blocking
-            n = ser.in_waiting or 1
-            data = ser.read(n).decode(errors="ignore")
-            if not data:
-                time.sleep(0.02)
-                continue
-            buffer += data
-            # Many shoe devices send 2-4 char tokens. We'll try to extract tokens from buffer.
-            # Strategy: split by common separators if present, otherwise take 2-4 char chunks.
-            # First handle if shoe sends separators like \r or \n:
-            while '\n' in buffer or '\r' in buffer:
-                # split on first newline-ish
-                idx_n = min([i for i in (buffer.find('\n'), buffer.find('\r')) if i != -1])
-                token = buffer[:idx_n].strip()
-                buffer = buffer[idx_n+1:]
-                if token:
-                    process_token(token)
-            # If no separators, try to take 2..4 char chunks while buffer length allows
-            while len(buffer) >= 2:
-                # many tokens are 2 (e.g. AH) or 3 (10S). We'll attempt 2..4 try-match approach.
-                taken = False
-                for L in (2, 3, 4):
-                    if len(buffer) >= L:
-                        candidate = buffer[:L].strip()
-                        if candidate in card_map:
-                            process_token(candidate)
-                            buffer = buffer[L:]
-                            taken = True
-                            break
-                if not taken:
-                    # no match with fixed-length prefixes; if buffer is long, drop first char to resync
-                    if len(buffer) > 8:
-                        buffer = buffer[1:]
-                    break
+            for token in tokenizer.feed(data):
+                process_token(token)
+                latency.add(t_arrival)
         except Exception as e:
             print("Serial Read Error:", e)
-            time.sleep(0.1)
-        time.sleep(0.01)
 
 def process_token(raw_token):
-    """Handle a token read from serial (mapped via card_map)."""
-    global joker_card, side_toggle, game_over
+    """Handle a token read from serial (mapped via card_map).
+
+    Runs on the serial thread: maps the token to a card id and hands the card
+    to on_card() on the Tk thread, which owns the engine. Card images are
+    already in card_atlas, so nothing is decoded here.
+    """
     token = raw_token.strip()
     if not token:
         return
-    print("[DEBUG] token:", repr(token))
-    if token not in card_map:
+    if token not in card_ids:
         root.after(0, status_label.configure, {"text": f"Unknown raw token: {token}"})
         return
     card_name = card_map[token]
     root.after(0, status_label.configure, {"text": f"Card detected: {card_name}"})
-    if not joker_card:
-        joker_card = card_name
-        root.after(0, joker_text.configure, {"text": f"Joker: {card_name}"})
-        img = load_ctk_image(card_name, target_w=200, target_h=280)
-        if img:
-            root.after(0, lambda i=img: joker_img_label.configure(image=i, text="")); joker_img_label.image = img
-        else:
-            root.after(0, joker_img_label.configure, {"text": card_name})
-        log(f"Joker set → {card_name}")
-    else:
-        side = "ANDAR" if side_toggle else "BAHAR"
-        target_widget = andar_img_label if side_toggle else bahar_img_label
-        img = load_ctk_image(card_name)
-        if img:
-            root.after(0, lambda w=target_widget, i=img: w.configure(image=i, text="")); target_widget.image = img
-        else:
-            root.after(0, target_widget.configure, {"text": card_name})
-        root.after(0, evaluate_for_match, card_name, side)
-        side_toggle = not side_toggle
-        log(f"Card dealt → {card_name} ({side})")
+    root.after(0, on_card, card_ids[token], card_name)
 
 # ------------------ Graceful exit ------------------
 def on_close():
     stop_event.set()
+    print(latency.summary())
+    print(card_atlas.cache.summary())
+    print(f"scene: {scene.updates} item updates, {scene.skipped} unchanged")
+    history.close()
+    store.close()
+    journal.close()
     try:
         if ser and getattr(ser, "is_open", False):
             ser.close()
@@ -438,6 +351,8 @@ def on_close():
 root.protocol("WM_DELETE_WINDOW", on_close)
 
 # ------------------ Start serial thread, initial draw ------------------
+restore_session()
+recover_round()
 draw_bead_plate()
 threading.Thread(target=serial_reader, daemon=True).start()
 
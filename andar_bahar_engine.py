@@ -0,0 +1,205 @@
+# andar_bahar_engine.py
+"""
+Headless Andar Bahar rules engine (no Tk, no serial).
+- set_joker(card_id), deal(card_id), declare(side), reset(), result()
+- Cards alternate ANDAR, BAHAR, ANDAR ... after the joker; the first card
+  whose rank matches the joker wins the round for the side it was dealt to
+- Session tallies (andar_count, bahar_count, rounds) survive reset()
+- win_probability(): live P(ANDAR wins) / P(BAHAR wins) given the joker rank,
+  the matching cards and shoe size left, and whose turn it is; updated in
+  O(1) per card from a table built once per (matches left, shoe size)
+- resolve(cards) plays a whole pre-shuffled shoe in one C-level search,
+  for simulations and tests
+
+Card ids are the 0..51 ids from cards.py. The front-ends call the engine from
+the Tk thread only; the serial thread just maps tokens to card ids.
+
+Run this file directly for a rounds-per-second benchmark.
+"""
+
+from functools import lru_cache
+
+from cards import RANK, RANKS, DECK_SIZE
+
+ANDAR = "ANDAR"
+BAHAR = "BAHAR"
+
+# bytes.translate() table: card id -> rank (ids >= 52 never occur)
+RANK_TABLE = bytes(RANK) + bytes(256 - DECK_SIZE)
+
+
+@lru_cache(maxsize=None)
+def _win_table(matches, shoe_size):
+    """t[n] = P(the side receiving the next card wins), n cards left, `matches` of them winners.
+
+    t[n] = m/n + (1 - m/n) * (1 - t[n-1]): the next card either matches, or
+    the turn passes to the other side with one card fewer.
+    """
+    t = [0.0] * (shoe_size + 1)
+    for n in range(matches, shoe_size + 1):
+        hit = matches / n
+        t[n] = hit + (1 - hit) * (1 - t[n - 1])
+    return t
+
+
+class AndarBaharEngine:
+    """State of one Andar Bahar table: the current round plus session tallies."""
+
+    def __init__(self, decks=1):
+        self.decks = decks  # each round is dealt from a freshly shuffled shoe of this many decks
+        self.andar_count = 0
+        self.bahar_count = 0
+        self.rounds = 0
+        self.reset()
+
+    def reset(self):
+        """Start a new round; session tallies are kept."""
+        self.joker = None
+        self.joker_rank = None
+        self.side_toggle = True  # True -> next card goes ANDAR, False -> BAHAR
+        self.game_over = False
+        self.winner = None
+        self.andar_cards = []
+        self.bahar_cards = []
+        self.shoe_left = DECK_SIZE * self.decks
+        self.matches_left = 0  # cards of the joker's rank still in the shoe
+
+    def restore(self, andar_count, bahar_count):
+        """Set the session tallies, e.g. from the history file at startup."""
+        self.andar_count = andar_count
+        self.bahar_count = bahar_count
+        self.rounds = andar_count + bahar_count
+
+    @property
+    def next_side(self):
+        return ANDAR if self.side_toggle else BAHAR
+
+    def set_joker(self, card_id):
+        if self.joker is not None:
+            raise ValueError("joker already set for this round")
+        self.joker = card_id
+        self.joker_rank = RANK[card_id]
+        self.shoe_left -= 1
+        self.matches_left = DECK_SIZE // len(RANKS) * self.decks - 1
+
+    def deal(self, card_id):
+        """Deal one card to the next side; returns that side.
+
+        After a match, game_over is True and result() names the winner; further
+        cards are still recorded (the shoe keeps reporting them) but never
+        change the result.
+        """
+        if self.joker is None:
+            raise ValueError("deal() before set_joker()")
+        if self.side_toggle:
+            side = ANDAR
+            self.andar_cards.append(card_id)
+        else:
+            side = BAHAR
+            self.bahar_cards.append(card_id)
+        self.side_toggle = not self.side_toggle
+        if self.shoe_left:
+            self.shoe_left -= 1
+        if RANK[card_id] == self.joker_rank:
+            self.matches_left -= 1
+            if not self.game_over:
+                self._finish(side)
+        return side
+
+    def declare(self, side):
+        """Manual result from the dealer (keys 1/2); ignored once the round is over."""
+        if self.game_over:
+            return False
+        self._finish(side)
+        return True
+
+    def _finish(self, side):
+        self.game_over = True
+        self.winner = side
+        self.rounds += 1
+        if side == ANDAR:
+            self.andar_count += 1
+        else:
+            self.bahar_count += 1
+
+    def result(self):
+        """ANDAR / BAHAR once decided, else None."""
+        return self.winner
+
+    def win_probability(self):
+        """(P(ANDAR wins), P(BAHAR wins)) for the rest of the round.
+
+        None before the joker is set; (1, 0) or (0, 1) once the round is decided.
+        """
+        if self.game_over:
+            return (1.0, 0.0) if self.winner == ANDAR else (0.0, 1.0)
+        if self.joker is None:
+            return None
+        m = self.matches_left
+        if m <= 0:
+            return 0.0, 0.0
+        n = max(self.shoe_left, m)  # more cards than the shoe holds: wrong deck count, clamp
+        p = _win_table(m, DECK_SIZE * self.decks)[n]
+        return (p, 1 - p) if self.side_toggle else (1 - p, p)
+
+    @staticmethod
+    def resolve(cards):
+        """Play a whole shoe: cards[0] is the joker, the rest alternate from ANDAR.
+
+        cards is a bytes-like sequence of card ids. Returns (winner, n_dealt),
+        n_dealt counting the cards after the joker, or (None, n) if no match.
+        """
+        ranks = bytes(cards).translate(RANK_TABLE)
+        idx = ranks.find(ranks[0], 1)
+        if idx < 0:
+            return None, len(ranks) - 1
+        return (ANDAR if idx % 2 else BAHAR), idx
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    rnd = random.Random(1)
+    shoes = []
+    for _ in range(2000):
+        deck = bytearray(range(DECK_SIZE))
+        rnd.shuffle(deck)
+        shoes.append(bytes(deck))
+
+    engine = AndarBaharEngine()
+    t0 = time.perf_counter()
+    for deck in shoes * 10:
+        engine.reset()
+        engine.set_joker(deck[0])
+        for cid in deck[1:]:
+            engine.deal(cid)
+            if engine.game_over:
+                break
+    dt = time.perf_counter() - t0
+    print(f"deal() loop: {engine.rounds / dt:,.0f} rounds/s "
+          f"(ANDAR {engine.andar_count}, BAHAR {engine.bahar_count})")
+
+    resolve = AndarBaharEngine.resolve
+    n = 0
+    t0 = time.perf_counter()
+    for deck in shoes * 500:
+        resolve(deck)
+        n += 1
+    dt = time.perf_counter() - t0
+    print(f"resolve():   {n / dt:,.0f} rounds/s")
+
+    engine = AndarBaharEngine()
+    t0 = time.perf_counter()
+    n = 0
+    for deck in shoes:
+        engine.reset()
+        engine.set_joker(deck[0])
+        for cid in deck[1:]:
+            engine.deal(cid)
+            engine.win_probability()
+            n += 1
+            if engine.game_over:
+                break
+    dt = time.perf_counter() - t0
+    print(f"deal() + win_probability(): {dt / n * 1e6:.2f} us per card")
@@ -0,0 +1,198 @@
+# animation.py
+"""
+One frame clock for every UI animation of a Tk front-end.
+- Animator(root, fps) owns a single root.after chain: each tick steps all
+  active tweens and runs the timers that are due, then books the next
+  tick. There is never more than one pending after() for animations, so
+  overlapping effects cannot flood the Tk event queue
+- tween(duration_ms, step, done) calls step(t) once per frame with t in
+  0..1 from the elapsed wall time, so a late frame jumps ahead instead of
+  replaying the missed ones; a frame that overruns the budget is dropped
+  (counted in .dropped) and the clock rejoins the frame grid
+- delay(ms, fn) and every(ms, fn) are timers on the same clock; with no
+  tween running the clock sleeps straight to the next timer, and with
+  nothing at all scheduled it stops (no idle ticks)
+- key= names an animation: starting another with the same key replaces
+  it (a second popup slide takes over from the first); cancel(key)
+
+Run this file directly to simulate a busy minute of animations and count
+ticks, steps and dropped frames (no display needed).
+"""
+
+import time
+import heapq
+import itertools
+
+FPS = 60
+
+
+def linear(t):
+    return t
+
+
+def ease_out(t):
+    """Decelerating cubic: fast start, gentle landing (slides)."""
+    return 1 - (1 - t) ** 3
+
+
+class Animator:
+    """Central animation clock on top of root.after, at a fixed frame budget."""
+
+    def __init__(self, root, fps=FPS, clock=time.monotonic):
+        self.root = root
+        self.frame = 1.0 / fps
+        self.clock = clock
+        self.ticks = 0
+        self.dropped = 0
+        self._tweens = {}  # key -> [start, duration, step, done, ease]
+        self._timers = []  # heap of (due, seq, key)
+        self._timer_fns = {}  # key -> (fn, period or None, seq)
+        self._seq = itertools.count()
+        self._after_id = None
+        self._next = None  # when the booked tick should run
+
+    # ------------------ scheduling ------------------
+    def tween(self, duration_ms, step, done=None, key=None, ease=linear):
+        """Animate for duration_ms: step(eased t) every frame, step(1.0) last, then done()."""
+        key = key if key is not None else object()
+        self._tweens[key] = [self.clock(), max(duration_ms, 1) / 1000, step, done, ease]
+        self._wake(0)
+        return key
+
+    def delay(self, ms, fn, key=None):
+        """Call fn() once, ms from now."""
+        return self._timer(ms, fn, None, key)
+
+    def every(self, ms, fn, key=None):
+        """Call fn() every ms until cancel(key)."""
+        return self._timer(ms, fn, ms / 1000, key)
+
+    def _timer(self, ms, fn, period, key):
+        key = key if key is not None else object()
+        seq = next(self._seq)
+        self._timer_fns[key] = (fn, period, seq)
+        due = self.clock() + ms / 1000
+        heapq.heappush(self._timers, (due, seq, key))
+        self._wake(due - self.clock())
+        return key
+
+    def cancel(self, key):
+        """Stop a tween or timer (no done() call); unknown keys are ignored."""
+        self._tweens.pop(key, None)
+        self._timer_fns.pop(key, None)  # its heap entry is skipped when it comes due
+
+    @property
+    def active(self):
+        return bool(self._tweens or self._timer_fns)
+
+    # ------------------ clock ------------------
+    def _wake(self, delay):
+        """Make sure a tick runs within delay seconds (keeps at most one after() pending)."""
+        when = self.clock() + max(0.0, delay)
+        if self._after_id is not None and self._next <= when:
+            return
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        self._next = when
+        self._after_id = self.root.after(max(1, round(max(0.0, delay) * 1000)), self._tick)
+
+    def _tick(self):
+        self._after_id = None
+        now = self.clock()
+        self.ticks += 1
+        for key, (start, duration, step, done, ease) in list(self._tweens.items()):
+            t = min(1.0, (now - start) / duration)
+            try:
+                step(ease(t))
+            except Exception as e:
+                print("Animation error:", e)
+                t = 1.0
+            if t >= 1.0 and self._tweens.get(key, (None,))[0] == start:
+                del self._tweens[key]
+                if done:
+                    done()
+        while self._timers and self._timers[0][0] <= now:
+            _, seq, key = heapq.heappop(self._timers)
+            entry = self._timer_fns.get(key)
+            if entry is None or entry[2] != seq:
+                continue  # cancelled or replaced
+            fn, period, _ = entry
+            if period is None:
+                del self._timer_fns[key]
+            else:
+                seq = next(self._seq)
+                self._timer_fns[key] = (fn, period, seq)
+                heapq.heappush(self._timers, (now + period, seq, key))
+            fn()
+        self._schedule(now)
+
+    def _schedule(self, last):
+        """Book the next tick: the next frame while tweening, else the next timer, else nothing."""
+        while self._timers and self._timer_fns.get(self._timers[0][2], (None, None, None))[2] != self._timers[0][1]:
+            heapq.heappop(self._timers)  # drop cancelled entries so an idle clock really stops
+        now = self.clock()
+        if self._tweens:
+            nxt = last + self.frame
+            if now >= nxt:  # this tick overran its frame: drop the frames it covered
+                missed = int((now - last) / self.frame)
+                self.dropped += missed
+                nxt = last + (missed + 1) * self.frame
+            self._wake(nxt - now)
+        elif self._timers:
+            self._wake(self._timers[0][0] - now)
+
+
+if __name__ == "__main__":
+    class FakeRoot:
+        """Virtual-time stand-in for Tk: after() callbacks run in due order."""
+
+        def __init__(self):
+            self.now = 0.0
+            self.queue = []
+            self.ids = itertools.count()
+            self.cancelled = set()
+            self.max_pending = 0
+
+        def after(self, ms, fn):
+            i = next(self.ids)
+            heapq.heappush(self.queue, (self.now + ms / 1000, i, fn))
+            self.max_pending = max(self.max_pending, len(self.queue) - len(self.cancelled))
+            return i
+
+        def after_cancel(self, i):
+            self.cancelled.add(i)
+
+        def run(self, until):
+            while self.queue and self.queue[0][0] <= until:
+                due, i, fn = heapq.heappop(self.queue)
+                if i in self.cancelled:
+                    self.cancelled.discard(i)
+                    continue
+                self.now = max(self.now, due)
+                fn()
+
+    root = FakeRoot()
+    anim = Animator(root, clock=lambda: root.now)
+    steps = [0]
+    work = [0.0]
+
+    def count(t):
+        steps[0] += 1
+        root.now += work[0]  # what redrawing the widget costs
+
+    anim.every(4000, lambda: None, key="background")
+    for i in range(20):  # a win every 3 s: popup slide, glow, flash, two label resets
+        at = i * 3.0
+        root.now = max(root.now, at)
+        anim.tween(250, count, key="popup", ease=ease_out)
+        anim.tween(1200, count, key="flash")
+        anim.delay(2400, lambda: None, key="glow")
+        anim.delay(900, lambda: None, key="player_label")
+        anim.delay(900, lambda: None, key="banker_label")
+        work[0] = 0.001 if i % 2 else 0.012  # every other round the UI is slow (2 tweens x 12 ms > 16 ms)
+        root.run(at + 3.0)
+    print(f"{anim.ticks} ticks, {steps[0]} tween steps, {anim.dropped} frames dropped, "
+          f"at most {root.max_pending} after() pending")
+    anim.cancel("background")
+    root.run(root.now + 10)
+    print("idle: active =", anim.active, "| pending after() =", len(root.queue) - len(root.cancelled))
@@ -1,26 +1,32 @@
 import tkinter as tk
-from tkinter import PhotoImage, Toplevel, Canvas, Frame, Scrollbar
-import threading, serial, json, os, time
+from tkinter import PhotoImage, Canvas, Frame, Scrollbar
+import threading, json, os, time
+from serial_ingest import open_serial, iter_chunks, LatencyMeter, READ_TIMEOUT
+from shoe_tokenizer import ShoeTokenizer
+from cards import NAMES, card_ids_from_map
+from baccarat_engine import BaccaratEngine, PLAYER
+from overlay import ResultOverlay
 
 # ------------------ Configuration ------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CARDS_DIR = os.path.join(BASE_DIR, "cards")
 with open(os.path.join(BASE_DIR, 'card_map.json'), 'r') as f:
     card_map = json.load(f)
+card_ids = card_ids_from_map(card_map)  # shoe code -> card id (see cards.py)
+tokenizer = ShoeTokenizer(card_map)
 
-# Serial port (safe open)
-try:
-    ser = serial.Serial('COM3', 9600, timeout=1)
-    print("✅ Connected to serial port COM3")
-except Exception as e:
-    print("⚠️ Serial not connected:", e)
-    ser = None
+# Serial port (safe open, blocking reads with a short timeout; see serial_ingest)
+ser = open_serial('COM3', 9600, READ_TIMEOUT)
+latency = LatencyMeter()
+stop_event = threading.Event()
 
 # ------------------ GUI Setup ------------------
 root = tk.Tk()
 root.title("Mr. Pillai - Baccarat")
 root.state("zoomed")
 root.config(bg="#0f0f1a")
+result_overlay = ResultOverlay(root, size=(360, 120), fg="#FFD700", bg="#0f0f1a", font=("Arial", 20, "bold"),
+                               duration=2000)  # built once; show_result_popup() only reconfigures it
 
 # ------------------ Scrollable Frame ------------------
 main_canvas = Canvas(root, bg="#0f0f1a", highlightthickness=0)
@@ -90,37 +96,12 @@ scrollbar_history.pack(side="right", fill="y")
 history_text.config(yscrollcommand=scrollbar_history.set)
 
 # ------------------ Baccarat State ------------------
-# We'll collect cards in order: P1, P2, B1, B2 (optionally third cards later)
-deal_cards = []             # will hold card keys like 'club_7' (as strings from card_map)
-player_cards = []           # will hold card names for player
-banker_cards = []           # will hold card names for banker
-winner_popup = None
+# Cards arrive in dealing order P1, B1, P2, B2 (+ third cards); the engine places them
+engine = BaccaratEngine()   # hands, tableau and result; Tk thread only
 
 # ------------------ Helper Utilities ------------------
-def card_point_from_name(card_name):
-    """Given card name like 'heart_ace' or 'club_10' return baccarat point value."""
-    # assume card_name format contains rank after underscore
-    # ranks might be 'ace', '2'...'10','jack','queen','king'
-    parts = card_name.split('_')
-    rank = parts[-1]
-    if rank in ('jack', 'queen', 'king', '10'):
-        return 0
-    if rank == 'ace':
-        return 1
-    try:
-        return int(rank)
-    except:
-        return 0
-
-def compute_total(cards_list):
-    s = sum(card_point_from_name(c) for c in cards_list)
-    return s % 10
-
 def reset_board():
-    global deal_cards, player_cards, banker_cards
-    deal_cards = []
-    player_cards = []
-    banker_cards = []
+    engine.reset()
     # clear images
     for lbl in p_card_labels + b_card_labels:
         lbl.config(image="", text="")
@@ -135,76 +116,36 @@ def log_history_line(line):
     print(line)
 
 def show_result_popup(text):
-    global winner_popup
-    try:
-        if winner_popup and winner_popup.winfo_exists():
-            winner_popup.destroy()
-    except:
-        pass
-    winner_popup = Toplevel(root)
-    winner_popup.title("Result")
-    winner_popup.geometry("360x120")
-    winner_popup.config(bg="#0f0f1a")
-    tk.Label(winner_popup, text=text, fg="#FFD700", bg="#0f0f1a",
-             font=("Arial", 20, "bold")).pack(expand=True, pady=20)
-    # auto close after 2s
-    def close_it():
-        try:
-            if winner_popup and winner_popup.winfo_exists():
-                winner_popup.destroy()
-        except:
-            pass
-    root.after(2000, close_it)
-
-# ------------------ Baccarat Flow (simplified 2-card evaluation) ------------------
-def evaluate_baccarat_round():
-    """Evaluate after 4 cards: P1,P2,B1,B2.
-       This is a simplified implementation: handle naturals (8/9) and compare totals (mod 10).
-       (No full third-card rules implemented here.)"""
-    if len(deal_cards) < 4:
-        return
-    # first two -> player, next two -> banker
-    player_cards[:] = deal_cards[0:2]
-    banker_cards[:] = deal_cards[2:4]
-    # update images
-    for i, c in enumerate(player_cards):
-        set_card_image(p_card_labels[i], c)
-    for i, c in enumerate(banker_cards):
-        set_card_image(b_card_labels[i], c)
-    # scores
-    p_total = compute_total(player_cards)
-    b_total = compute_total(banker_cards)
+    result_overlay.show(text)
+
+# ------------------ Baccarat Flow (full third-card rules, see baccarat_engine) ------------------
+def on_card(card_id, card_name):
+    """Tk thread: give one shoe card to the engine and show it in its hand."""
+    if engine.game_over:
+        return  # ignore until reset
+    hand, slot = engine.deal(card_id)
+    set_card_image((p_card_labels if hand == PLAYER else b_card_labels)[slot], card_name)
+    if engine.game_over:
+        status_label.config(text=f"Dealt card: {card_name} → {hand}")
+        # schedule evaluation display
+        root.after(50, show_round_result)
+    else:
+        status_label.config(text=f"Dealt card: {card_name} → {hand} (next: {engine.next_hand}, {engine.remaining} more)")
+
+def show_round_result():
+    """Show scores, history line and popup for the round the engine just completed."""
+    if not engine.game_over:
+        return  # board was reset in between
+    winner = engine.winner
+    p_total, b_total = engine.player_total, engine.banker_total
     player_score_label.config(text=f"Score: {p_total}")
     banker_score_label.config(text=f"Score: {b_total}")
-    status_label.config(text=f"Dealt 4 cards. Player {p_total} vs Banker {b_total}")
-
-    # naturals (8 or 9)
-    if p_total in (8,9) or b_total in (8,9):
-        # winner is higher (or tie)
-        if p_total > b_total:
-            winner = "PLAYER"
-        elif b_total > p_total:
-            winner = "BANKER"
-        else:
-            winner = "TIE"
-    else:
-        # simplified: compare totals
-        if p_total > b_total:
-            winner = "PLAYER"
-        elif b_total > p_total:
-            winner = "BANKER"
-        else:
-            winner = "TIE"
+    status_label.config(text=f"Dealt {engine.dealt} cards. Player {p_total} vs Banker {b_total}")
 
     # log and popup
-    line = f"Player: {','.join(player_cards)} ({p_total}) | Banker: {','.join(banker_cards)} ({b_total}) → {winner}"
+    line = f"Player: {','.join(NAMES[c] for c in engine.player_cards)} ({p_total}) | Banker: {','.join(NAMES[c] for c in engine.banker_cards)} ({b_total}) → {winner}"
     log_history_line(line)
     show_result_popup(f"{winner} WINS!")
-    # after evaluation keep history but prevent further automatic evaluations until reset
-    # set a flag to block repeated evaluation
-    # We mark game_over to prevent manual or serial further inputs until reset
-    global game_over
-    game_over = True
 
 # ------------------ UI helper to set card image from cards folder ------------------
 def set_card_image(label, card_name):
@@ -232,42 +173,29 @@ def set_card_image(label, card_name):
 
 # ------------------ Reset handler ------------------
 def reset_all(event=None):
-    global game_over
-    # close popup safely
-    try:
-        if winner_popup and winner_popup.winfo_exists():
-            winner_popup.destroy()
-    except:
-        pass
-    game_over = False
+    result_overlay.hide()
     reset_board()
     status_label.config(text="Round reset. Waiting for cards or manual result.")
 root.bind("/", reset_all)
 
 # ------------------ Manual result keys ------------------
 def manual_win_player(event=None):
-    global game_over
-    if game_over:
+    if not engine.declare("PLAYER"):
         return
-    game_over = True
     log_history_line("Manual result → PLAYER")
     show_result_popup("PLAYER WINS!")
 root.bind("1", manual_win_player)
 
 def manual_win_banker(event=None):
-    global game_over
-    if game_over:
+    if not engine.declare("BANKER"):
         return
-    game_over = True
     log_history_line("Manual result → BANKER")
     show_result_popup("BANKER WINS!")
 root.bind("2", manual_win_banker)
 
 def manual_tie(event=None):
-    global game_over
-    if game_over:
+    if not engine.declare("TIE"):
         return
-    game_over = True
     log_history_line("Manual result → TIE")
     show_result_popup("TIE")
 root.bind("3", manual_tie)
@@ -275,52 +203,22 @@ root.bind("3", manual_tie)
 # ------------------ Serial reader for Baccarat ------------------
 def read_serial_baccarat():
     """Read cards from serial. Expect device to send card IDs that exist in card_map keys.
-       We'll append to deal_cards and evaluate after 4 cards."""
-    global game_over
-    while True:
-        if not ser:
-            time.sleep(1)
-            continue
+       Each card is handed to on_card() on the Tk thread; the engine decides when the round is complete."""
+    for chunk, t_arrival in iter_chunks(ser, stop_event):
         try:
-            if ser.in_waiting > 0:
-                raw = ser.readline()
-                try:
-                    data = raw.decode(errors="ignore").strip()
-                except:
-                    data = str(raw).strip()
-                if not data:
-                    continue
-                # Debug
-                print("Serial received:", repr(data))
+            for data in tokenizer.feed(chunk):
                 # normalize: some devices send number codes; assume those map in card_map
                 key = data
                 # if device sends numeric index, map accordingly (user already has card_map mapping)
-                if key in card_map:
-                    card_name = card_map[key]  # this is filename base like 'club_7'
-                    # only accept cards when not game_over
-                    if game_over:
-                        # ignore until reset
-                        continue
-                    # append and update small UI indicator
-                    deal_cards.append(card_name)
-                    status_label.config(text=f"Dealt card: {card_name} ({len(deal_cards)}/4)")
-                    # show in mini placeholders while waiting:
-                    if len(deal_cards) <= 2:
-                        # player card slots
-                        set_card_image(p_card_labels[len(deal_cards)-1], card_name)
-                    elif len(deal_cards) <= 4:
-                        set_card_image(b_card_labels[len(deal_cards)-3], card_name)
-                    # when 4 reached evaluate
-                    if len(deal_cards) == 4:
-                        # schedule evaluation on main thread
-                        root.after(50, evaluate_baccarat_round)
+                if key in card_ids:
+                    # on_card() places it; cards after the round is over are ignored until reset
+                    root.after(0, on_card, card_ids[key], card_map[key])
+                    latency.add(t_arrival)
                 else:
                     # not recognized key, ignore or print
                     print("Unknown serial key:", repr(data))
         except Exception as e:
             print("Serial read error:", e)
-            time.sleep(0.5)
-        time.sleep(0.05)
 
 threading.Thread(target=read_serial_baccarat, daemon=True).start()
 
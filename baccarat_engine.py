@@ -0,0 +1,244 @@
+# baccarat_engine.py
+"""
+Headless Punto Banco (baccarat) engine with the full third-card tableau.
+- Cards are taken in real dealing order: P1, B1, P2, B2, then the player's
+  and/or banker's third card when the tableau calls for them
+- Every draw decision is one lookup in DRAW_TABLE, precomputed at import and
+  indexed by (player total, banker total, player third card)
+- deal(card_id) consumes one card at a time as the shoe reports it and says
+  where it went; remaining tells the UI how many more cards it must wait for
+- Session counters (PLAYER/BANKER/TIE wins, pairs, naturals, Super Six) and
+  rounds survive reset()
+- play(cards) runs a whole round from a card sequence, for simulations
+
+Card ids are the 0..51 ids from cards.py. The front-ends call the engine from
+the Tk thread only.
+
+Run this file directly for a rounds-per-second benchmark.
+"""
+
+from cards import POINT, RANK, DECK_SIZE
+
+PLAYER = "PLAYER"
+BANKER = "BANKER"
+TIE = "TIE"
+
+COUNTER_KEYS = ("PLAYER", "BANKER", "TIE", "PLAYER_PAIR", "BANKER_PAIR", "NATURAL", "SUPER_SIX")
+
+# DRAW_TABLE flags
+PLAYER_DRAWS = 1
+BANKER_DRAWS = 2
+NO_THIRD = 10  # third-card index meaning "player has not drawn (yet)"
+
+
+def _draw_flags(p_total, b_total, p_third):
+    """Tableau decision after the first four cards (p_third = NO_THIRD) or
+    after the player's third card (p_third = its point value 0..9)."""
+    if p_total >= 8 or b_total >= 8:
+        return 0  # natural: both stand
+    if p_third == NO_THIRD:
+        if p_total <= 5:
+            return PLAYER_DRAWS
+        # player stands on 6/7, banker then draws on 0-5
+        return BANKER_DRAWS if b_total <= 5 else 0
+    if b_total <= 2:
+        draws = True
+    elif b_total == 3:
+        draws = p_third != 8
+    elif b_total == 4:
+        draws = 2 <= p_third <= 7
+    elif b_total == 5:
+        draws = 4 <= p_third <= 7
+    elif b_total == 6:
+        draws = p_third in (6, 7)
+    else:
+        draws = False
+    return BANKER_DRAWS if draws else 0
+
+
+# flat bytes table: DRAW_TABLE[(p_total * 10 + b_total) * 11 + p_third]
+DRAW_TABLE = bytes(_draw_flags(p, b, t) for p in range(10) for b in range(10) for t in range(11))
+
+# the first four cards go P, B, P, B
+_DEAL_ORDER = (PLAYER, BANKER, PLAYER, BANKER)
+
+
+class BaccaratEngine:
+    """State of one baccarat table: the current round plus session counters."""
+
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTER_KEYS, 0)
+        self.rounds = 0
+        self.reset()
+
+    def reset(self):
+        """Start a new round; session counters are kept."""
+        self.player_cards = []
+        self.banker_cards = []
+        self.player_total = 0
+        self.banker_total = 0
+        self.next_hand = PLAYER  # where the next shoe card goes, None when complete
+        self.remaining = 4  # cards still expected for certain (more may follow)
+        self.game_over = False
+        self.winner = None
+        self.player_pair = False
+        self.banker_pair = False
+        self.natural = False
+        self.super_six = False
+
+    def restore(self, counters):
+        """Set the session counters (missing keys start at 0), e.g. from the history file at startup."""
+        self.counters = dict.fromkeys(COUNTER_KEYS, 0)
+        self.counters.update(counters)
+        self.rounds = self.counters[PLAYER] + self.counters[BANKER] + self.counters[TIE]
+
+    @property
+    def dealt(self):
+        return len(self.player_cards) + len(self.banker_cards)
+
+    def deal(self, card_id):
+        """Give the next shoe card to whichever hand it belongs to.
+
+        Returns (hand, slot): PLAYER or BANKER and the card's position 0..2 in
+        that hand. Raises ValueError once the round is complete.
+        """
+        hand = self.next_hand
+        if hand is None:
+            raise ValueError("round complete; reset() before dealing")
+        if hand == PLAYER:
+            slot = len(self.player_cards)
+            self.player_cards.append(card_id)
+            self.player_total = (self.player_total + POINT[card_id]) % 10
+        else:
+            slot = len(self.banker_cards)
+            self.banker_cards.append(card_id)
+            self.banker_total = (self.banker_total + POINT[card_id]) % 10
+
+        n = self.dealt
+        if n < 4:
+            self.next_hand = _DEAL_ORDER[n]
+            self.remaining = 4 - n
+        elif n == 4:
+            self._two_card_total = (self.player_total, self.banker_total)
+            flags = DRAW_TABLE[(self.player_total * 10 + self.banker_total) * 11 + NO_THIRD]
+            if flags & PLAYER_DRAWS:
+                self._expect(PLAYER)
+            elif flags & BANKER_DRAWS:
+                self._expect(BANKER)
+            else:
+                self._finish()
+        elif hand == PLAYER:
+            # player's third card decides the banker (two-card totals index the table)
+            p2, b2 = self._two_card_total
+            if DRAW_TABLE[(p2 * 10 + b2) * 11 + POINT[card_id]] & BANKER_DRAWS:
+                self._expect(BANKER)
+            else:
+                self._finish()
+        else:
+            self._finish()
+        return hand, slot
+
+    def declare(self, winner):
+        """Manual result from the dealer (keys 1/2/3); ignored once the round is over.
+
+        Only the win counter moves: no cards were seen, so pairs, naturals and
+        Super Six are not judged.
+        """
+        if self.game_over:
+            return False
+        self.winner = winner
+        self._close()
+        return True
+
+    def result(self):
+        """PLAYER / BANKER / TIE once decided, else None."""
+        return self.winner
+
+    def _expect(self, hand):
+        self.next_hand = hand
+        self.remaining = 1
+
+    def _finish(self):
+        p, b = self.player_total, self.banker_total
+        self.winner = TIE if p == b else (PLAYER if p > b else BANKER)
+        self.player_pair = RANK[self.player_cards[0]] == RANK[self.player_cards[1]]
+        self.banker_pair = RANK[self.banker_cards[0]] == RANK[self.banker_cards[1]]
+        p2, b2 = self._two_card_total
+        self.natural = p2 >= 8 or b2 >= 8
+        self.super_six = self.winner == BANKER and b == 6
+        c = self.counters
+        if self.player_pair:
+            c["PLAYER_PAIR"] += 1
+        if self.banker_pair:
+            c["BANKER_PAIR"] += 1
+        if self.natural:
+            c["NATURAL"] += 1
+        if self.super_six:
+            c["SUPER_SIX"] += 1
+        self._close()
+
+    def _close(self):
+        self.game_over = True
+        self.next_hand = None
+        self.remaining = 0
+        self.counters[self.winner] += 1
+        self.rounds += 1
+
+    @staticmethod
+    def play(cards):
+        """Play one round from a sequence of card ids in shoe order.
+
+        Returns (winner, player_total, banker_total, n_used); cards must hold
+        at least n_used (4 to 6) cards.
+        """
+        p = (POINT[cards[0]] + POINT[cards[2]]) % 10
+        b = (POINT[cards[1]] + POINT[cards[3]]) % 10
+        base = (p * 10 + b) * 11
+        flags = DRAW_TABLE[base + NO_THIRD]
+        n = 4
+        if flags & PLAYER_DRAWS:
+            third = POINT[cards[4]]
+            p = (p + third) % 10
+            n = 5
+            flags = DRAW_TABLE[base + third]
+        if flags & BANKER_DRAWS:
+            b = (b + POINT[cards[n]]) % 10
+            n += 1
+        winner = TIE if p == b else (PLAYER if p > b else BANKER)
+        return winner, p, b, n
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    rnd = random.Random(3)
+    shoe = list(range(DECK_SIZE)) * 8
+    rnd.shuffle(shoe)
+    rounds = []
+    i = 0
+    while i + 6 <= len(shoe):
+        rounds.append(shoe[i:i + 6])
+        i += 6
+
+    engine = BaccaratEngine()
+    t0 = time.perf_counter()
+    for _ in range(50):
+        for cards in rounds:
+            engine.reset()
+            for cid in cards:
+                engine.deal(cid)
+                if engine.game_over:
+                    break
+    dt = time.perf_counter() - t0
+    print(f"deal() loop: {engine.rounds / dt:,.0f} rounds/s {engine.counters}")
+
+    play = BaccaratEngine.play
+    n = 0
+    t0 = time.perf_counter()
+    for _ in range(500):
+        for cards in rounds:
+            play(cards)
+            n += 1
+    dt = time.perf_counter() - t0
+    print(f"play():      {n / dt:,.0f} rounds/s")
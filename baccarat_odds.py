@@ -0,0 +1,176 @@
+# baccarat_odds.py
+"""
+Exact baccarat odds for the cards still in the shoe.
+- P(PLAYER), P(BANKER), P(TIE), P(NATURAL), P(SUPER_SIX) under the full
+  third-card rules (the same DRAW_TABLE as baccarat_engine), computed
+  exactly for dealing without replacement
+- point_odds(counts) is keyed on the 10-element point-count vector
+  (how many 0-, 1-, ... 9-point cards are left) and memoised
+- PLAYER_PAIR / BANKER_PAIR need ranks, not points: ShoeOdds tracks the 13
+  rank counts alongside and adds them in O(13)
+- ShoeOdds(decks).remove(card_id) after each dealt card; odds() is then a
+  cache hit or a sub-millisecond recompute, never a full enumeration
+
+How it works: a round never uses more than 6 cards, and dealing 6 cards
+every time does not change which cards the round actually uses. The chance
+of any ordered 6-card draw depends only on its multiset of point values,
+so the outcome of all 10^6 ordered draws is tallied once per multiset
+(5005 of them) at first use. After that, the odds for a shoe are one
+falling-factorial weight per multiset and one small matrix product.
+
+Needs numpy. Run this file directly to print fresh 8-deck odds and timings.
+"""
+
+from functools import lru_cache
+import numpy as np
+
+from baccarat_engine import DRAW_TABLE, PLAYER_DRAWS, BANKER_DRAWS, NO_THIRD, COUNTER_KEYS
+from cards import POINT, RANK, RANKS, DECK_SIZE
+
+# columns of the per-multiset outcome tally
+EVENTS = ("PLAYER", "BANKER", "TIE", "NATURAL", "SUPER_SIX")
+ROUND_CARDS = 6
+
+_tables = None  # (multiset value counts (M, 10), outcome tallies (M, len(EVENTS)))
+
+
+def _build_tables():
+    """Tally the outcome of every ordered 6-card point sequence per multiset."""
+    seq = np.indices((10,) * ROUND_CARDS, dtype=np.int16).reshape(ROUND_CARDS, -1)
+    p1, b1, p2, b2, c5, c6 = seq
+    draw = np.frombuffer(DRAW_TABLE, dtype=np.uint8).astype(np.int16)
+    p = (p1 + p2) % 10
+    b = (b1 + b2) % 10
+    base = (p * 10 + b) * 11
+    flags = draw[base + NO_THIRD]
+    player_draws = (flags & PLAYER_DRAWS) != 0
+    # once the player has drawn, the banker's decision looks at the player's third card
+    flags = np.where(player_draws, draw[base + c5], flags)
+    banker_draws = (flags & BANKER_DRAWS) != 0
+    p_final = np.where(player_draws, (p + c5) % 10, p)
+    b_card = np.where(player_draws, c6, c5)
+    b_final = np.where(banker_draws, (b + b_card) % 10, b)
+
+    events = np.stack([
+        p_final > b_final,
+        b_final > p_final,
+        p_final == b_final,
+        (p >= 8) | (b >= 8),
+        (b_final > p_final) & (b_final == 6),
+    ], axis=1).astype(np.int64)
+
+    # multiset id: counts of each point value, packed base 7
+    counts = np.stack([(seq == v).sum(axis=0) for v in range(10)], axis=1)
+    code = counts @ (7 ** np.arange(10))
+    codes, inverse = np.unique(code, return_inverse=True)
+    tally = np.zeros((codes.size, len(EVENTS)), dtype=np.int64)
+    np.add.at(tally, inverse, events)
+    multisets = (codes[:, None] // 7 ** np.arange(10)) % 7
+    return multisets, tally.astype(np.float64)
+
+
+def tables_ready():
+    """True once the outcome tables are built, i.e. odds() no longer blocks for ~1 s."""
+    return _tables is not None
+
+
+def _get_tables():
+    global _tables
+    if _tables is None:
+        _tables = _build_tables()
+    return _tables
+
+
+@lru_cache(maxsize=4096)
+def point_odds(counts):
+    """Exact event probabilities for the next round from a shoe of point counts.
+
+    counts is a 10-tuple: counts[v] cards worth v points are left. Returns a
+    dict over EVENTS, or None when fewer than 6 cards remain.
+    """
+    n = sum(counts)
+    if n < ROUND_CARDS:
+        return None
+    multisets, tally = _get_tables()
+    # falling factorials c, c(c-1), ... for k = 0..6 cards of each value
+    ff = np.ones((10, ROUND_CARDS + 1))
+    c = np.asarray(counts, dtype=np.float64)
+    for k in range(1, ROUND_CARDS + 1):
+        ff[:, k] = ff[:, k - 1] * np.maximum(c - (k - 1), 0)
+    weights = ff[np.arange(10), multisets].prod(axis=1)
+    total = 1.0
+    for k in range(ROUND_CARDS):
+        total *= n - k
+    probs = weights @ tally / total
+    return dict(zip(EVENTS, probs.tolist()))
+
+
+def pair_odds(rank_counts):
+    """P(the first two cards of a hand share a rank) for a shoe of 13 rank counts."""
+    n = sum(rank_counts)
+    if n < 2:
+        return 0.0
+    return sum(c * (c - 1) for c in rank_counts) / (n * (n - 1))
+
+
+class ShoeOdds:
+    """Remaining-shoe composition with live odds for the next round."""
+
+    def __init__(self, decks=8):
+        self.decks = decks
+        self.reset()
+
+    def reset(self):
+        """Fresh shoe of self.decks decks."""
+        per_deck = DECK_SIZE // len(RANKS)
+        self.rank_counts = [per_deck * self.decks] * len(RANKS)
+        self.point_counts = [0] * 10
+        for cid in range(len(RANKS)):  # ids 0..12 are one suit, Ace..King
+            self.point_counts[POINT[cid]] += per_deck * self.decks
+
+    @property
+    def remaining(self):
+        return sum(self.rank_counts)
+
+    def remove(self, card_id):
+        """A card left the shoe; ignored if that rank is already used up (wrong deck count)."""
+        r = RANK[card_id]
+        if self.rank_counts[r]:
+            self.rank_counts[r] -= 1
+            self.point_counts[POINT[card_id]] -= 1
+
+    def odds(self):
+        """{COUNTER_KEYS: probability} for the next round, or None near the end of the shoe."""
+        base = point_odds(tuple(self.point_counts))
+        if base is None:
+            return None
+        out = dict(base)
+        out["PLAYER_PAIR"] = out["BANKER_PAIR"] = pair_odds(self.rank_counts)
+        return {k: out[k] for k in COUNTER_KEYS}
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    t0 = time.perf_counter()
+    _get_tables()
+    print(f"outcome tables: {time.perf_counter() - t0:.2f} s (once per process)")
+
+    shoe = ShoeOdds(8)
+    t0 = time.perf_counter()
+    fresh = shoe.odds()
+    print(f"fresh 8-deck shoe ({(time.perf_counter() - t0) * 1000:.2f} ms):")
+    for k, p in fresh.items():
+        print(f"  {k:<12} {p:.6f}")
+
+    cards = list(range(DECK_SIZE)) * 8
+    random.Random(4).shuffle(cards)
+    t0 = time.perf_counter()
+    n = 0
+    for cid in cards[:300]:
+        shoe.remove(cid)
+        shoe.odds()
+        n += 1
+    dt = time.perf_counter() - t0
+    print(f"per dealt card: {dt / n * 1000:.3f} ms (remove + odds, {n} cards)")
@@ -0,0 +1,157 @@
+# backgrounds.py
+"""
+Window backgrounds (a.jpg, gold_bg.png) pre-scaled ahead of time and loaded off the Tk thread.
+- build() scales every source in BACKGROUNDS to every size in SCREEN_SIZES
+  once (LANCZOS) and stores raw pixels under assets/: a 24-byte header, then
+  RGB rows. Loading one is an mmap and Image.frombuffer, no decode or resize
+- A raw file remembers its source's mtime and size; when the source changes
+  (or the file is missing) load_background() falls back to scaling the
+  source, and a JPEG is decoded in draft mode (libjpeg DCT scaling to the
+  smallest size >= the target) before the resize. The fallback writes the
+  raw file, so the next start is fast even without a build
+- load_background_async() does that in a daemon thread and hands the image
+  to on_ready on the Tk thread (root.after), so the window appears at once
+  and the background is swapped in when it is ready (None if it failed)
+
+Run "python backgrounds.py build" as the asset build step (kiosk image,
+after changing a background); run it with no argument to time the cold,
+draft-mode and pre-scaled loads in a temp directory.
+"""
+
+import os
+import mmap
+import time
+import struct
+import threading
+from PIL import Image
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(BASE_DIR, "assets")
+BACKGROUNDS = ("a.jpg", "gold_bg.png")
+SCREEN_SIZES = ((1080, 1920), (1920, 1080))  # portrait kiosk, landscape
+
+_MAGIC = b"RBG1"
+_HEADER = struct.Struct("<4sHHqq")  # magic, width, height, source mtime_ns, source size
+
+
+def raw_path(name, size, assets_dir=ASSETS_DIR):
+    stem = os.path.splitext(name)[0]
+    return os.path.join(assets_dir, f"{stem}.{size[0]}x{size[1]}.rgb")
+
+
+def _stamp(src):
+    st = os.stat(src)
+    return st.st_mtime_ns, st.st_size
+
+
+def scale_source(src, size):
+    """Decode and scale src to exactly size (RGB); JPEGs are decoded in draft mode first."""
+    img = Image.open(src)
+    if img.format == "JPEG":
+        img.draft("RGB", size)  # only shrinks: never below the requested size
+    return img.convert("RGB").resize(size, Image.LANCZOS)
+
+
+def write_raw(img, path, stamp):
+    """Store an RGB image as header + raw rows (written to a temp file, then renamed)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, img.width, img.height, *stamp))
+        f.write(img.tobytes())
+    os.replace(tmp, path)
+
+
+def read_raw(path, stamp=None):
+    """The image in a raw file (backed by an mmap of it), or None if missing, corrupt or stale."""
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(mm) < _HEADER.size:
+        return None
+    magic, w, h, mtime_ns, src_size = _HEADER.unpack_from(mm)
+    if magic != _MAGIC or len(mm) != _HEADER.size + w * h * 3:
+        return None
+    if stamp is not None and (mtime_ns, src_size) != stamp:
+        return None
+    return Image.frombuffer("RGB", (w, h), memoryview(mm)[_HEADER.size:], "raw", "RGB", 0, 1)
+
+
+def build(names=BACKGROUNDS, sizes=SCREEN_SIZES, base_dir=BASE_DIR, assets_dir=ASSETS_DIR):
+    """Asset build step: write every (background, screen size) raw file that is missing or stale."""
+    built = []
+    for name in names:
+        src = os.path.join(base_dir, name)
+        if not os.path.exists(src):
+            continue
+        stamp = _stamp(src)
+        for size in sizes:
+            path = raw_path(name, size, assets_dir)
+            if read_raw(path, stamp) is None:
+                write_raw(scale_source(src, size), path, stamp)
+                built.append(path)
+    return built
+
+
+def load_background(name, size, base_dir=BASE_DIR, assets_dir=ASSETS_DIR):
+    """Background `name` at exactly `size`: the pre-scaled raw file, else scaled from the source (and cached)."""
+    src = os.path.join(base_dir, name)
+    stamp = _stamp(src)
+    path = raw_path(name, size, assets_dir)
+    img = read_raw(path, stamp)
+    if img is None:
+        img = scale_source(src, size)
+        try:
+            write_raw(img, path, stamp)
+        except OSError as e:
+            print(f"⚠️ Could not cache background {path}: {e}")
+    return img
+
+
+def load_background_async(root, name, size, on_ready, base_dir=BASE_DIR):
+    """load_background() in a daemon thread; on_ready(image or None) then runs on the Tk thread."""
+    def work():
+        try:
+            img = load_background(name, size, base_dir)
+        except Exception as e:
+            print(f"⚠️ Failed to load background image '{name}': {e}")
+            img = None
+        try:
+            root.after(0, on_ready, img)
+        except RuntimeError:
+            pass  # window closed before the background was ready
+    threading.Thread(target=work, daemon=True).start()
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    if sys.argv[1:] == ["build"]:
+        built = build()
+        print(f"{len(built)} background(s) written to {ASSETS_DIR}", *built, sep="\n  ")
+        sys.exit()
+
+    assets = tempfile.mkdtemp()
+    for name in BACKGROUNDS:
+        src = os.path.join(BASE_DIR, name)
+        if not os.path.exists(src):
+            continue
+        size = SCREEN_SIZES[0]
+        t0 = time.perf_counter()
+        Image.open(src).convert("RGB").resize(size, Image.LANCZOS)
+        t_full = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        scale_source(src, size)
+        t_draft = time.perf_counter() - t0
+        build((name,), (size,), assets_dir=assets)
+        t0 = time.perf_counter()
+        img = load_background(name, size, assets_dir=assets)
+        t_map = time.perf_counter() - t0
+        img.tobytes()  # what the PhotoImage copy costs on top
+        t_raw = time.perf_counter() - t0
+        print(f"{name} -> {size[0]}x{size[1]}: full decode + resize {t_full * 1000:.1f} ms, "
+              f"draft/fallback {t_draft * 1000:.1f} ms, pre-scaled {t_map * 1000:.2f} ms "
+              f"({t_raw * 1000:.1f} ms reading every pixel)")
@@ -9,10 +9,17 @@ import os
 import time
 import json
 import threading
-import serial
 import customtkinter as ctk
 from customtkinter import CTkImage
-from PIL import Image, ImageTk
+from serial_ingest import open_serial, iter_chunks, LatencyMeter, READ_TIMEOUT
+from shoe_tokenizer import ShoeTokenizer
+from history_writer import HistoryWriter
+from session_restore import session_marker
+from cards import RANK, card_ids_from_map
+from bead_plate import BeadPlate, AB_STYLES
+from card_atlas import CardAtlas, AB_SIZES, PENDING
+from backgrounds import load_background_async
+from overlay import ResultOverlay
 
 # ------------------ Configuration ------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -26,49 +33,35 @@ try:
 except Exception as e:
     print("Failed to load card_map.json:", e)
     card_map = {}
+card_ids = card_ids_from_map(card_map)  # shoe code -> card id (see cards.py)
+tokenizer = ShoeTokenizer(card_map)
 
-# Try opening serial port (non-blocking)
+# Open serial port (blocking reads with a short timeout; see serial_ingest)
 SERIAL_PORT = "COM3"
 BAUDRATE = 9600
-try:
-    ser = serial.Serial(SERIAL_PORT, BAUDRATE, timeout=0)  # non-blocking read
-    print(f"✅ Connected to serial port {SERIAL_PORT}")
-except Exception as e:
-    print("⚠️ Serial not connected:", e)
-    ser = None
+ser = open_serial(SERIAL_PORT, BAUDRATE, READ_TIMEOUT)
+latency = LatencyMeter()
+history = HistoryWriter(os.path.join(BASE_DIR, "andar_history.txt"))  # background appender; closed in on_close
+history.write(session_marker())  # this run starts with empty counters: a new session (session_restore.py)
 
 # ------------------ State ------------------
 joker_card = None
+joker_rank = None       # RANK[] of the joker card id
 side_toggle = True  # True -> ANDAR, False -> BAHAR
 game_over = False
-winner_popup = None
 BEAD_ROWS = 10
+BEAD_WIDTH = 1040  # visible width of the bead plate in the 1080 px window; its column slots must fit in it
 bead_columns = []
 game_counter = 0
-_image_cache = {}
 stop_event = threading.Event()
 andar_count = 0
 bahar_count = 0
 
 
 # ------------------ Helpers ------------------
-def card_rank(card_name: str):
-    """Normalize card rank (used for matching)."""
-    if not card_name:
-        return ""
-    name = os.path.splitext(os.path.basename(card_name))[0].lower()
-    if "_" in name:
-        return name.split("_")[-1]
-    else:
-        return ''.join(ch for ch in name if ch.isalnum()).rstrip("shcd")
-
-
 def save_history_compact(symbol):
-    try:
-        with open(os.path.join(BASE_DIR, "andar_history.txt"), "a", encoding="utf-8") as f:
-            f.write(symbol + "\n")
-    except Exception:
-        pass
+    """Queue one A/B symbol for andar_history.txt (written by the history thread)."""
+    history.write(symbol)
 
 # ------------------ Root and Frame Setup ------------------
 
@@ -82,22 +75,24 @@ ctk.set_appearance_mode("system")
 root = ctk.CTk()
 root.geometry("1080x1920")
 root.title("Mr. Pillai — Andar Bahar")
+result_overlay = ResultOverlay(root)  # built once; show_popup() only reconfigures it
 
 # 1. Main container frame must be transparent and cover the root window
 main_frame = ctk.CTkFrame(root, fg_color="transparent")
 main_frame.place(relx=0.5, rely=0.5, anchor="center", relwidth=1, relheight=1)
-# 2. Load and place the background image inside the main_frame
-bg_path = os.path.join(BASE_DIR, "a.jpg")
-bg_label = None # Initialize to None in case of failure
+# 2. Place the background label inside the main_frame; the window shows at
+#    once and the pre-scaled a.jpg is swapped in when loaded (a missing
+#    file is reported by backgrounds.py and the window carries on without it)
+# CRITICAL FIX: Parent the background image to main_frame
+bg_label = ctk.CTkLabel(main_frame, text="")
+bg_label.place(relx=0.5, rely=0.5, anchor="center",relwidth=1, relheight=1)
 
-try:
-    bg_img = ctk.CTkImage(Image.open(bg_path), size=(1080, 1920))
-    # CRITICAL FIX: Parent the background image to main_frame
-    bg_label = ctk.CTkLabel(main_frame, image=bg_img)
-    bg_label.place(relx=0.5, rely=0.5, anchor="center",relwidth=1, relheight=1)
-except Exception as e:
-    print(f"⚠️ Failed to load background image 'a.jpg': {e}")
-    # Handle the error gracefully if the image file is missing
+def set_background(img):
+    """Swap the background in once backgrounds.py has it (None: keep the plain window)."""
+    if img is not None:
+        bg_label.configure(image=ctk.CTkImage(light_image=img, dark_image=img, size=img.size))
+
+load_background_async(root, "a.jpg", (1080, 1920), set_background)
 
 # ------------------ WIDGET DEFINITIONS (ALL PARENTED TO main_frame) ------------------
 
@@ -199,7 +194,9 @@ ctk.CTkButton(main_frame, text="Manual Bahar (2)", width=160,  # <-- FIXED: Pare
 # history
 bead_canvas = ctk.CTkCanvas(main_frame, height=160, # <-- FIXED: Parent is main_frame
                             highlightthickness=0,)
-bead_canvas.place(relx=0.5, rely=0.75, anchor="center", width=1200)
+bead_canvas.place(relx=0.5, rely=0.75, anchor="center", width=BEAD_WIDTH)
+bead = BeadPlate(bead_canvas, bead_columns, BEAD_ROWS, AB_STYLES,
+                 max_width=BEAD_WIDTH)  # incremental; redraw() only on startup
 
 # ------------------ Final Layering and Run ------------------
 
@@ -207,98 +204,43 @@ bead_canvas.place(relx=0.5, rely=0.75, anchor="center", width=1200)
 
 
 # ------------------ Image loading / caching ------------------
-def load_ctk_image(card_name, target_w=180, target_h=260):
-    # ... (function body unchanged) ...
-    """Load a PNG from cards/ into a CTkImage (cached)."""
-    if not card_name:
-        return None
-    key = f"{card_name}_{target_w}x_{target_h}"
-    if key in _image_cache:
-        return _image_cache[key]
-    img_path = os.path.join(CARDS_DIR, f"{card_name}.png")
-    if not os.path.exists(img_path):
-        _image_cache[key] = None
-        return None
-    try:
-        pil_img = Image.open(img_path).convert("RGBA")
-        ratio = pil_img.width / pil_img.height
-        if ratio > (target_w / target_h):
-            new_w = target_w
-            new_h = int(target_w / ratio)
-        else:
-            new_h = target_h
-            new_w = int(target_h * ratio)
-        pil_img = pil_img.resize((new_w, new_h), Image.LANCZOS)
-        ctk_img = CTkImage(light_image=pil_img, dark_image=pil_img, size=(new_w, new_h))
-        _image_cache[key] = ctk_img
-        return ctk_img
-    except Exception as e:
-        print("Image load error:", e)
-        _image_cache[key] = None
-        return None
-
-
-def set_card_widget(widget, card_name):
-    # ... (function body unchanged) ...
-    """Safely set a CTkLabel widget to show a card image or text fallback."""
-    img = load_ctk_image(card_name)
+def _ctk_card(pil_img):
+    return CTkImage(light_image=pil_img, dark_image=pil_img, size=pil_img.size)
+
+card_atlas = CardAtlas(CARDS_DIR, AB_SIZES, wrap=_ctk_card)  # every card at both sizes, decoded once
+card_atlas.preload(card_map.values())
+
+def set_card_widget(widget, card_name, target_w=180, target_h=260):
+    """Show a card from the atlas on a CTkLabel (card name as text when there is no PNG).
+
+    Tk thread only, and never decodes there: a card the cache does not hold
+    shows its name until the atlas worker has decoded it, then the image is
+    swapped in.
+    """
+    widget.card_name = card_name
+    img = card_atlas.peek(card_name, target_w, target_h,
+                          lambda i: root.after(0, show_card, widget, card_name, i))
+    show_card(widget, card_name, None if img is PENDING else img)
+
+
+def show_card(widget, card_name, img):
+    if getattr(widget, "card_name", None) != card_name:
+        return  # the label has moved on to another card since
     if img:
         widget.configure(image=img, text="")
-        widget.image = img
     else:
         widget.configure(image=None, text=card_name or "(no image)")
+    widget.image = img
 
 
 # ------------------ Bead drawing ------------------
 def draw_bead_plate():
-    # ... (function body unchanged) ...
-    try:
-        bead_canvas.delete("all")
-    except Exception:
-        pass
-    cols = max(1, len(bead_columns))
-    cell_w = 34
-    cell_h = 34
-    pad_x = 8
-    pad_y = 12
-    width = cols * (cell_w + 8) + pad_x * 2
-    height = BEAD_ROWS * (cell_h + 6) + pad_y * 2
-    try:
-        bead_canvas.configure(width=min(width, 1200), height=height)
-    except Exception:
-        pass
-    for ci, col in enumerate(bead_columns):
-        for ri in range(BEAD_ROWS):
-            x = pad_x + ci * (cell_w + 8)
-            y = pad_y + ri * (cell_h + 6)
-            bead_canvas.create_rectangle(x, y, x + cell_w, y + cell_h, fill="#02221b", outline="#00160f")
-            if ri < len(col):
-                val = col[ri]
-                if val == "A":
-                    fill = "#2bd6a6"
-                    txt = "A"
-                    txt_color = "#002218"
-                else:
-                    fill = "#ff6b6b"
-                    txt = "B"
-                    txt_color = "#3a0000"
-                cx = x + cell_w // 2
-                cy = y + cell_h // 2
-                r = min(cell_w, cell_h) // 2 - 4
-                bead_canvas.create_oval(cx - r, cy - r, cx + r, cy + r, fill=fill, outline="#001614")
-                bead_canvas.create_text(cx, cy, text=txt, fill=txt_color, font=("Consolas", 20, "bold"))
+    """Full redraw of the bead plate (startup); new results go through append_bead()."""
+    bead.redraw()
 
 
 def append_bead(symbol):
-    # ... (function body unchanged) ...
-    if not bead_columns:
-        bead_columns.append([])
-    last = bead_columns[-1]
-    if len(last) < BEAD_ROWS:
-        last.append(symbol)
-    else:
-        bead_columns.append([symbol])
-    draw_bead_plate()
+    bead.append(symbol)  # draws only the new bead
     save_history_compact(symbol)
 
 
@@ -327,13 +269,13 @@ def manual_result(side):
     show_popup(f"{side} WINS!")
 
 
-def evaluate_for_match(card_name, side):
+def evaluate_for_match(card_id, side):
     # ... (function body unchanged) ...
     global game_over, game_counter, andar_count, bahar_count
-    if game_over or not joker_card:
+    if game_over or joker_rank is None:
         return
 
-    if card_rank(card_name) == card_rank(joker_card):
+    if RANK[card_id] == joker_rank:
         game_over = True
         symbol = "A" if side == "ANDAR" else "B"
 
@@ -353,33 +295,7 @@ def evaluate_for_match(card_name, side):
 
 
 def show_popup(text):
-    # ... (function body unchanged) ...
-    global winner_popup
-    # small animated popup
-    try:
-        if winner_popup and winner_popup.winfo_exists():
-            winner_popup.destroy()
-    except Exception:
-        pass
-    winner_popup = ctk.CTkToplevel(root)
-    winner_popup.overrideredirect(True)
-    winner_popup.configure(fg_color="#00271f", corner_radius=12)
-    lbl = ctk.CTkLabel(winner_popup, text=text, font=ctk.CTkFont(size=22, weight="bold"), text_color="#ffd36e")
-    lbl.pack(ipadx=20, ipady=16)
-    # center
-    x = root.winfo_screenwidth() // 2 - 150
-    y = root.winfo_screenheight() // 2 - 60
-    winner_popup.geometry(f"300x100+{x}+{y}")
-
-    # simple pop scale animation: expand then shrink
-    def close():
-        try:
-            if winner_popup and winner_popup.winfo_exists():
-                winner_popup.destroy()
-        except Exception:
-            pass
-
-    root.after(1400, close)
+    result_overlay.show(text)
 
 
 def log(msg: object) -> None:
@@ -391,16 +307,15 @@ def log(msg: object) -> None:
 
 def reset_game(event=None):
     # ... (function body unchanged) ...
-    global joker_card, side_toggle, game_over, winner_popup
-    if winner_popup and winner_popup.winfo_exists():
-        try:
-            winner_popup.destroy()
-        except Exception:
-            pass
+    global joker_card, joker_rank, side_toggle, game_over
+    result_overlay.hide()
     joker_card = None
+    joker_rank = None
     side_toggle = True
     game_over = False
     joker_text.configure(text="")
+    for lbl in (joker_img_label, andar_img_label, bahar_img_label):
+        lbl.card_name = None  # an image still decoding is not shown
     joker_img_label.configure(text="NEXT ROUND", image=None)
     andar_img_label.configure(text="", image=None)
     bahar_img_label.configure(text="", image=None)
@@ -414,99 +329,44 @@ root.bind("2", lambda e: manual_result("BAHAR"))
 # ------------------ Serial reader (robust) ------------------
 def serial_reader():
     # ... (function body unchanged) ...
-    global joker_card, side_toggle, game_over
-    buffer = ""
-    while not stop_event.is_set():
-        if not ser:
-            time.sleep(1)
-            continue
+    # iter_chunks blocks in the driver until bytes arrive and drains them in one read;
+    # the tokenizer finds card_map codes in one pass, framed by \r/\n or not
+    for data, t_arrival in iter_chunks(ser, stop_event):
         try:
-            # read any available bytes; non-blocking
-            n = ser.in_waiting or 1
-            data = ser.read(n).decode(errors="ignore")
-            if not data:
-                time.sleep(0.02)
-                continue
-            buffer += data
-            # Many shoe devices send 2-4 char tokens. We'll try to extract tokens from buffer.
-            # Strategy: split by common separators if present, otherwise take 2-4 char chunks.
-            # First handle if shoe sends separators like \r or \n:
-            while '\n' in buffer or '\r' in buffer:
-                # split on first newline-ish
-                idx_n = min([i for i in (buffer.find('\n'), buffer.find('\r')) if i != -1])
-                token = buffer[:idx_n].strip()
-                buffer = buffer[idx_n + 1:]
-                if token:
-                    process_token(token)
-            # If no separators, try to take 2..4 char chunks while buffer length allows
-            while len(buffer) >= 2:
-                # many tokens are 2 (e.g. AH) or 3 (10S). We'll attempt 2..4 try-match approach.
-                taken = False
-                for L in (2, 3, 4):
-                    if len(buffer) >= L:
-                        candidate = buffer[:L].strip()
-                        if candidate in card_map:
-                            process_token(candidate)
-                            buffer = buffer[L:]
-                            taken = True
-                            break
-                if not taken:
-                    # no match with fixed-length prefixes; if buffer is long, drop first char to resync
-                    if len(buffer) > 8:
-                        buffer = buffer[1:]
-                    break
+            for token in tokenizer.feed(data):
+                process_token(token)
+                latency.add(t_arrival)
         except Exception as e:
             print("Serial Read Error:", e)
-            time.sleep(0.1)
-        time.sleep(0.01)
 
 
 def process_token(raw_token):
     # ... (function body unchanged) ...
     """Handle a token read from serial (mapped via card_map)."""
-    global joker_card, side_toggle, game_over
+    global joker_card, joker_rank, side_toggle, game_over
     token = raw_token.strip()
     if not token:
         return
-    print("[DEBUG] token:", repr(token))
-    if token not in card_map:
+    if token not in card_ids:
         root.after(0, status_label.configure, {"text": f"Unknown raw token: {token}"})
         return
     card_name = card_map[token]
+    card_id = card_ids[token]
     root.after(0, status_label.configure, {"text": f"Card detected: {card_name}"})
     if not joker_card:
         joker_card = card_name
+        joker_rank = RANK[card_id]
         root.after(0, joker_text.configure, {"text": f"Joker: {card_name}"})
-        img = load_ctk_image(card_name, target_w=200, target_h=280)
-
-        # --- FIXED: Ensure all widget updates happen in the main thread ---
-        if img:
-            def update_joker(w, i):
-                w.configure(image=i, text="")
-                w.image = i  # <--- Critical: Set reference in main thread
-
-            root.after(0, update_joker, joker_img_label, img)
-        else:
-            root.after(0, joker_img_label.configure, {"text": card_name, "image": None})
+        root.after(0, set_card_widget, joker_img_label, card_name, 200, 280)  # atlas lookup on the Tk thread
 
         log(f"Joker set → {card_name}")
     else:
         side = "ANDAR" if side_toggle else "BAHAR"
         target_widget = andar_img_label if side_toggle else bahar_img_label
-        img = load_ctk_image(card_name)
-
-        # --- FIXED: Ensure all widget updates happen in the main thread ---
-        if img:
-            def update_card(w, i):
-                w.configure(image=i, text="")
-                w.image = i  # <--- Critical: Set reference in main thread
-
-            root.after(0, update_card, target_widget, img)
-        else:
-            root.after(0, target_widget.configure, {"text": card_name, "image": None})
+        root.after(0, set_card_widget, target_widget, card_name)
 
         # Use thread-safe call to evaluate_for_match
-        root.after(0, evaluate_for_match, card_name, side)
+        root.after(0, evaluate_for_match, card_id, side)
         side_toggle = not side_toggle
         log(f"Card dealt → {card_name} ({side})")
 
@@ -515,6 +375,9 @@ def process_token(raw_token):
 def on_close():
     # ... (function body unchanged) ...
     stop_event.set()
+    print(latency.summary())
+    print(card_atlas.cache.summary())
+    history.close()
     try:
         if ser and getattr(ser, "is_open", False):
             ser.close()
@@ -0,0 +1,227 @@
+# bead_plate.py
+"""
+Virtualised, incremental bead plate renderer for the Tk canvas front-ends.
+- Canvas items exist only for the columns in view: as many slots as fit in
+  max_width, each slot holding one image item per row. Item count and draw
+  cost stay the same however long the history grows
+- Each cell is a pre-rendered sprite (sprites.SPRITES: background, bead and
+  letter in one antialiased image), so painting a cell is one itemconfigure
+- append() swaps just the new bead's image; when a new column starts
+  while following the newest results, the whole window slides one column
+  (one canvas.move) and the slot that fell off the left is reused on the right
+- The wheel (Shift+wheel too) scrolls back through older columns by
+  repainting the existing slots; scrolling back to the end follows again
+- The symbol columns are the front-end's own bead_columns list (shared,
+  not copied): code that rebuilds or clears that list calls redraw()
+- Any column height works (6 rows in most scripts, 10 in bb.py); set_rows()
+  re-flows the beads, set_cell() changes the cell size; sprites are
+  rendered again only for a new cell size or screen DPI
+- AB_STYLES / BACCARAT_STYLES hold the colours the front-ends used
+
+Run this file directly (needs a display) to time appends on a real canvas.
+"""
+
+from sprites import SPRITES, pt_to_px
+
+AB_STYLES = {"A": ("#2bd6a6", "#002218"), "B": ("#ff6b6b", "#3a0000")}
+BACCARAT_STYLES = {"P": ("#2bd6a6", "#002218"), "B": ("#ff6b6b", "#3a0000"), "T": ("#cdd9b6", "#07240f")}
+
+CELL_FILL = "#02221b"
+CELL_OUTLINE = "#00160f"
+BEAD_OUTLINE = "#001614"
+TAG = "bead"
+
+
+class BeadPlate:
+    """Bead plate on a canvas: columns of `rows` beads filled top to bottom, newest on the right."""
+
+    def __init__(self, canvas, columns, rows=6, styles=AB_STYLES, cell=34, gap_x=8, gap_y=6,
+                 pad_x=8, pad_y=12, font=("Consolas", 20, "bold"), max_width=1200):
+        self.canvas = canvas
+        self.columns = columns
+        self.rows = rows
+        self.styles = styles
+        self.cell = cell
+        self.gap_x = gap_x
+        self.gap_y = gap_y
+        self.pad_x = pad_x
+        self.pad_y = pad_y
+        self.font = font
+        self.max_width = max_width
+        self.first = 0  # column shown in the leftmost slot
+        self.follow = True  # keep the newest column in view
+        self._slots = []  # left to right on screen: [image item] * rows
+        self._size = None
+        self._font_px = None
+        try:
+            canvas.bind("<MouseWheel>", self._on_wheel)
+            canvas.bind("<Shift-MouseWheel>", self._on_wheel)
+            canvas.bind("<Button-4>", lambda e: self.scroll(-1))  # X11 wheel
+            canvas.bind("<Button-5>", lambda e: self.scroll(1))
+        except Exception:
+            pass
+
+    # ------------------ geometry ------------------
+    @property
+    def capacity(self):
+        """Columns that fit in max_width."""
+        return max(1, (self.max_width - 2 * self.pad_x + self.gap_x) // (self.cell + self.gap_x))
+
+    @property
+    def last_first(self):
+        """self.first when the newest column is the rightmost one in view."""
+        return max(0, len(self.columns) - self.capacity)
+
+    def _fit(self):
+        """Size the canvas to the slots in use (only touches Tk when that changes)."""
+        cols = max(1, len(self._slots))
+        width = cols * (self.cell + self.gap_x) + self.pad_x * 2
+        size = (min(width, self.max_width), self.rows * (self.cell + self.gap_y) + self.pad_y * 2)
+        if size != self._size:
+            self._size = size
+            try:
+                self.canvas.configure(width=size[0], height=size[1])
+            except Exception:
+                pass
+
+    # ------------------ slots ------------------
+    def _sprite(self, symbol):
+        if self._font_px is None:
+            try:
+                dpi = self.canvas.winfo_fpixels("1i")
+            except Exception:
+                dpi = 96
+            self._font_px = pt_to_px(self.font[1], dpi)
+        fill, txt_color = (self.styles.get(symbol) or self.styles["B"]) if symbol is not None else (None, None)
+        return SPRITES.bead(self.canvas, symbol, self.cell, fill, txt_color, self._font_px,
+                            bg=CELL_FILL, outline=CELL_OUTLINE, ring=BEAD_OUTLINE)
+
+    def _new_slot(self):
+        x = self.pad_x + len(self._slots) * (self.cell + self.gap_x)
+        empty = self._sprite(None)
+        self._slots.append([
+            self.canvas.create_image(x, self.pad_y + ri * (self.cell + self.gap_y), image=empty, anchor="nw", tags=TAG)
+            for ri in range(self.rows)
+        ])
+
+    def _paint_cell(self, slot, ri, symbol):
+        self.canvas.itemconfigure(slot[ri], image=self._sprite(symbol))
+
+    def _paint(self, k, ci):
+        """Show column ci (empty past the end) in slot k."""
+        col = self.columns[ci] if ci < len(self.columns) else ()
+        for ri in range(self.rows):
+            self._paint_cell(self._slots[k], ri, col[ri] if ri < len(col) else None)
+
+    def _render(self):
+        while len(self._slots) < min(self.capacity, len(self.columns)):
+            self._new_slot()
+        for k in range(len(self._slots)):
+            self._paint(k, self.first + k)
+        self._fit()
+
+    def _slide(self):
+        """Following: move the window one column right, reusing the leftmost slot."""
+        step = self.cell + self.gap_x
+        slot = self._slots.pop(0)
+        self.canvas.move(TAG, -step, 0)
+        for item in slot:
+            self.canvas.move(item, len(self._slots) * step + step, 0)
+        self._slots.append(slot)
+        self.first += 1
+        self._paint(len(self._slots) - 1, self.first + len(self._slots) - 1)
+
+    # ------------------ public ------------------
+    def append(self, symbol):
+        """Add one result to the columns and draw just that bead."""
+        if not self.columns or len(self.columns[-1]) >= self.rows:
+            self.columns.append([])
+        col = self.columns[-1]
+        col.append(symbol)
+        ci = len(self.columns) - 1
+        if self.follow and self.first != self.last_first:
+            if self.last_first == self.first + 1 and len(col) == 1:
+                self._slide()
+            else:
+                self.first = self.last_first
+                self._render()
+            return
+        if len(self._slots) < min(self.capacity, len(self.columns)):
+            self._new_slot()
+            self._fit()
+        k = ci - self.first
+        if 0 <= k < len(self._slots):
+            self._paint_cell(self._slots[k], len(col) - 1, symbol)
+
+    def redraw(self):
+        """Throw away every item and draw the window from scratch (after bead_columns was rebuilt)."""
+        try:
+            self.canvas.delete("all")
+        except Exception:
+            pass
+        self._slots = []
+        self._size = None
+        self._font_px = None  # re-read the DPI: scaling may have changed
+        self.first = self.last_first if self.follow else min(self.first, self.last_first)
+        self._render()
+
+    def clear(self):
+        self.columns.clear()
+        self.follow = True
+        self.redraw()
+
+    def scroll(self, delta):
+        """Scroll by delta columns (negative = older); reaching the newest column follows again."""
+        first = min(max(0, self.first + delta), self.last_first)
+        self.follow = first == self.last_first
+        if first != self.first:
+            self.first = first
+            self._render()
+
+    def _on_wheel(self, event):
+        self.scroll(-1 if event.delta > 0 else 1)
+
+    def set_rows(self, rows):
+        """New column height: re-flow the beads into columns of `rows` and redraw."""
+        if rows == self.rows:
+            return
+        flat = [s for col in self.columns for s in col]
+        self.rows = rows
+        self.columns[:] = [flat[i:i + rows] for i in range(0, len(flat), rows)]
+        self.redraw()
+
+    def set_cell(self, cell):
+        """New cell size (e.g. after a window resize): redraw at the new size."""
+        if cell != self.cell:
+            self.cell = cell
+            self.redraw()
+
+
+if __name__ == "__main__":
+    import time
+    import random
+    import tkinter as tk
+
+    root = tk.Tk()
+    canvas = tk.Canvas(root, bg="#011814", highlightthickness=0)
+    canvas.pack()
+    rnd = random.Random(16)
+    for rows in (6, 10):
+        plate = BeadPlate(canvas, [], rows=rows)
+        plate.redraw()
+        for total in (100, 10_000, 100_000):
+            while sum(len(c) for c in plate.columns) < total - 60:
+                plate.append(rnd.choice("AB"))
+            t0 = time.perf_counter()
+            for _ in range(60):
+                plate.append(rnd.choice("AB"))
+                root.update_idletasks()
+            dt = (time.perf_counter() - t0) / 60
+            print(f"{rows} rows, {total:6d} beads: {dt * 1000:.3f} ms per append, "
+                  f"{len(canvas.find_all())} canvas items")
+        t0 = time.perf_counter()
+        for _ in range(50):
+            plate.scroll(-1)
+            root.update_idletasks()
+        print(f"  scroll back one column: {(time.perf_counter() - t0) / 50 * 1000:.3f} ms")
+    root.destroy()
@@ -0,0 +1,294 @@
+# binary_history.py
+"""
+Compact binary history files (.rbh) for Andar Bahar and baccarat archives.
+- Results are 2 bits per round (A/B or P/B/T), four rounds per byte
+- Card detail is one fixed-width byte per card: card id (0..51, cards.py) in
+  the low 6 bits, side in the top 2 (JOKER/ANDAR/BAHAR or PLAYER/BANKER)
+- With card detail, one count byte per round says how many card records it
+  has, and the header carries a block index: the first card record of
+  every BLOCK_ROUNDS rounds, so any round range is found with one index
+  lookup plus a sum over at most one block of counts, then decoded straight
+  from a memory map without reading the rest of the file
+- Results-only files (andar_history.txt has no cards) skip counts and
+  index: 2 bits per round and nothing else
+- convert_andar_text() / convert_baccarat_text() turn the existing history
+  text files into this format; export_symbols() writes the compact A/B or
+  P/B/T text back out
+
+Layout (little-endian):
+    header    "<4sBBBxHII": magic, version, game, flags, block_rounds, rounds, blocks
+    index     blocks x u32: card record number of each block's first round
+    results   ceil(rounds / 4) bytes, round i in bits 2*(i % 4) of byte i // 4
+    counts    rounds bytes          (only with FLAG_CARDS; blocks is 0 without)
+    cards     one byte per card record
+
+Run this file directly to convert a history text file, e.g.
+    python binary_history.py andar_history.txt andar_history.rbh
+or with no arguments to time a 10-million-round archive.
+"""
+
+import re
+import mmap
+import struct
+
+from cards import NAMES
+from history_parser import parse_file
+
+MAGIC = b"RBH1"
+VERSION = 1
+GAME_AB = 0
+GAME_BACCARAT = 1
+FLAG_CARDS = 1
+BLOCK_ROUNDS = 4096
+
+_HEADER = struct.Struct("<4sBBBxHII")
+
+# 2-bit result codes; 0 is never written
+SYMBOLS = {GAME_AB: ("", "A", "B", ""), GAME_BACCARAT: ("", "P", "B", "T")}
+RESULTS = {GAME_AB: ("", "ANDAR", "BAHAR", ""), GAME_BACCARAT: ("", "PLAYER", "BANKER", "TIE")}
+# side in the top 2 bits of a card record
+SIDES = {GAME_AB: ("JOKER", "ANDAR", "BAHAR", ""), GAME_BACCARAT: ("", "PLAYER", "BANKER", "")}
+
+# byte -> its four symbols, so decoding is one lookup per four rounds
+_QUADS = {game: tuple("".join(sym[(b >> s) & 3] or "?" for s in (0, 2, 4, 6)) for b in range(256))
+          for game, sym in SYMBOLS.items()}
+
+
+def _pack(codes):
+    """One 2-bit code per byte -> four per byte."""
+    codes = bytes(codes) + bytes(-len(codes) % 4)
+    return bytes(a | b << 2 | c << 4 | d << 6 for a, b, c, d in zip(codes[0::4], codes[1::4], codes[2::4], codes[3::4]))
+
+
+def _write(path, game, block_rounds, codes, counts=None, card_bytes=b""):
+    flags = FLAG_CARDS if counts is not None else 0
+    index = []
+    if counts is not None:
+        pos = 0
+        for b in range(0, len(codes), block_rounds):
+            index.append(pos)
+            pos += sum(counts[b:b + block_rounds])
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, game, flags, block_rounds, len(codes), len(index)))
+        f.write(struct.pack(f"<{len(index)}I", *index))
+        f.write(_pack(codes))
+        if counts is not None:
+            f.write(counts)
+            f.write(card_bytes)
+    return len(codes)
+
+
+def write_history(path, game, rounds, block_rounds=BLOCK_ROUNDS):
+    """Write rounds to a new .rbh file; returns the number of rounds.
+
+    rounds is an iterable of (result, cards): result is a symbol ("A", "P",
+    ...) or name ("ANDAR", ...), cards a sequence of (card_id, side). Card
+    detail is only stored if some round has cards.
+    """
+    codes = {}
+    for table in (SYMBOLS[game], RESULTS[game]):
+        codes.update((name, code) for code, name in enumerate(table) if name)
+    side_codes = {name: code for code, name in enumerate(SIDES[game]) if name}
+    results = bytearray()
+    counts = bytearray()
+    card_bytes = bytearray()
+    for n, (result, cards) in enumerate(rounds):
+        results.append(codes[result])
+        if len(cards) > 255:
+            raise ValueError(f"round {n}: {len(cards)} cards, at most 255 fit")
+        counts.append(len(cards))
+        card_bytes.extend(cid | side_codes[side] << 6 for cid, side in cards)
+    return _write(path, game, block_rounds, results, counts if card_bytes else None, card_bytes)
+
+
+def write_symbols(path, game, symbols, block_rounds=BLOCK_ROUNDS):
+    """Write a results-only .rbh file from a symbol string ("ABBA...", "PBPT..."); returns the number of rounds."""
+    table = bytearray(256)
+    for code, sym in enumerate(SYMBOLS[game]):
+        if sym:
+            table[ord(sym)] = code
+    codes = symbols.encode("ascii").translate(table)
+    if 0 in codes:
+        raise ValueError(f"not a {'/'.join(filter(None, SYMBOLS[game]))} symbol at round {codes.index(0)}")
+    return _write(path, game, block_rounds, codes)
+
+
+class BinaryHistory:
+    """Read-only, memory-mapped view of one .rbh file; use as a context manager."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise ValueError(f"{path}: not a binary history file")
+        if self._mm.size() < _HEADER.size or self._mm[:4] != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: not a binary history file")
+        _, version, self.game, flags, self.block_rounds, self.rounds, blocks = _HEADER.unpack_from(self._mm, 0)
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: unsupported version {version}")
+        self.index = struct.unpack_from(f"<{blocks}I", self._mm, _HEADER.size)
+        self._results_at = _HEADER.size + 4 * blocks
+        self.has_cards = bool(flags & FLAG_CARDS)
+        self._counts_at = self._results_at + (self.rounds + 3) // 4
+        self._cards_at = self._counts_at + self.rounds
+
+    def __len__(self):
+        return self.rounds
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def _range(self, start, stop):
+        stop = self.rounds if stop is None else min(stop, self.rounds)
+        return max(0, start), max(0, start, stop)
+
+    def symbols(self, start=0, stop=None):
+        """Results of rounds start..stop-1 as a symbol string ("ABBA...", "PBPT...")."""
+        start, stop = self._range(start, stop)
+        if start == stop:
+            return ""
+        quads = _QUADS[self.game]
+        chunk = self._mm[self._results_at + start // 4:self._results_at + (stop + 3) // 4]
+        text = "".join(map(quads.__getitem__, chunk))
+        return text[start % 4:start % 4 + stop - start]
+
+    def _card_offset(self, i):
+        """Card record number of round i: block index plus the counts before it in its block."""
+        first = i - i % self.block_rounds
+        return self.index[i // self.block_rounds] + sum(self._mm[self._counts_at + first:self._counts_at + i])
+
+    def rounds_range(self, start=0, stop=None):
+        """Yield (result, [(card_id, side), ...]) for rounds start..stop-1, result as a name (ANDAR, TIE...)."""
+        start, stop = self._range(start, stop)
+        if start == stop:
+            return
+        names = RESULTS[self.game]
+        if not self.has_cards:
+            for i in range(start, stop):
+                yield names[(self._mm[self._results_at + i // 4] >> (2 * (i % 4))) & 3], []
+            return
+        sides = SIDES[self.game]
+        pos = self._cards_at + self._card_offset(start)
+        counts = self._mm[self._counts_at + start:self._counts_at + stop]
+        for i, n in enumerate(counts, start):
+            code = (self._mm[self._results_at + i // 4] >> (2 * (i % 4))) & 3
+            recs = self._mm[pos:pos + n]
+            pos += n
+            yield names[code], [(b & 63, sides[b >> 6]) for b in recs]
+
+    def round(self, i):
+        """(result, cards) of round i."""
+        if not 0 <= i < self.rounds:
+            raise IndexError(i)
+        return next(self.rounds_range(i, i + 1))
+
+
+# ------------------ converters from the text history files ------------------
+_SYMBOL_LINE = re.compile(r"^\s*([A-Z])\s*$")
+
+
+def iter_andar_text(path):
+    """(symbol, []) for every A/B line of an andar_history.txt; markers and other lines are skipped."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            m = _SYMBOL_LINE.match(line)
+            if m and m.group(1) in "AB":
+                yield m.group(1), []
+
+
+def iter_baccarat_text(path):
+    """(result, cards) for every round of a baccarat_history.txt (history_parser does the reading).
+
+    Compact P/B/T lines and manual results have no cards; round summaries
+    keep the player's cards, then the banker's.
+    """
+    for batch in parse_file(path):
+        for i, winner in batch.results():
+            cards = [(c, "PLAYER") for c in batch.hand(i)] + [(c, "BANKER") for c in batch.hand(i, player=False)]
+            yield winner, cards
+
+
+def convert_andar_text(src, dst, block_rounds=BLOCK_ROUNDS):
+    """andar_history.txt -> results-only .rbh; returns the number of rounds."""
+    return write_symbols(dst, GAME_AB, "".join(sym for sym, _ in iter_andar_text(src)), block_rounds)
+
+
+def convert_baccarat_text(src, dst, block_rounds=BLOCK_ROUNDS):
+    """baccarat_history.txt -> .rbh; returns the number of rounds."""
+    return write_history(dst, GAME_BACCARAT, iter_baccarat_text(src), block_rounds)
+
+
+def export_symbols(src, dst, chunk=1 << 20):
+    """.rbh -> compact text history (one symbol per line, like the front-ends write)."""
+    with BinaryHistory(src) as h, open(dst, "w", encoding="utf-8") as f:
+        for start in range(0, len(h), chunk):
+            f.write("".join(s + "\n" for s in h.symbols(start, start + chunk)))
+    return len(h)
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import time
+    import random
+    import tempfile
+
+    if len(sys.argv) == 3:
+        src, dst = sys.argv[1:]
+        convert = convert_baccarat_text if "bac" in os.path.basename(src).lower() else convert_andar_text
+        n = convert(src, dst)
+        print(f"{src} ({os.path.getsize(src):,} bytes) -> {dst} ({os.path.getsize(dst):,} bytes), {n:,} rounds")
+        with BinaryHistory(dst) as h:
+            print("last rounds:", h.symbols(max(0, n - 40)))
+        sys.exit()
+
+    n = 10_000_000
+    tmp = tempfile.mkdtemp()
+    rnd = random.Random(13)
+    syms = "".join(rnd.choice("AB") for _ in range(n))
+    text = os.path.join(tmp, "andar_history.txt")
+    with open(text, "w", encoding="utf-8") as f:
+        f.write("".join(s + "\n" for s in syms))
+
+    t0 = time.perf_counter()
+    convert_andar_text(text, os.path.join(tmp, "ab.rbh"))
+    dt = time.perf_counter() - t0
+    print(f"{n:,} A/B rounds: text {os.path.getsize(text) / 1e6:.1f} MB -> "
+          f"binary {os.path.getsize(os.path.join(tmp, 'ab.rbh')) / 1e6:.1f} MB in {dt:.1f} s")
+
+    # baccarat with every card: ~5 cards per round
+    def bac_rounds(k):
+        for _ in range(k):
+            cards = [(rnd.randrange(52), side) for side in ("PLAYER", "BANKER") * rnd.choice((2, 2, 3))]
+            yield rnd.choice("PBT"), cards
+    path = os.path.join(tmp, "bac.rbh")
+    write_history(path, GAME_BACCARAT, bac_rounds(1_000_000))
+    print(f"1,000,000 baccarat rounds with cards: {os.path.getsize(path) / 1e6:.1f} MB")
+
+    with BinaryHistory(os.path.join(tmp, "ab.rbh")) as h:
+        assert h.symbols() == syms
+        t0 = time.perf_counter()
+        for _ in range(1000):
+            i = rnd.randrange(n - 1000)
+            h.symbols(i, i + 1000)
+        print(f"random 1000-round result range: {(time.perf_counter() - t0):.3f} ms each")
+    with BinaryHistory(path) as h:
+        t0 = time.perf_counter()
+        for _ in range(1000):
+            i = rnd.randrange(len(h) - 100)
+            list(h.rounds_range(i, i + 100))
+        print(f"random 100-round range with cards: {(time.perf_counter() - t0):.3f} ms each")
+        result, cards = h.round(len(h) - 1)
+        print("last round:", result, " ".join(f"{NAMES[c]}:{side[0]}" for c, side in cards))
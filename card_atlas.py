@@ -0,0 +1,203 @@
+# card_atlas.py
+"""
+Card face atlas: every card decoded once, resized to every size a front-end
+shows, before the first card is dealt.
+- CardAtlas(cards_dir, sizes, wrap) keeps the images in an ImageCache
+  (image_cache.py: LRU under a byte budget, expiring negative entries, hit /
+  miss counters) keyed by (card id, target_w, target_h, scale)
+- peek() is for the Tk thread and never decodes: a miss returns PENDING,
+  queues the decode on the atlas's worker pool and calls on_ready(image)
+  from the worker. get() decodes a miss on the spot (serial thread, workers)
+- preload(names) decodes in a background thread with a small thread pool
+  (PNG inflate and LANCZOS resize release the GIL): each file is opened
+  once and resized to all the sizes, so the serial thread and the Tk thread
+  never decode a card while a round is running
+- wrap turns the resized PIL image into what the front-end shows (CTkImage
+  for the CustomTkinter scripts; None keeps the PIL image). It must not
+  touch Tk: CTkImage only makes its PhotoImage when a label draws it
+- A missing file is cached as None (until the negative TTL runs out)
+- Without a cache passed in, the atlas sizes its own ImageCache to hold
+  all 52 cards at every size and scale (atlas_bytes()), so a preload on a
+  scaled display never evicts its own entries
+- Images keep their aspect ratio inside target_w x target_h (fit_size);
+  scale multiplies the pixel size for plain PhotoImage front-ends on a
+  scaled display (CTkImage does its own scaling, so those keep 1.0)
+
+Run this file directly to time a preload of the cards/ directory.
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from cards import NAMES, parse_card
+from image_cache import ImageCache, MISS, DEFAULT_BUDGET, image_bytes
+
+# (target_w, target_h) per front-end
+AB_SIZES = ((180, 260), (200, 280))  # abmain, fixed2, canvasab, bb: cards / joker
+BACCARAT_SIZES = ((110, 150),)  # mb, mbmain
+CUSTOM_BACCARAT_SIZES = ((120, 160),)  # custommb
+WORKERS = min(4, os.cpu_count() or 1)
+PENDING = object()  # peek(): not cached yet, decoding in the background
+
+
+def fit_size(w, h, target_w, target_h):
+    """Largest (w, h) with the image's aspect ratio that fits in target_w x target_h."""
+    ratio = w / h
+    if ratio > (target_w / target_h):
+        return target_w, int(target_w / ratio)
+    return int(target_h * ratio), target_h
+
+
+def atlas_bytes(sizes, scale=1.0, cards=len(NAMES)):
+    """Cache bytes for `cards` RGBA faces at every size (bounding boxes, so an upper bound)."""
+    return cards * sum(round(w * scale) * round(h * scale) * 4 for w, h in sizes)
+
+
+class CardAtlas:
+    """Card images by (card id, target_w, target_h, scale), decoded once per name for every size."""
+
+    def __init__(self, cards_dir, sizes, wrap=None, scale=1.0, cache=None):
+        self.cards_dir = cards_dir
+        self.sizes = tuple(sizes)
+        self.wrap = wrap
+        self.scale = scale
+        self.cache = cache if cache is not None else ImageCache(max(DEFAULT_BUDGET, atlas_bytes(self.sizes, scale)))
+        self.ready = threading.Event()
+        self.load_time = None
+        self._ids = {}  # card name -> card id (the name itself if it does not parse)
+        self._pending = {}  # key -> [on_ready] while a peek() miss is decoding
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _key(self, name, target_w, target_h):
+        cid = self._ids.get(name)
+        if cid is None:
+            cid = parse_card(name)
+            cid = self._ids[name] = name if cid is None else cid
+        return (cid, target_w, target_h, self.scale)
+
+    def _decode(self, name, sizes):
+        """Open cards/<name>.png once and cache it at each size (None when missing or unreadable)."""
+        path = os.path.join(self.cards_dir, f"{name}.png")
+        try:
+            img = Image.open(path).convert("RGBA")
+        except FileNotFoundError:
+            img = None
+        except Exception as e:
+            print("Image load error:", e)
+            img = None
+        out = {}
+        for tw, th in sizes:
+            value, nbytes = None, 0
+            if img is not None:
+                sw, sh = round(tw * self.scale), round(th * self.scale)
+                value = img.resize(fit_size(img.width, img.height, sw, sh), Image.LANCZOS)
+                nbytes = image_bytes(value)
+                if self.wrap:
+                    value = self.wrap(value)
+            self.cache.put(self._key(name, tw, th), value, nbytes)
+            out[(tw, th)] = value
+        return out
+
+    def get(self, name, target_w, target_h):
+        """The card at that size, decoded here on a miss: not for the Tk thread (see peek)."""
+        if not name:
+            return None
+        value = self.cache.get(self._key(name, target_w, target_h))
+        if value is MISS:
+            value = self._decode(name, ((target_w, target_h),))[(target_w, target_h)]
+        return value
+
+    def peek(self, name, target_w, target_h, on_ready=None):
+        """Non-blocking get for the Tk thread.
+
+        Returns the cached image (None = no PNG) or PENDING; on PENDING the
+        card is decoded on the worker pool, which then calls on_ready(image)
+        from its own thread (hop back with root.after).
+        """
+        if not name:
+            return None
+        key = self._key(name, target_w, target_h)
+        value = self.cache.get(key)
+        if value is not MISS:
+            return value
+        with self._lock:
+            waiting = self._pending.get(key)
+            if waiting is None:
+                waiting = self._pending[key] = []
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=WORKERS)
+                self._pool.submit(self._decode_pending, key, name, target_w, target_h)
+            if on_ready is not None:
+                waiting.append(on_ready)
+        return PENDING
+
+    def _decode_pending(self, key, name, target_w, target_h):
+        value = self._decode(name, ((target_w, target_h),))[(target_w, target_h)]
+        with self._lock:
+            waiting = self._pending.pop(key, ())
+        for on_ready in waiting:
+            on_ready(value)
+
+    def load(self, names, workers=WORKERS):
+        """Decode every name at every size (blocking); sets ready when done."""
+        t0 = time.perf_counter()
+        names = sorted({n for n in names if n})
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(lambda n: self._decode(n, self.sizes), names))
+        self.load_time = time.perf_counter() - t0
+        self.ready.set()
+
+    def preload(self, names, workers=WORKERS):
+        """load() in a daemon thread; returns at once."""
+        names = list(names)
+        threading.Thread(target=self.load, args=(names, workers), daemon=True).start()
+
+    def __len__(self):
+        return len(self.cache)
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    cards_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "cards")
+    if not os.path.isdir(cards_dir):  # no card art checked out: time synthetic 500x726 faces
+        from cards import NAMES
+        cards_dir = tempfile.mkdtemp()
+        for name in NAMES:
+            Image.effect_noise((500, 726), 60).convert("RGBA").save(os.path.join(cards_dir, f"{name}.png"))
+    names = [os.path.splitext(f)[0] for f in os.listdir(cards_dir) if f.endswith(".png")]
+    sizes = AB_SIZES + BACCARAT_SIZES + CUSTOM_BACCARAT_SIZES
+
+    t0 = time.perf_counter()
+    for name in names:  # the old path: one open + resize per card per size
+        for tw, th in sizes:
+            img = Image.open(os.path.join(cards_dir, f"{name}.png")).convert("RGBA")
+            img.resize(fit_size(img.width, img.height, tw, th), Image.LANCZOS)
+    per_size = time.perf_counter() - t0
+    print(f"{len(names)} cards x {len(sizes)} sizes decoded per size: {per_size * 1000:.0f} ms "
+          f"({per_size / len(names) / len(sizes) * 1000:.1f} ms per first appearance)")
+    for workers in sorted({1, WORKERS}):
+        atlas = CardAtlas(cards_dir, sizes)
+        atlas.load(names, workers)
+        print(f"atlas, {workers} worker(s): {atlas.load_time * 1000:.0f} ms for {len(atlas)} images")
+    t0 = time.perf_counter()
+    for _ in range(100):
+        for name in names:
+            atlas.peek(name, 180, 260)
+    print(f"peek: {(time.perf_counter() - t0) / (100 * len(names)) * 1e6:.2f} us")
+    print(atlas.cache.summary())
+
+    small = CardAtlas(cards_dir, sizes, cache=ImageCache(budget=16 * 180 * 260 * 4))
+    done = threading.Event()
+    t0 = time.perf_counter()
+    pending = sum(small.peek(name, 180, 260, lambda img: None) is PENDING for name in names)
+    print(f"cold peek of {len(names)} cards: {(time.perf_counter() - t0) * 1000:.2f} ms on the calling thread, "
+          f"{pending} queued")
+    small.peek(names[-1], 200, 280, lambda img: done.set())
+    done.wait()
+    small._pool.shutdown(wait=True)
+    print("16-card budget:", small.cache.summary())
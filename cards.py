@@ -0,0 +1,88 @@
+# cards.py
+"""
+Integer card model shared by every front-end.
+- A card id is 0..51: suit * 13 + rank, rank 0 = Ace .. 12 = King
+- RANK / SUIT / POINT / MATCH are plain tuples indexed by card id, built once
+- load_card_ids() turns card_map.json into {shoe code: card id} at startup
+- parse_card() understands every spelling the scripts use: "AC", "10H",
+  "hearts_9", "clubs_1", "spade_ace", "cards/QS.png" ...
+
+The hot paths (evaluate_for_match, evaluate_round, compute_total) only index
+these tables; no string is parsed after startup.
+"""
+
+import os
+import json
+
+RANKS = ("A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K")
+SUITS = ("C", "D", "H", "S")
+DECK_SIZE = 52
+
+# card id -> canonical name ("AC", "10H", ...), also the cards/<name>.png file name
+NAMES = tuple(r + s for s in SUITS for r in RANKS)
+RANK = tuple(i % 13 for i in range(DECK_SIZE))
+SUIT = tuple(i // 13 for i in range(DECK_SIZE))
+# Baccarat value: Ace = 1, 2-9 face value, 10/J/Q/K = 0
+POINT = tuple((r + 1) if r < 9 else 0 for r in RANK)
+# Andar Bahar: a card matches the joker when the match classes are equal (rank only)
+MATCH = RANK
+
+_RANK_WORDS = {
+    "a": 0, "ace": 0, "1": 0,
+    "j": 10, "jack": 10, "q": 11, "queen": 11, "k": 12, "king": 12,
+}
+_SUIT_WORDS = {
+    "c": 0, "club": 0, "clubs": 0,
+    "d": 1, "diamond": 1, "diamonds": 1,
+    "h": 2, "heart": 2, "hearts": 2,
+    "s": 3, "spade": 3, "spades": 3,
+}
+
+
+def _rank_index(text):
+    if text in _RANK_WORDS:
+        return _RANK_WORDS[text]
+    if text.isdigit() and 2 <= int(text) <= 10:
+        return int(text) - 1
+    return None
+
+
+def parse_card(name):
+    """Return the card id for a card name, or None if it cannot be parsed."""
+    if not name:
+        return None
+    text = os.path.splitext(os.path.basename(str(name)))[0].strip().lower()
+    if "_" in text:
+        # "hearts_9", "club_10", "spades_ace"
+        suit_txt, _, rank_txt = text.rpartition("_")
+        suit = _SUIT_WORDS.get(suit_txt)
+        rank = _rank_index(rank_txt)
+    else:
+        # "AC", "10H", "qs"
+        suit = _SUIT_WORDS.get(text[-1:])
+        rank = _rank_index(text[:-1])
+    if suit is None or rank is None:
+        return None
+    return suit * 13 + rank
+
+
+def card_ids_from_map(card_map):
+    """{shoe code: card name} -> {shoe code: card id}; unparseable names are reported and skipped."""
+    ids = {}
+    for code, name in card_map.items():
+        cid = parse_card(name)
+        if cid is None:
+            print(f"⚠️ card_map entry {code!r}: cannot parse card name {name!r}")
+            continue
+        ids[code] = cid
+    return ids
+
+
+def load_card_ids(path):
+    """Load card_map.json and return {shoe code: card id}."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return card_ids_from_map(json.load(f))
+    except Exception as e:
+        print("Failed to load card_map.json:", e)
+        return {}
@@ -1,21 +1,26 @@
 import customtkinter as ctk
 from tkinter import PhotoImage
-import threading, serial, json, os, time
-from PIL import Image, ImageTk
+import threading, json, os, time
+from PIL import ImageTk
+from serial_ingest import open_serial, iter_chunks, LatencyMeter, READ_TIMEOUT
+from shoe_tokenizer import ShoeTokenizer
+from cards import NAMES, POINT, card_ids_from_map
+from card_atlas import CardAtlas, CUSTOM_BACCARAT_SIZES
+from animation import Animator
+from overlay import ResultOverlay
 
 # ------------------ Setup ------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CARDS_DIR = os.path.join(BASE_DIR, "cards")
 with open(os.path.join(BASE_DIR, "card_map.json"), "r") as f:
     card_map = json.load(f)
+card_ids = card_ids_from_map(card_map)  # shoe code -> card id (see cards.py)
+tokenizer = ShoeTokenizer(card_map)
 
-# Serial connection
-try:
-    ser = serial.Serial("COM3", 9600, timeout=1)
-    print("✅ Connected to serial port COM3")
-except Exception as e:
-    print("⚠️ Serial not connected:", e)
-    ser = None
+# Serial connection (blocking reads with a short timeout; see serial_ingest)
+ser = open_serial("COM3", 9600, READ_TIMEOUT)
+latency = LatencyMeter()
+stop_event = threading.Event()
 
 # CTk setup
 ctk.set_appearance_mode("dark")
@@ -25,26 +30,17 @@ root = ctk.CTk()
 root.title("🎴 Mr. Pillai — Baccarat (CTk Casino Edition)")
 root.state("zoomed")
 root.configure(fg_color="#013220")  # Dark green background
+animator = Animator(root)  # one frame clock for every animation (animation.py)
+result_overlay = ResultOverlay(root, size=(420, 140), fg="#FFD700", bg="#002d13", font=("Arial Black", 32),
+                               duration=2000, slide=510, slide_ms=255, animator=animator)  # built once
 
 # ------------------ State ------------------
-deal_cards, player_cards, banker_cards = [], [], []
+deal_cards, player_cards, banker_cards = [], [], []  # card ids (see cards.py)
 game_over = False
-winner_popup = None
 
 # ------------------ Helpers ------------------
-def card_point(card_name):
-    rank = card_name.split("_")[-1]
-    if rank in ("jack", "queen", "king", "10"):
-        return 0
-    if rank == "ace":
-        return 1
-    try:
-        return int(rank)
-    except:
-        return 0
-
 def compute_total(cards):
-    return sum(card_point(c) for c in cards) % 10
+    return sum(POINT[c] for c in cards) % 10
 
 def log_history(line):
     history_text.insert("end", line + "\n")
@@ -101,65 +97,30 @@ history_text = ctk.CTkTextbox(history_frame, height=180, fg_color="#013220",
 history_text.pack(fill="x", padx=15, pady=5)
 
 # ------------------ Animations ------------------
-def set_card_image(label, card_name):
-    """Load card image, scale to fit neatly without distortion."""
-    img_path = os.path.join(CARDS_DIR, f"{card_name}.png")
-    if not os.path.exists(img_path):
-        label.configure(text=card_name, image=None)
-        return
-
-    img = Image.open(img_path)
-    img_ratio = img.width / img.height
-    target_w, target_h = 120, 160
+card_atlas = CardAtlas(CARDS_DIR, CUSTOM_BACCARAT_SIZES)  # PIL images, every card decoded once in the background
+card_atlas.preload(card_map.values())
+_photo_cache = {}  # card name -> PhotoImage, made on first show
 
-    # Maintain aspect ratio properly
-    if img_ratio > (target_w / target_h):
-        new_w = target_w
-        new_h = int(target_w / img_ratio)
-    else:
-        new_h = target_h
-        new_w = int(target_h * img_ratio)
-
-    img = img.resize((new_w, new_h), Image.LANCZOS)
-    tk_img = ImageTk.PhotoImage(img)
+def set_card_image(label, card_name):
+    """Show a card from the atlas, scaled to fit without distortion."""
+    tk_img = _photo_cache.get(card_name)
+    if tk_img is None:
+        img = card_atlas.get(card_name, 120, 160)
+        if img is None:
+            label.configure(text=card_name, image=None)
+            return
+        tk_img = _photo_cache[card_name] = ImageTk.PhotoImage(img)
     label.configure(image=tk_img, text="")
     label.image = tk_img  # prevent garbage collection
 
 def glow_winner(frame, color):
-    """Simple glow pulse for winner highlight."""
-    def pulse(i=0):
-        alpha = (abs((i % 20) - 10)) / 10
-        fg = f"#{int(alpha*255):02x}{int(alpha*255):02x}{int(alpha*255):02x}"
-        frame.configure(border_color=color, border_width=3)
-        if i < 40:
-            root.after(60, lambda: pulse(i + 1))
-        else:
-            frame.configure(border_width=0)
-    pulse()
+    """Winner highlight: a coloured border for 2.4 s."""
+    frame.configure(border_color=color, border_width=3)
+    animator.delay(2400, lambda: frame.configure(border_width=0), key=("glow", frame))
 
 def show_popup(text):
     """Slide-in animated popup for winner."""
-    global winner_popup
-    if winner_popup and winner_popup.winfo_exists():
-        winner_popup.destroy()
-    winner_popup = ctk.CTkToplevel(root)
-    winner_popup.overrideredirect(True)
-    winner_popup.geometry("420x140")
-    winner_popup.configure(fg_color="#002d13")
-    lbl = ctk.CTkLabel(winner_popup, text=text, text_color="#FFD700",
-                       font=("Arial Black", 32))
-    lbl.pack(expand=True)
-    x = root.winfo_screenwidth()
-    y = root.winfo_screenheight() // 2 - 70
-    winner_popup.geometry(f"420x140+{x}+{y}")
-    def slide():
-        nonlocal x
-        x -= 30
-        winner_popup.geometry(f"420x140+{x}+{y}")
-        if x > root.winfo_screenwidth() - 500:
-            root.after(15, slide)
-    slide()
-    root.after(2000, winner_popup.destroy)
+    result_overlay.show(text)
 
 # ------------------ Logic ------------------
 def evaluate_round():
@@ -169,17 +130,17 @@ def evaluate_round():
     player_cards[:] = deal_cards[:2]
     banker_cards[:] = deal_cards[2:4]
     for i, c in enumerate(player_cards):
-        set_card_image(p_card_labels[i], c)
+        set_card_image(p_card_labels[i], NAMES[c])
     for i, c in enumerate(banker_cards):
-        set_card_image(b_card_labels[i], c)
+        set_card_image(b_card_labels[i], NAMES[c])
     p_total, b_total = compute_total(player_cards), compute_total(banker_cards)
     player_score.configure(text=f"Score: {p_total}")
     banker_score.configure(text=f"Score: {b_total}")
     winner = "TIE"
     if p_total != b_total:
         winner = "PLAYER" if p_total > b_total else "BANKER"
-    log_history(f"Player: {','.join(player_cards)} ({p_total}) | "
-                f"Banker: {','.join(banker_cards)} ({b_total}) → {winner}")
+    log_history(f"Player: {','.join(NAMES[c] for c in player_cards)} ({p_total}) | "
+                f"Banker: {','.join(NAMES[c] for c in banker_cards)} ({b_total}) → {winner}")
     show_popup(f"{winner} WINS!" if winner != "TIE" else "TIE GAME")
     if winner == "PLAYER":
         glow_winner(player_frame, "#00FF99")
@@ -216,17 +177,12 @@ def manual_result(winner):
 
 # ------------------ Serial Thread ------------------
 def serial_reader():
-    global game_over
-    while True:
-        if not ser:
-            time.sleep(1); continue
+    for data, t_arrival in iter_chunks(ser, stop_event):
         try:
-            if ser.in_waiting > 0:
-                raw = ser.readline().decode(errors="ignore").strip()
-                if not raw: continue
-                if raw in card_map and not game_over:
+            for raw in tokenizer.feed(data):
+                if raw in card_ids and not game_over:
                     card_name = card_map[raw]
-                    deal_cards.append(card_name)
+                    deal_cards.append(card_ids[raw])
                     status_label.configure(text=f"Dealt {card_name} ({len(deal_cards)}/4)")
                     if len(deal_cards) <= 2:
                         set_card_image(p_card_labels[len(deal_cards)-1], card_name)
@@ -234,10 +190,9 @@ def serial_reader():
                         set_card_image(b_card_labels[len(deal_cards)-3], card_name)
                     if len(deal_cards) == 4:
                         root.after(100, evaluate_round)
+                    latency.add(t_arrival)
         except Exception as e:
             print("Serial read error:", e)
-            time.sleep(0.5)
-        time.sleep(0.05)
 
 threading.Thread(target=serial_reader, daemon=True).start()
 root.mainloop()
@@ -0,0 +1,208 @@
+# history_parser.py
+"""
+Streaming parser for the mixed-format baccarat_history.txt.
+- Every line is classified: compact P/B/T symbol, round summary, manual
+  result, blackjack line, session marker, blank or other text
+- Round summaries from every front-end are understood:
+      Player: AH,2H (3) | Banker: 3H,4H (7) → BANKER        (bacarat.py, custommb.py)
+      Game 9: Player hearts_9,clubs_9 (8) vs Banker ... => PLAYER [NATURAL]   (mb.py)
+      Manual result → TIE / Game 12: manual result => TIE
+- Cards, totals, winner and extras go into columnar arrays (array module),
+  one entry per line, a batch of BATCH_LINES lines at a time: memory stays
+  constant however long the file is
+- Normalised: extras (pairs, natural, Super Six) are judged from the cards
+  whenever the cards are known, so lines that never logged them (bacarat.py)
+  count the same as mb.py's; the logged [tags] are used only without cards
+- Classification looks at the first character before any regex runs
+
+Run this file directly to summarise a history file, e.g.
+    python history_parser.py baccarat_history.txt
+or with no arguments to time a generated 2-million-line file.
+"""
+
+import re
+from array import array
+
+from cards import POINT, RANK, parse_card
+
+BATCH_LINES = 65536
+
+KIND_OTHER = 0
+KIND_BLANK = 1
+KIND_SYMBOL = 2  # "P" / "B" / "T"
+KIND_ROUND = 3  # summary with cards and totals
+KIND_MANUAL = 4  # manual result, winner only
+KIND_BLACKJACK = 5
+KIND_MARKER = 6  # "#SESSION ..." (session_restore)
+KIND_NAMES = ("OTHER", "BLANK", "SYMBOL", "ROUND", "MANUAL", "BLACKJACK", "MARKER")
+
+WINNERS = ("PLAYER", "BANKER", "TIE")
+_WINNER_CODE = {"PLAYER": 0, "BANKER": 1, "TIE": 2, "P": 0, "B": 1, "T": 2}
+
+# extras bitmask
+PLAYER_PAIR = 1
+BANKER_PAIR = 2
+NATURAL = 4
+SUPER_SIX = 8
+EXTRAS = (("PLAYER_PAIR", PLAYER_PAIR), ("BANKER_PAIR", BANKER_PAIR), ("NATURAL", NATURAL), ("SUPER_SIX", SUPER_SIX))
+_EXTRA_BITS = dict(EXTRAS)
+
+_ROUND = re.compile(
+    r"(?:Game \d+: )?Player:?\s+(\S*?)\s*\((\d)\)\s+(?:vs|\|)\s+Banker:?\s+(\S*?)\s*\((\d)\)"
+    r"\s+(?:=>|→)\s+(PLAYER|BANKER|TIE)\b(?:\s*\[([A-Z_, ]*)\])?")
+_MANUAL = re.compile(r"(?:Game \d+: manual result =>|Manual result →)\s+(PLAYER|BANKER|TIE)\b")
+_BLACKJACK = ("Dealt ->", "Player hits", "Player stands", "Dealer", "Result ->")
+
+_card_ids = {}  # card name -> id (or None); the logs only ever use a few hundred spellings
+
+
+def _card(name):
+    try:
+        return _card_ids[name]
+    except KeyError:
+        cid = _card_ids[name] = parse_card(name)
+        return cid
+
+
+class ParsedBatch:
+    """Columns for a run of consecutive lines; -1 means "not on this line"."""
+
+    def __init__(self, first_line):
+        self.first_line = first_line  # 1-based line number of entry 0
+        self.kind = array("B")
+        self.winner = array("b")  # 0 PLAYER, 1 BANKER, 2 TIE
+        self.player_total = array("b")
+        self.banker_total = array("b")
+        self.extras = array("B")  # PLAYER_PAIR | BANKER_PAIR | NATURAL | SUPER_SIX
+        # card ids in hand order: player 1..3, banker 1..3
+        self.cards = tuple(array("b") for _ in range(6))
+
+    def __len__(self):
+        return len(self.kind)
+
+    def _add(self, kind, winner=-1, p_total=-1, b_total=-1, extras=0, cards=(-1,) * 6):
+        self.kind.append(kind)
+        self.winner.append(winner)
+        self.player_total.append(p_total)
+        self.banker_total.append(b_total)
+        self.extras.append(extras)
+        for col, cid in zip(self.cards, cards):
+            col.append(cid)
+
+    def hand(self, i, player=True):
+        """Card ids of one hand on line i (entry index) in dealing order."""
+        cols = self.cards[:3] if player else self.cards[3:]
+        return [col[i] for col in cols if col[i] >= 0]
+
+    def results(self):
+        """Yield (entry index, winner name) for every line that records a round result."""
+        winner = self.winner
+        for i, w in enumerate(winner):
+            if w >= 0:
+                yield i, WINNERS[w]
+
+
+def _round_fields(m):
+    """(winner, p_total, b_total, extras, 6 card ids) from a round summary match."""
+    p_txt, p_total, b_txt, b_total, winner, tags = m.groups()
+    p_ids = [_card(n) for n in p_txt.split(",")] if p_txt else []
+    b_ids = [_card(n) for n in b_txt.split(",")] if b_txt else []
+    w = _WINNER_CODE[winner]
+    if len(p_ids) >= 2 and len(b_ids) >= 2 and None not in p_ids and None not in b_ids:
+        p2 = (POINT[p_ids[0]] + POINT[p_ids[1]]) % 10
+        b2 = (POINT[b_ids[0]] + POINT[b_ids[1]]) % 10
+        extras = ((RANK[p_ids[0]] == RANK[p_ids[1]]) * PLAYER_PAIR
+                  | (RANK[b_ids[0]] == RANK[b_ids[1]]) * BANKER_PAIR
+                  | (p2 >= 8 or b2 >= 8) * NATURAL
+                  | (w == 1 and int(b_total) == 6) * SUPER_SIX)
+    else:
+        extras = 0
+        for tag in (tags or "").split(","):
+            extras |= _EXTRA_BITS.get(tag.strip(), 0)
+    p_ids = [-1 if c is None else c for c in p_ids[:3]] + [-1] * (3 - min(len(p_ids), 3))
+    b_ids = [-1 if c is None else c for c in b_ids[:3]] + [-1] * (3 - min(len(b_ids), 3))
+    return w, int(p_total), int(b_total), extras, p_ids + b_ids
+
+
+def parse_lines(lines, batch_lines=BATCH_LINES, first_line=1):
+    """Parse an iterable of text lines; yields ParsedBatch objects of up to batch_lines lines."""
+    batch = ParsedBatch(first_line)
+    add = batch._add
+    for line in lines:
+        s = line.strip()
+        c = s[:1]
+        if not s:
+            add(KIND_BLANK)
+        elif len(s) == 1 and c in "PBT":
+            add(KIND_SYMBOL, _WINNER_CODE[c])
+        elif c == "#":
+            add(KIND_MARKER if s.startswith("#SESSION") else KIND_OTHER)
+        elif c in "GPM" and (m := _ROUND.match(s)):
+            add(KIND_ROUND, *_round_fields(m))
+        elif c in "GM" and (m := _MANUAL.match(s)):
+            add(KIND_MANUAL, _WINNER_CODE[m.group(1)])
+        elif s.startswith(_BLACKJACK):
+            add(KIND_BLACKJACK)
+        else:
+            add(KIND_OTHER)
+        if len(batch.kind) >= batch_lines:
+            yield batch
+            batch = ParsedBatch(batch.first_line + len(batch))
+            add = batch._add
+    if len(batch):
+        yield batch
+
+
+def parse_file(path, batch_lines=BATCH_LINES):
+    """Stream a history file as ParsedBatch objects."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        yield from parse_lines(f, batch_lines)
+
+
+def summarize(path):
+    """Counts over a whole history file: lines per kind, wins, extras, rounds with cards."""
+    kinds = [0] * len(KIND_NAMES)
+    wins = [0] * len(WINNERS)
+    extras = {name: 0 for name, _ in EXTRAS}
+    with_cards = 0
+    for batch in parse_file(path):
+        for k in range(len(KIND_NAMES)):
+            kinds[k] += batch.kind.count(k)
+        for w in range(len(WINNERS)):
+            wins[w] += batch.winner.count(w)
+        with_cards += batch.kind.count(KIND_ROUND)
+        for name, bit in EXTRAS:
+            extras[name] += sum(1 for x in batch.extras if x & bit)
+    return {
+        "lines": dict(zip(KIND_NAMES, kinds)),
+        "wins": dict(zip(WINNERS, wins)),
+        "extras": extras,
+        "rounds_with_cards": with_cards,
+    }
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import time
+    import random
+    import tempfile
+
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        # 2M lines drawn from the formats in the repo's own history file
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "baccarat_history.txt"),
+                  encoding="utf-8") as f:
+            samples = f.read().splitlines()
+        rnd = random.Random(14)
+        path = os.path.join(tempfile.mkdtemp(), "baccarat_history.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(rnd.choice(samples) for _ in range(2_000_000)) + "\n")
+    t0 = time.perf_counter()
+    summary = summarize(path)
+    dt = time.perf_counter() - t0
+    n = sum(summary["lines"].values())
+    for key, val in summary.items():
+        print(f"{key:<18} {val}")
+    print(f"{n:,} lines in {dt:.2f} s: {n / dt:,.0f} lines/s")
@@ -0,0 +1,178 @@
+# history_writer.py
+"""
+Background, append-only writer for the history text files.
+- write(line) only puts the line on a bounded queue: the Tk thread never
+  opens, writes or fsyncs a file, so a slow disk cannot freeze the display
+- One writer thread keeps the file open and writes whatever has queued up
+  as one batch (one write() + flush() per batch, not per line)
+- fsync policy: FSYNC_NEVER (leave it to the OS), FSYNC_BATCH (after every
+  batch) or a number of seconds (at most one fsync per interval)
+- If the queue is full (disk stalled for a long time) new lines are dropped
+  and counted rather than blocking the caller
+- flush() waits until everything queued so far is on disk; close() flushes
+  and stops the thread, call it from on_close
+
+Run this file directly to compare it with open/write/close per line.
+"""
+
+import os
+import time
+import queue
+import threading
+
+FSYNC_NEVER = "never"
+FSYNC_BATCH = "batch"
+
+QUEUE_SIZE = 10000  # lines; a full day of rounds fits many times over
+BATCH_MAX = 512  # lines per write()
+
+_STOP = object()
+
+
+class HistoryWriter:
+    """Append lines to one text file from a background thread."""
+
+    def __init__(self, path, fsync=FSYNC_BATCH, queue_size=QUEUE_SIZE, encoding="utf-8"):
+        self.path = path
+        self.fsync = fsync
+        self.encoding = encoding
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._last_sync = 0.0
+        self._dirty = False  # written but not yet fsynced
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    # ------------------ caller side (any thread) ------------------
+    def write(self, line):
+        """Queue one line (newline added). Never blocks; returns False if the line was dropped."""
+        try:
+            self._queue.put_nowait(line)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1:
+                print(f"History queue full, dropping lines for {self.path}")
+            return False
+
+    def flush(self, timeout=None):
+        """Block until every line queued before this call is written (and fsynced unless FSYNC_NEVER)."""
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=2.0):
+        """Write out the queue, fsync and stop the writer thread."""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print(f"History writer for {self.path}: queue still full at close")
+            return
+        self._thread.join(timeout)
+        if self.dropped:
+            print(f"History writer for {self.path}: {self.dropped} line(s) dropped")
+
+    # ------------------ writer thread ------------------
+    def _run(self):
+        f = None
+        stop = False
+        while not stop:
+            batch, waiters = [], []
+            try:
+                item = self._queue.get(timeout=self._sync_wait())
+            except queue.Empty:
+                # interval policy: nothing new arrived, sync what is pending
+                self._sync(f)
+                continue
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= BATCH_MAX:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    if f is None:
+                        f = open(self.path, "a", encoding=self.encoding)
+                    f.write("\n".join(batch) + "\n")
+                    f.flush()
+                    self.written += len(batch)
+                    self._dirty = True
+                if f is not None:
+                    self._maybe_sync(f, force=bool(waiters) or stop)
+            except Exception as e:
+                print("History write error:", e)
+                if f is not None:
+                    try:
+                        f.close()
+                    except Exception:
+                        pass
+                    f = None  # reopen on the next batch
+            for w in waiters:
+                w.set()
+        if f is not None:
+            f.close()
+
+    def _sync_wait(self):
+        """How long the thread may sleep on the queue before pending data is due for fsync."""
+        if not self._dirty or self.fsync in (FSYNC_NEVER, FSYNC_BATCH):
+            return None
+        return max(0.0, self._last_sync + self.fsync - time.monotonic())
+
+    def _maybe_sync(self, f, force=False):
+        if self.fsync == FSYNC_NEVER or not self._dirty:
+            return
+        if self.fsync == FSYNC_BATCH or force or time.monotonic() - self._last_sync >= self.fsync:
+            self._sync(f)
+
+    def _sync(self, f):
+        if f is None or not self._dirty:
+            return
+        try:
+            os.fsync(f.fileno())
+        except Exception as e:
+            print("History fsync error:", e)
+        self._last_sync = time.monotonic()
+        self._dirty = False
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    n = 20000
+    tmp = tempfile.mkdtemp()
+
+    path = os.path.join(tmp, "per_line.txt")
+    t0 = time.perf_counter()
+    for i in range(n):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("AB"[i % 2] + "\n")
+    dt = time.perf_counter() - t0
+    print(f"open/write/close per line: {dt / n * 1e6:7.1f} us per line on the caller")
+
+    for policy in (FSYNC_NEVER, 1.0, FSYNC_BATCH):
+        path = os.path.join(tmp, f"writer_{policy}.txt")
+        w = HistoryWriter(path, fsync=policy, queue_size=n)
+        t0 = time.perf_counter()
+        for i in range(n):
+            w.write("AB"[i % 2])
+        dt = time.perf_counter() - t0
+        w.close(timeout=30)
+        total = time.perf_counter() - t0
+        with open(path, encoding="utf-8") as f:
+            lines = sum(1 for _ in f)
+        print(f"HistoryWriter fsync={policy!s:<6}: {dt / n * 1e6:7.1f} us per line on the caller, "
+              f"{total * 1000:.0f} ms until all {lines} lines were on disk")
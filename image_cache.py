@@ -0,0 +1,113 @@
+# image_cache.py
+"""
+Bounded LRU cache for decoded images, shared by the card atlas of every front-end.
+- Entries are kept in least-recently-used order and charged their pixel
+  bytes (w * h * 4 for RGBA); putting past the byte budget evicts the
+  oldest entries first
+- A negative entry (None: no such file) is free and expires after
+  negative_ttl seconds, so a card PNG added while the app runs is found again
+- hits / misses / evictions counters; summary() for the on_close report
+- Thread-safe: the atlas workers put, the Tk thread only gets
+
+Run this file directly to time get/put and see eviction under a small budget.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+DEFAULT_BUDGET = 32 << 20  # both AB sizes of all 52 cards take ~21 MB
+NEGATIVE_TTL = 30.0
+MISS = object()  # get() result when the key is not cached (None is a cached "no image")
+
+
+def image_bytes(img):
+    """Pixel bytes of a PIL image (or anything with .size and .mode)."""
+    w, h = img.size
+    return w * h * len(img.getbands())
+
+
+class ImageCache:
+    """key -> image with LRU eviction under a byte budget and expiring negative entries."""
+
+    def __init__(self, budget=DEFAULT_BUDGET, negative_ttl=NEGATIVE_TTL):
+        self.budget = budget
+        self.negative_ttl = negative_ttl
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, nbytes, expires or None)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """The cached value (may be None), or MISS."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] < time.monotonic():
+                del self._entries[key]  # negative entry expired
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return MISS
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes=0):
+        """Cache value (None = negative entry, nbytes ignored); evicts LRU entries past the budget."""
+        expires = None
+        if value is None:
+            nbytes = 0
+            expires = time.monotonic() + self.negative_ttl
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, nbytes, expires)
+            self.bytes += nbytes
+            while self.bytes > self.budget and len(self._entries) > 1:
+                _, (_, n, _) = self._entries.popitem(last=False)
+                self.bytes -= n
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return (f"image cache: {len(self._entries)} entries, {self.bytes / 1048576:.1f} of "
+                f"{self.budget / 1048576:.1f} MB, {self.hits} hits / {self.misses} misses ({rate:.1f}% hit), "
+                f"{self.evictions} evictions")
+
+
+if __name__ == "__main__":
+    from PIL import Image
+
+    img = Image.new("RGBA", (180, 260))
+    n = image_bytes(img)
+    cache = ImageCache(budget=40 * n, negative_ttl=0.05)
+    keys = [(cid, 180, 260, 1.0) for cid in range(52)]
+    t0 = time.perf_counter()
+    for k in keys:
+        cache.put(k, img, n)
+    dt_put = (time.perf_counter() - t0) / len(keys)
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        for k in keys[-40:]:
+            cache.get(k)
+    dt_get = (time.perf_counter() - t0) / 40000
+    print(f"put {dt_put * 1e6:.2f} us, get {dt_get * 1e6:.2f} us")
+    print(f"52 cards into a 40-card budget: {cache.summary()}")
+    cache.put("missing", None)
+    time.sleep(0.06)
+    print("negative entry after its TTL:", "expired" if cache.get("missing") is MISS else "still cached")
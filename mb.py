@@ -1,8 +1,19 @@
 # mb_casino_minimal.py
 import customtkinter as ctk
 from customtkinter import CTkImage
-import threading, serial, json, os, time
-from PIL import Image, ImageDraw
+import threading, json, os, time
+from serial_ingest import open_serial, iter_chunks, LatencyMeter, READ_TIMEOUT
+from shoe_tokenizer import ShoeTokenizer
+from history_writer import HistoryWriter
+from session_restore import session_marker
+from round_journal import RoundJournal
+from cards import NAMES, card_ids_from_map
+from baccarat_engine import BaccaratEngine, PLAYER
+from baccarat_odds import ShoeOdds, tables_ready
+from roads import Roads, RoadBoard
+from animation import Animator
+from overlay import ResultOverlay
+from card_atlas import CardAtlas, BACCARAT_SIZES, PENDING
 
 # ------------------ Setup ------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -10,14 +21,15 @@ CARDS_DIR = os.path.join(BASE_DIR, "cards")
 
 with open(os.path.join(BASE_DIR, "card_map.json"), "r", encoding="utf-8") as f:
     card_map = json.load(f)
+card_ids = card_ids_from_map(card_map)  # shoe code -> card id (see cards.py)
+tokenizer = ShoeTokenizer(card_map)
 
-# Serial connection (same as before)
-try:
-    ser = serial.Serial("COM3", 9600, timeout=1)
-    print("✅ Connected to serial port COM3")
-except Exception as e:
-    print("⚠️ Serial not connected:", e)
-    ser = None
+# Serial connection (blocking reads with a short timeout; see serial_ingest)
+ser = open_serial("COM3", 9600, READ_TIMEOUT)
+latency = LatencyMeter()
+history = HistoryWriter(os.path.join(BASE_DIR, "baccarat_history.txt"))  # background appender; closed in on_close
+history.write(session_marker())  # this run starts with empty counters: a new session (session_restore.py)
+journal = RoundJournal(os.path.join(BASE_DIR, "mb_round.journal"))  # round in progress, for crash recovery
 
 # CTk setup
 ctk.set_appearance_mode("dark")
@@ -30,70 +42,28 @@ try:
 except Exception:
     pass
 root.configure(fg_color="#071a13")
+animator = Animator(root)  # one frame clock for every animation (animation.py)
+result_overlay = ResultOverlay(root, size=(360, 100), font=("Arial Black", 22), duration=1600, animator=animator)  # built once
 
 # ------------------ State ------------------
-deal_cards, player_cards, banker_cards = [], [], []
-game_over = False
-winner_popup = None
-
-# Derived counters
-counters = {
-    "PLAYER": 0,
-    "BANKER": 0,
-    "TIE": 0,
-    "PLAYER_PAIR": 0,
-    "BANKER_PAIR": 0,
-    "NATURAL": 0,
-    "SUPER_SIX": 0
-}
+engine = BaccaratEngine()  # hands, tableau, result and counters; Tk thread only
+SHOE_DECKS = 8
+shoe = ShoeOdds(SHOE_DECKS)  # cards left in the shoe, for the live odds next to each counter
 
 # Keep a global image cache so images are not garbage-collected
-_image_cache = {}
 
 # Thread stop event for graceful exit
 stop_event = threading.Event()
 
-# Cockroach Road data (simple linear layout)
-cockroach_sequence = []  # list of 'P','B','T'
-
 # ------------------ Helpers ------------------
-def card_rank(card_name: str):
-    """Return canonical rank string from card filename (ace,2,..,10,jack,queen,king)."""
-    name = os.path.splitext(os.path.basename(card_name))[0].lower()
-    if "_" in name:
-        rank = name.split("_")[-1]
-    else:
-        rank = ''.join(ch for ch in name if ch.isalnum()).rstrip("shcd")
-    return rank
-
-def card_point(card_name: str):
-    """Return Baccarat value (Ace=1, 2–9=face value, 10/J/Q/K=0)."""
-    rank = card_rank(card_name)
-    if rank in ("10", "jack", "queen", "king", "j", "q", "k"):
-        return 0
-    if rank in ("ace", "a"):
-        return 1
-    try:
-        return int(rank)
-    except Exception:
-        return 0
-
-def compute_total(cards):
-    """Compute Baccarat total (mod 10)."""
-    return sum(card_point(c) for c in cards) % 10
-
 def log_history(line):
-    """Append to history textbox and safely write to file in utf-8."""
+    """Append to history textbox and queue the line for baccarat_history.txt."""
     try:
         history_text.insert("end", line + "\n")
         history_text.see("end")
     except Exception:
         pass
-    try:
-        with open(os.path.join(BASE_DIR, "baccarat_history.txt"), "a", encoding="utf-8") as f:
-            f.write(line + "\n")
-    except Exception as e:
-        print("History write error:", e)
+    history.write(line)
     print(line)
 
 # ------------------ Layout (minimal but clear) ------------------
@@ -174,178 +144,121 @@ reset_btn.grid(row=0, column=1, padx=6, pady=10)
 ctk.CTkButton(controls, text="Player (1)", width=120, command=lambda: manual_result("PLAYER")).grid(row=0, column=2, padx=6)
 ctk.CTkButton(controls, text="Banker (2)", width=120, command=lambda: manual_result("BANKER")).grid(row=0, column=3, padx=6)
 ctk.CTkButton(controls, text="Tie (3)", width=120, command=lambda: manual_result("TIE")).grid(row=0, column=4, padx=6)
-
-# Cockroach Road canvas (simple grid)
-cockroach_frame = ctk.CTkFrame(root, fg_color="#041e1b", corner_radius=10)
-cockroach_frame.pack(fill="both", padx=24, pady=(0,18), expand=False)
-ctk.CTkLabel(cockroach_frame, text="Cockroach Road (simple view)", font=("Arial", 12), text_color="#bfe8d6").pack(anchor="w", padx=8, pady=6)
-cockroach_canvas = ctk.CTkCanvas(cockroach_frame, width=900, height=160, highlightthickness=0, bg="#011814")
-cockroach_canvas.pack(padx=12, pady=6)
+ctk.CTkButton(controls, text="New Shoe", width=120, command=lambda: new_shoe()).grid(row=0, column=5, padx=6)
+
+# Roads: Big Road on top, Big Eye Boy / Small Road / Cockroach Road under it
+road_frame = ctk.CTkFrame(root, fg_color="#041e1b", corner_radius=10)
+road_frame.pack(fill="both", padx=24, pady=(0,18), expand=False)
+ctk.CTkLabel(road_frame, text="Big Road  |  Big Eye Boy · Small Road · Cockroach Road", font=("Arial", 12), text_color="#bfe8d6").pack(anchor="w", padx=8, pady=6)
+road_canvas = ctk.CTkCanvas(road_frame, width=900, height=204, highlightthickness=0, bg="#011814")
+road_canvas.pack(padx=12, pady=6)
+road_board = RoadBoard(road_canvas, Roads())  # current shoe; draws only the cells a result changes
+ask_label = ctk.CTkLabel(road_frame, text="", font=("Consolas", 12), text_color="#cfeee0")
+ask_label.pack(anchor="w", padx=12, pady=(0,6))
 
 # ------------------ Animations & Images (reuse previous approach) ------------------
-def set_card_image(label, card_name):
-    """Load card image safely and resize, using CTkImage so CTkLabel can scale properly."""
-    img_path = os.path.join(CARDS_DIR, f"{card_name}.png")
-    if not os.path.exists(img_path):
-        try:
-            label.configure(text=card_name, image=None)
-            label.image = None
-        except Exception:
-            pass
-        return
+def _ctk_card(pil_img):
+    return CTkImage(light_image=pil_img, dark_image=pil_img, size=pil_img.size)
 
-    try:
-        img = Image.open(img_path).convert("RGBA")
-    except Exception as e:
-        print("Image open error:", e)
-        label.configure(text=card_name, image=None)
-        label.image = None
-        return
+card_atlas = CardAtlas(CARDS_DIR, BACCARAT_SIZES, wrap=_ctk_card)  # every card decoded once, in the background
+card_atlas.preload(card_map.values())
 
-    target_w, target_h = 110, 150
-    img_ratio = img.width / img.height
-    if img_ratio > (target_w / target_h):
-        new_w = target_w
-        new_h = int(target_w / img_ratio)
-    else:
-        new_h = target_h
-        new_w = int(target_h * img_ratio)
-    img = img.resize((new_w, new_h), Image.LANCZOS)
+def set_card_image(label, card_name):
+    """Show a card from the atlas on a CTkLabel (card name as text when there is no PNG).
 
-    try:
-        ctk_img = CTkImage(light_image=img, dark_image=img, size=(new_w, new_h))
-    except Exception as e:
-        print("CTkImage creation error:", e)
-        label.configure(text=card_name, image=None)
-        label.image = None
-        return
+    Never decodes on the Tk thread: a card the cache does not hold shows its
+    name until the atlas worker has decoded it, then the image is swapped in.
+    """
+    label.card_name = card_name
+    ctk_img = card_atlas.peek(card_name, 110, 150, lambda img: root.after(0, show_card, label, card_name, img))
+    show_card(label, card_name, None if ctk_img is PENDING else ctk_img)
 
-    key = f"{card_name}_{new_w}x{new_h}"
-    _image_cache[key] = ctk_img
+def show_card(label, card_name, ctk_img):
+    if getattr(label, "card_name", None) != card_name:
+        return  # the label has moved on to another card since
     try:
-        label.configure(image=ctk_img, text="")
+        if ctk_img is None:
+            label.configure(text=card_name, image=None)
+        else:
+            label.configure(image=ctk_img, text="")
         label.image = ctk_img
     except Exception as e:
         print("Label configure image error:", e)
 
 def show_popup(text):
     """Small popup on center for winners."""
-    global winner_popup
-    if winner_popup and winner_popup.winfo_exists():
-        try:
-            winner_popup.destroy()
-        except Exception:
-            pass
-    winner_popup = ctk.CTkToplevel(root)
-    winner_popup.overrideredirect(True)
-    winner_popup.geometry("360x100")
-    winner_popup.configure(fg_color="#00271f")
-    lbl = ctk.CTkLabel(winner_popup, text=text, text_color="#ffd36e", font=("Arial Black", 22))
-    lbl.pack(expand=True)
-    x = root.winfo_screenwidth() // 2 - 180
-    y = root.winfo_screenheight() // 2 - 50
-    winner_popup.geometry(f"360x100+{x}+{y}")
-    root.after(1600, lambda: winner_popup.destroy() if winner_popup and winner_popup.winfo_exists() else None)
-
-# ------------------ Cockroach Road drawing (minimal) ------------------
-def draw_cockroach():
-    """Draw a simple grid with colored circles for P/B/T.
-       Arranges items left->right then next row when column full.
-    """
-    canvas = cockroach_canvas
-    canvas.delete("all")
-    cols = 30  # how many columns per row
-    cell_w, cell_h = 26, 26
-    margin_x, margin_y = 8, 8
-    # draw background grid
-    width = cols * (cell_w + 4) + margin_x * 2
-    # ensure canvas is big enough
-    canvas.configure(width=width)
-    for idx, val in enumerate(cockroach_sequence):
-        col = idx % cols
-        row = idx // cols
-        x = margin_x + col * (cell_w + 4)
-        y = margin_y + row * (cell_h + 6)
-        # circle center
-        cx, cy = x + cell_w//2, y + cell_h//2
-        if val == "P":
-            fill = "#2bd6a6"  # blue/green
-        elif val == "B":
-            fill = "#ff6b6b"  # red
-        else:
-            fill = "#9fffa3"  # tie greenish
-        # outline
-        canvas.create_oval(cx-10, cy-10, cx+10, cy+10, fill=fill, outline="#001914", width=1)
-    # small legend
-    canvas.create_text(60, 140, text="P: Player  B: Banker  T: Tie", fill="#cfeee0", anchor="w", font=("Consolas", 10))
+    result_overlay.show(text)
 
 # ------------------ Game Logic ------------------
-game_counter = 0
-
-def evaluate_round():
-    """Evaluate Baccarat result and derived outcomes, update counters and UI."""
-    global game_over, game_counter
-    if len(deal_cards) < 4:
-        return
-
-    player_cards[:] = deal_cards[:2]
-    banker_cards[:] = deal_cards[2:4]
-
-    # set card visuals
-    for i, c in enumerate(player_cards):
-        set_card_image(p_card_labels[i], c)
-    for i, c in enumerate(banker_cards):
-        set_card_image(b_card_labels[i], c)
-
-    p_total = compute_total(player_cards)
-    b_total = compute_total(banker_cards)
-    player_score.configure(text=f"Score: {p_total}")
-    banker_score.configure(text=f"Score: {b_total}")
-
-    # determine winner
-    if p_total == b_total:
-        winner = "TIE"
-    elif p_total > b_total:
-        winner = "PLAYER"
-    else:
-        winner = "BANKER"
-
-    # derived checks
-    # Pair: first two cards same rank
-    p_pair = (card_rank(player_cards[0]) == card_rank(player_cards[1]))
-    b_pair = (card_rank(banker_cards[0]) == card_rank(banker_cards[1]))
-    # Natural: either initial total 8 or 9
-    natural = (p_total in (8,9)) or (b_total in (8,9))
-    # Super Six: Banker wins with total 6 (simple detection)
-    super_six = (winner == "BANKER" and b_total == 6)
-
-    # update counters
-    counters[winner] = counters.get(winner, 0) + 1
-    if p_pair: counters["PLAYER_PAIR"] += 1
-    if b_pair: counters["BANKER_PAIR"] += 1
-    if natural: counters["NATURAL"] += 1
-    if super_six: counters["SUPER_SIX"] += 1
-
-    # update UI counters
+def update_counters():
+    """Session counters, each with its exact probability for the next round from the cards left."""
+    odds = shoe.odds() if tables_ready() else None  # the startup thread redraws once they are
     for k, lbl in counter_labels.items():
-        lbl.configure(text=f"{k}: {counters.get(k, 0)}")
+        text = f"{k}: {engine.counters[k]}"
+        text += f"  ({odds[k] * 100:.1f}%)" if odds else "  (--.-%)"
+        lbl.configure(text=text)
+
+def new_shoe():
+    shoe.reset()
+    road_board.reset()
+    ask_label.configure(text=road_board.ask_text())
+    update_counters()
+    status_label.configure(text=f"🂠 New {SHOE_DECKS}-deck shoe")
+
+def on_card(card_id, card_name):
+    """Tk thread: give one shoe card to the engine and show it in its hand."""
+    if engine.game_over:
+        return  # ignore until reset
+    hand, slot = engine.deal(card_id)
+    journal.card(card_id)
+    shoe.remove(card_id)
+    update_counters()
+    set_card_image((p_card_labels if hand == PLAYER else b_card_labels)[slot], card_name)
+    if engine.game_over:
+        status_label.configure(text=f"Dealt {card_name} → {hand}")
+        # small delay before the result for UX
+        root.after(300, show_result)
+    else:
+        status_label.configure(text=f"Dealt {card_name} → {hand} (next: {engine.next_hand}, {engine.remaining} more)")
 
-    # update cockroach road (simple append)
-    short = "P" if winner == "PLAYER" else ("B" if winner == "BANKER" else "T")
-    cockroach_sequence.append(short)
-    # draw cockroach
-    draw_cockroach()
+def recover_round():
+    """Replay the cards of a round the journal says was still in progress when the app last stopped."""
+    rec = journal.recover()
+    journal.begin()
+    if rec is None:
+        return
+    names = {cid: card_map[code] for code, cid in card_ids.items()}
+    for cid in rec[1]:
+        on_card(cid, names.get(cid, NAMES[cid]))
+    print(f"Recovered round in progress: {len(rec[1])} card(s)")
+
+def show_result():
+    """Reflect the round the engine just decided in scores, counters, road and popup."""
+    if not engine.game_over:
+        return  # board was reset before the result came up
+    winner = engine.winner
+    if engine.dealt:
+        player_score.configure(text=f"Score: {engine.player_total}")
+        banker_score.configure(text=f"Score: {engine.banker_total}")
+
+    update_counters()
+
+    # update the roads (only the changed cells are drawn)
+    road_board.add(winner)
+    ask_label.configure(text=road_board.ask_text())
 
     # logging summary
-    summary = f"Game {game_counter+1}: Player {','.join(player_cards)} ({p_total}) vs Banker {','.join(banker_cards)} ({b_total}) => {winner}"
-    extras = []
-    if p_pair: extras.append("PLAYER_PAIR")
-    if b_pair: extras.append("BANKER_PAIR")
-    if natural: extras.append("NATURAL")
-    if super_six: extras.append("SUPER_SIX")
-    if extras:
-        summary += " [" + ", ".join(extras) + "]"
+    if engine.dealt:
+        summary = (f"Game {engine.rounds}: Player {','.join(NAMES[c] for c in engine.player_cards)} ({engine.player_total})"
+                   f" vs Banker {','.join(NAMES[c] for c in engine.banker_cards)} ({engine.banker_total}) => {winner}")
+        extras = [k for k, hit in (("PLAYER_PAIR", engine.player_pair), ("BANKER_PAIR", engine.banker_pair),
+                                   ("NATURAL", engine.natural), ("SUPER_SIX", engine.super_six)) if hit]
+        if extras:
+            summary += " [" + ", ".join(extras) + "]"
+    else:
+        summary = f"Game {engine.rounds}: manual result => {winner}"
     log_history(summary)
+    journal.result(winner)
 
     # popup and glow
     show_popup(f"{winner} WINS!" if winner != "TIE" else "TIE GAME")
@@ -354,48 +267,30 @@ def evaluate_round():
     elif winner == "BANKER":
         banker_label.configure(text="BANKER ★", text_color="#ffd0d0")
     # small visual reset to plain after delay
-    root.after(900, lambda: player_label.configure(text="PLAYER", text_color="#8ef0c6"))
-    root.after(900, lambda: banker_label.configure(text="BANKER", text_color="#ff9c9c"))
+    animator.delay(900, lambda: player_label.configure(text="PLAYER", text_color="#8ef0c6"), key="player_label")
+    animator.delay(900, lambda: banker_label.configure(text="BANKER", text_color="#ff9c9c"), key="banker_label")
 
-    game_over = True
-    game_counter += 1
-    game_num_label.configure(text=f"Game: {game_counter}")
+    game_num_label.configure(text=f"Game: {engine.rounds}")
 
 def reset_board():
     """Clear all cards and start a new round."""
-    global deal_cards, player_cards, banker_cards, game_over
-    deal_cards.clear()
-    player_cards.clear()
-    banker_cards.clear()
     for lbl in p_card_labels + b_card_labels:
         try:
             lbl.configure(image=None, text="")
+            lbl.card_name = None  # an image still decoding is not shown
             lbl.image = None
         except Exception:
             pass
     player_score.configure(text="Score: -")
     banker_score.configure(text="Score: -")
     status_label.configure(text="🎲 New round started – waiting for cards or manual result…")
-    game_over = False
+    engine.reset()
+    journal.begin()
 
 # ------------------ Manual Result ------------------
 def manual_result(winner):
-    global game_over
-    if game_over:
-        return
-    # for manual result we just create placeholder cards to compute derived results
-    # placeholder card names must exist as valid entries in your card set; we'll use 'spades_1' style
-    # but to keep it minimal we only set totals via dummy small cards: choose sensible defaults
-    if winner == "PLAYER":
-        # example: give player higher total
-        deal_cards[:] = ["hearts_9", "clubs_9", "diamonds_2", "spades_1"]
-    elif winner == "BANKER":
-        deal_cards[:] = ["hearts_2", "clubs_1", "diamonds_8", "spades_8"]
-    else:
-        deal_cards[:] = ["hearts_4", "clubs_4", "diamonds_4", "spades_4"]
-    game_over = False
-    # evaluate immediately
-    evaluate_round()
+    if engine.declare(winner):
+        show_result()
 
 # ------------------ Keybinds ------------------
 root.bind("/", lambda e: reset_board())
@@ -405,46 +300,24 @@ root.bind("3", lambda e: manual_result("TIE"))
 
 # ------------------ Serial Thread ------------------
 def serial_reader():
-    """Background thread for reading serial card data (unchanged)."""
-    global game_over
-    while not stop_event.is_set():
-        if not ser:
-            time.sleep(1)
-            continue
+    """Background thread: map shoe codes to card ids and hand them to on_card() on the Tk thread."""
+    for data, t_arrival in iter_chunks(ser, stop_event):
         try:
-            try:
-                waiting = ser.in_waiting
-            except Exception:
-                waiting = 0
-            if waiting > 0:
-                raw = ser.readline().decode(errors="ignore").strip()
-                if not raw:
-                    continue
-                if raw in card_map and not game_over:
-                    card_name = card_map[raw]
-                    deal_cards.append(card_name)
-                    root.after(0, lambda name=card_name: status_label.configure(
-                        text=f"Dealt {name} ({len(deal_cards)}/4)"
-                    ))
-                    # place card visuals
-                    if len(deal_cards) <= 2:
-                        idx = len(deal_cards) - 1
-                        root.after(0, set_card_image, p_card_labels[idx], card_name)
-                    elif len(deal_cards) <= 4:
-                        idx = len(deal_cards) - 3
-                        root.after(0, set_card_image, b_card_labels[idx], card_name)
-                    if len(deal_cards) == 4:
-                        # small delay before evaluation for UX
-                        root.after(300, evaluate_round)
+            for raw in tokenizer.feed(data):
+                if raw in card_ids:
+                    root.after(0, on_card, card_ids[raw], card_map[raw])
+                    latency.add(t_arrival)
         except Exception as e:
             print("Serial read error:", e)
-            time.sleep(0.5)
-        time.sleep(0.05)
 
 # ------------------ Graceful Exit ------------------
 def on_close():
     print("🛑 Closing game...")
     stop_event.set()
+    print(latency.summary())
+    print(card_atlas.cache.summary())
+    history.close()
+    journal.close()
     try:
         if ser and getattr(ser, "is_open", False):
             try:
@@ -464,7 +337,11 @@ root.protocol("WM_DELETE_WINDOW", on_close)
 _thread = threading.Thread(target=serial_reader, daemon=True)
 _thread.start()
 
-# draw initial cockroach
-draw_cockroach()
+# odds tables take ~1 s to build; do it off the Tk thread, then show the fresh-shoe odds
+threading.Thread(target=lambda: (shoe.odds(), root.after(0, update_counters)), daemon=True).start()
+
+# initial ask-road line, then a round cut short by a crash
+ask_label.configure(text=road_board.ask_text())
+recover_round()
 
 root.mainloop()
@@ -1,8 +1,21 @@
 # mb_casino_bead.py
 import customtkinter as ctk
 from customtkinter import CTkImage
-import threading, serial, json, os, time
-from PIL import Image
+import threading, json, os, time
+from serial_ingest import open_serial, iter_chunks, LatencyMeter, READ_TIMEOUT
+from shoe_tokenizer import ShoeTokenizer
+from history_writer import HistoryWriter
+from round_store import RoundStore, DB_NAME
+from session_restore import session_marker, session_label, session_symbols, bead_columns_from
+from round_journal import RoundJournal
+from cards import card_ids_from_map, NAMES
+from baccarat_engine import BaccaratEngine, PLAYER, BANKER, TIE
+from baccarat_odds import ShoeOdds, tables_ready
+from bead_plate import BeadPlate, BACCARAT_STYLES
+from roads import Roads, RoadBoard
+from animation import Animator
+from overlay import ResultOverlay
+from card_atlas import CardAtlas, BACCARAT_SIZES, PENDING
 
 # ------------------ Setup ------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -10,14 +23,17 @@ CARDS_DIR = os.path.join(BASE_DIR, "cards")
 
 with open(os.path.join(BASE_DIR, "card_map.json"), "r", encoding="utf-8") as f:
     card_map = json.load(f)
-
-# Serial connection
-try:
-    ser = serial.Serial("COM3", 9600, timeout=1)
-    print("✅ Connected to serial port COM3")
-except Exception as e:
-    print("⚠️ Serial not connected:", e)
-    ser = None
+card_ids = card_ids_from_map(card_map)  # shoe code -> card id (see cards.py)
+tokenizer = ShoeTokenizer(card_map)
+
+# Serial connection (blocking reads with a short timeout; see serial_ingest)
+ser = open_serial("COM3", 9600, READ_TIMEOUT)
+latency = LatencyMeter()
+HISTORY_FILE = os.path.join(BASE_DIR, "baccarat_history.txt")
+history = HistoryWriter(HISTORY_FILE)  # background appender; closed in on_close
+TABLE_ID = "BAC-1"
+store = RoundStore(os.path.join(BASE_DIR, DB_NAME))  # SQLite round store; closed in on_close
+journal = RoundJournal(os.path.join(BASE_DIR, "baccarat_round.journal"))  # round in progress, for crash recovery
 
 # CTk setup
 ctk.set_appearance_mode("dark")
@@ -30,64 +46,29 @@ try:
 except Exception:
     pass
 root.configure(fg_color="#071a13")
+animator = Animator(root)  # one frame clock for every animation (animation.py)
+result_overlay = ResultOverlay(root, size=(360, 100), font=("Arial Black", 22), duration=1400, animator=animator)  # built once
 
 # ------------------ State ------------------
-deal_cards, player_cards, banker_cards = [], [], []
-game_over = False
-winner_popup = None
-
-# derived counters
-counters = {
-    "PLAYER": 0,
-    "BANKER": 0,
-    "TIE": 0,
-    "PLAYER_PAIR": 0,
-    "BANKER_PAIR": 0,
-    "NATURAL": 0,
-    "SUPER_SIX": 0
-}
+engine = BaccaratEngine()  # hands, tableau, result and counters; Tk thread only
+SHOE_DECKS = 8
+shoe = ShoeOdds(SHOE_DECKS)  # cards left in the shoe, for the live odds next to each counter
+shoe_id = time.strftime("%Y%m%d-%H%M%S")  # new id on every New Shoe
+round_cards = []  # (card id, PLAYER/BANKER, time) of the current round, for the round store
 
 # bead (bead-style scoreboard) storage
 BEAD_ROWS = 6
 bead_columns = []  # list of lists; each inner list is up to BEAD_ROWS symbols ('P','B','T')
 
 # Keep a global image cache so images are not garbage-collected
-_image_cache = {}
 
 # Thread stop event for graceful exit
 stop_event = threading.Event()
 
 # ------------------ Helpers ------------------
-def card_rank(card_name: str):
-    name = os.path.splitext(os.path.basename(card_name))[0].lower()
-    if "_" in name:
-        rank = name.split("_")[-1]
-    else:
-        rank = ''.join(ch for ch in name if ch.isalnum()).rstrip("shcd")
-    return rank
-
-def card_point(card_name: str):
-    rank = card_rank(card_name)
-    if rank in ("10", "jack", "queen", "king", "j", "q", "k"):
-        return 0
-    if rank in ("ace", "a"):
-        return 1
-    try:
-        return int(rank)
-    except Exception:
-        return 0
-
-def compute_total(cards):
-    return sum(card_point(c) for c in cards) % 10
-
 def save_history_compact(symbol):
-    """Append compact symbol (P/B/T) into a simple text file (utf-8)."""
-    try:
-        with open(os.path.join(BASE_DIR, "baccarat_history.txt"), "a", encoding="utf-8") as f:
-            f.write(symbol)
-            f.write("\n")
-    except Exception as e:
-        print("History write error:", e)
+    """Queue one compact symbol (P/B/T) for baccarat_history.txt (written by the history thread)."""
+    history.write(symbol)
 
 # ------------------ Layout ------------------
 # Top header
@@ -134,6 +115,8 @@ bead_frame_outer.pack(padx=8, pady=(10,8), fill="both")
 ctk.CTkLabel(bead_frame_outer, text="Bead Plate (Big row view)", font=("Arial", 12), text_color="#bfe8d6").pack(anchor="w", padx=8, pady=(8,0))
 bead_canvas = ctk.CTkCanvas(bead_frame_outer, height=220, highlightthickness=0, bg="#011814")
 bead_canvas.pack(padx=8, pady=8, fill="both", expand=False)
+bead = BeadPlate(bead_canvas, bead_columns, BEAD_ROWS, BACCARAT_STYLES, cell=36, pad_y=18,
+                 font=("Consolas", 12, "bold"))  # incremental; redraw() only on restore / new shoe
 
 # banker column
 banker_col = ctk.CTkFrame(board, fg_color="#04221f", corner_radius=10)
@@ -158,220 +141,200 @@ reset_btn.grid(row=0, column=1, padx=6)
 ctk.CTkButton(controls, text="Player (1)", width=120, command=lambda: manual_result("PLAYER")).grid(row=0, column=2, padx=6)
 ctk.CTkButton(controls, text="Banker (2)", width=120, command=lambda: manual_result("BANKER")).grid(row=0, column=3, padx=6)
 ctk.CTkButton(controls, text="Tie (3)", width=120, command=lambda: manual_result("TIE")).grid(row=0, column=4, padx=6)
+ctk.CTkButton(controls, text="New Shoe", width=120, command=lambda: new_shoe()).grid(row=0, column=5, padx=6)
+
+# Roads: Big Road on top, Big Eye Boy / Small Road / Cockroach Road under it
+road_frame = ctk.CTkFrame(root, fg_color="#041e1b", corner_radius=10)
+road_frame.pack(fill="both", padx=20, pady=(0,14), expand=False)
+ctk.CTkLabel(road_frame, text="Big Road  |  Big Eye Boy · Small Road · Cockroach Road", font=("Arial", 12), text_color="#bfe8d6").pack(anchor="w", padx=8, pady=6)
+road_canvas = ctk.CTkCanvas(road_frame, width=900, height=204, highlightthickness=0, bg="#011814")
+road_canvas.pack(padx=12, pady=6)
+road_board = RoadBoard(road_canvas, Roads())  # current shoe; draws only the cells a result changes
+ask_label = ctk.CTkLabel(road_frame, text="", font=("Consolas", 12), text_color="#cfeee0")
+ask_label.pack(anchor="w", padx=12, pady=(0,6))
 
 # ------------------ Image helper (CTkImage) ------------------
+def _ctk_card(pil_img):
+    return CTkImage(light_image=pil_img, dark_image=pil_img, size=pil_img.size)
+
+card_atlas = CardAtlas(CARDS_DIR, BACCARAT_SIZES, wrap=_ctk_card)  # every card decoded once, in the background
+card_atlas.preload(card_map.values())
+
 def set_card_image(label, card_name):
-    img_path = os.path.join(CARDS_DIR, f"{card_name}.png")
-    if not os.path.exists(img_path):
-        try:
-            label.configure(text=card_name, image=None)
-            label.image = None
-        except Exception:
-            pass
-        return
-    try:
-        img = Image.open(img_path).convert("RGBA")
-    except Exception as e:
-        print("Image open error:", e)
-        label.configure(text=card_name, image=None)
-        label.image = None
-        return
-    target_w, target_h = 110, 150
-    img_ratio = img.width / img.height
-    if img_ratio > (target_w / target_h):
-        new_w = target_w
-        new_h = int(target_w / img_ratio)
-    else:
-        new_h = target_h
-        new_w = int(target_h * img_ratio)
-    img = img.resize((new_w, new_h), Image.LANCZOS)
-    try:
-        ctk_img = CTkImage(light_image=img, dark_image=img, size=(new_w, new_h))
-    except Exception as e:
-        print("CTkImage creation error:", e)
-        label.configure(text=card_name, image=None)
-        label.image = None
-        return
-    key = f"{card_name}_{new_w}x{new_h}"
-    _image_cache[key] = ctk_img
+    """Show a card from the atlas on a CTkLabel (card name as text when there is no PNG).
+
+    Never decodes on the Tk thread: a card the cache does not hold shows its
+    name until the atlas worker has decoded it, then the image is swapped in.
+    """
+    label.card_name = card_name
+    ctk_img = card_atlas.peek(card_name, 110, 150, lambda img: root.after(0, show_card, label, card_name, img))
+    show_card(label, card_name, None if ctk_img is PENDING else ctk_img)
+
+def show_card(label, card_name, ctk_img):
+    if getattr(label, "card_name", None) != card_name:
+        return  # the label has moved on to another card since
     try:
-        label.configure(image=ctk_img, text="")
+        if ctk_img is None:
+            label.configure(text=card_name, image=None)
+        else:
+            label.configure(image=ctk_img, text="")
         label.image = ctk_img
     except Exception as e:
         print("Label configure image error:", e)
 
 # ------------------ Popups & small animation ------------------
 def show_popup(text):
-    global winner_popup
-    if winner_popup and winner_popup.winfo_exists():
-        try:
-            winner_popup.destroy()
-        except Exception:
-            pass
-    winner_popup = ctk.CTkToplevel(root)
-    winner_popup.overrideredirect(True)
-    winner_popup.geometry("360x100")
-    winner_popup.configure(fg_color="#00271f")
-    lbl = ctk.CTkLabel(winner_popup, text=text, text_color="#ffd36e", font=("Arial Black", 22))
-    lbl.pack(expand=True)
-    x = root.winfo_screenwidth() // 2 - 180
-    y = root.winfo_screenheight() // 2 - 50
-    winner_popup.geometry(f"360x100+{x}+{y}")
-    root.after(1400, lambda: winner_popup.destroy() if winner_popup and winner_popup.winfo_exists() else None)
+    result_overlay.show(text)
 
 # ------------------ Bead Grid drawing ------------------
 def draw_bead_plate():
-    """Draw bead plate on bead_canvas from bead_columns list.
-       Each column is up to BEAD_ROWS items filled top->bottom.
-    """
-    canvas = bead_canvas
-    canvas.delete("all")
-    cols = max(1, len(bead_columns))
-    cell_w = 36
-    cell_h = 36
-    pad_x = 8
-    pad_y = 18
-    width = cols * (cell_w + 8) + pad_x * 2
-    height = BEAD_ROWS * (cell_h + 6) + pad_y * 2
-    # resize canvas so it fits columns
-    canvas.configure(width=min(width, 1200), height=height)
-    # draw each cell
-    for ci, col in enumerate(bead_columns):
-        for ri in range(BEAD_ROWS):
-            x = pad_x + ci * (cell_w + 8)
-            y = pad_y + ri * (cell_h + 6)
-            # background rect
-            canvas.create_rectangle(x, y, x + cell_w, y + cell_h, fill="#02221b", outline="#00160f")
-            if ri < len(col):
-                val = col[ri]
-                if val == "P":
-                    fill = "#2bd6a6"
-                    txt = "P"
-                    txt_color = "#002218"
-                elif val == "B":
-                    fill = "#ff6b6b"
-                    txt = "B"
-                    txt_color = "#3a0000"
-                else:
-                    fill = "#cdd9b6"
-                    txt = "T"
-                    txt_color = "#07240f"
-                # circle inside cell
-                cx = x + cell_w//2
-                cy = y + cell_h//2
-                r = min(cell_w, cell_h)//2 - 4
-                canvas.create_oval(cx-r, cy-r, cx+r, cy+r, fill=fill, outline="#001614")
-                canvas.create_text(cx, cy, text=txt, fill=txt_color, font=("Consolas", 12, "bold"))
+    """Full redraw of the bead plate (startup, restore, new shoe); new results go through append_bead()."""
+    bead.redraw()
 
 # function to append symbol to bead_columns
 def append_bead(symbol):
     """Append a symbol (P/B/T) to bead_columns in bead-plate fill order (top->bottom, then next column)."""
-    if not bead_columns:
-        bead_columns.append([])
-    last_col = bead_columns[-1]
-    if len(last_col) < BEAD_ROWS:
-        last_col.append(symbol)
-    else:
-        bead_columns.append([symbol])
-    draw_bead_plate()
+    bead.append(symbol)  # draws only the new bead
     # save compact history
     save_history_compact(symbol)
 
 # ------------------ Logic ------------------
-game_counter = 0
-
-def evaluate_round():
-    """Evaluate Baccarat result and derived outcomes."""
-    global game_over, game_counter
-    if len(deal_cards) < 4:
-        return
-
-    player_cards[:] = deal_cards[:2]
-    banker_cards[:] = deal_cards[2:4]
-
-    for i, c in enumerate(player_cards):
-        set_card_image(p_card_labels[i], c)
-    for i, c in enumerate(banker_cards):
-        set_card_image(b_card_labels[i], c)
+def update_counters():
+    """Session counters, each with its exact probability for the next round from the cards left."""
+    odds = shoe.odds() if tables_ready() else None  # the startup thread redraws once they are
+    for k, lbl in counter_labels.items():
+        text = f"{k}: {engine.counters[k]}"
+        if odds:
+            text += f"  ({odds[k] * 100:.1f}%)"
+        lbl.configure(text=text)
+
+def new_shoe():
+    """New shoe = new session: history marker, empty bead plate, counters at zero."""
+    global shoe_id
+    shoe.reset()
+    shoe_id = time.strftime("%Y%m%d-%H%M%S")
+    history.write(session_marker(shoe_id))
+    bead_columns.clear()
+    road_board.reset()
+    ask_label.configure(text=road_board.ask_text())
+    engine.restore({})
+    update_counters()
+    game_num_label.configure(text=f"Game: {engine.rounds}")
+    draw_bead_plate()
+    status_label.configure(text=f"🂠 New {SHOE_DECKS}-deck shoe")
 
-    p_total = compute_total(player_cards)
-    b_total = compute_total(banker_cards)
-    player_score.configure(text=f"Score: {p_total}")
-    banker_score.configure(text=f"Score: {b_total}")
+def restore_session():
+    """Rebuild bead plate, roads and P/B/T counters from this shoe's tail of baccarat_history.txt.
 
-    if p_total == b_total:
-        winner = "TIE"
-    elif p_total > b_total:
-        winner = "PLAYER"
+    Pair, natural and Super Six counters are not in the compact history and start at 0.
+    The cards of the shoe's stored rounds leave ShoeOdds again, so the odds stay right
+    after a restart in the middle of a shoe.
+    """
+    global shoe_id
+    t0 = time.perf_counter()
+    label = session_label(HISTORY_FILE)
+    if label:
+        shoe_id = label  # keep storing rounds under the restored shoe
+        for cid in store.shoe_cards(shoe_id, game="BACCARAT", table_id=TABLE_ID):
+            shoe.remove(cid)  # the odds continue from the cards already out of this shoe
     else:
-        winner = "BANKER"
-
-    # derived checks
-    p_pair = (card_rank(player_cards[0]) == card_rank(player_cards[1]))
-    b_pair = (card_rank(banker_cards[0]) == card_rank(banker_cards[1]))
-    natural = (p_total in (8,9)) or (b_total in (8,9))
-    super_six = (winner == "BANKER" and b_total == 6)
-
-    # update counters
-    counters[winner] = counters.get(winner, 0) + 1
-    if p_pair: counters["PLAYER_PAIR"] += 1
-    if b_pair: counters["BANKER_PAIR"] += 1
-    if natural: counters["NATURAL"] += 1
-    if super_six: counters["SUPER_SIX"] += 1
-
-    # update UI counters
-    for k, lbl in counter_labels.items():
-        lbl.configure(text=f"{k}: {counters.get(k, 0)}")
+        history.write(session_marker(shoe_id))  # no shoe yet: open one, so the next start finds its label
+    symbols = session_symbols(HISTORY_FILE, "PBT")
+    bead_columns[:] = bead_columns_from(symbols, BEAD_ROWS)
+    road_board.reset(symbols)
+    ask_label.configure(text=road_board.ask_text())
+    engine.restore({PLAYER: symbols.count("P"), BANKER: symbols.count("B"), TIE: symbols.count("T")})
+    update_counters()
+    game_num_label.configure(text=f"Game: {engine.rounds}")
+    print(f"Session restored: {len(symbols)} rounds in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+def recover_round():
+    """Replay the cards of a round the journal says was still in progress when the app last stopped."""
+    rec = journal.recover()
+    journal.begin()
+    if rec is None:
+        return
+    names = {cid: card_map[code] for code, cid in card_ids.items()}
+    for cid in rec[1]:
+        on_card(cid, names.get(cid, NAMES[cid]))
+    print(f"Recovered round in progress: {len(rec[1])} card(s)")
+
+def on_card(card_id, card_name):
+    """Tk thread: give one shoe card to the engine and show it in its hand."""
+    if engine.game_over:
+        return  # ignore until reset
+    hand, slot = engine.deal(card_id)
+    journal.card(card_id)
+    round_cards.append((card_id, hand, time.time()))
+    shoe.remove(card_id)
+    update_counters()
+    set_card_image((p_card_labels if hand == PLAYER else b_card_labels)[slot], card_name)
+    if engine.game_over:
+        record_round()
+        status_label.configure(text=f"Dealt {card_name} → {hand}")
+        # small delay before the result for UX
+        root.after(300, show_result)
+    else:
+        status_label.configure(text=f"Dealt {card_name} → {hand} (next: {engine.next_hand}, {engine.remaining} more)")
 
-    # append to bead grid
+def record_round(manual=False):
+    """Queue the round the engine just decided for the round store, and close it in the journal.
+
+    Both in one step: a replay after a crash must never store the round a second time.
+    """
+    store.add_round("BACCARAT", TABLE_ID, engine.winner, round_cards, shoe_id=shoe_id,
+                    round_no=engine.rounds, started=round_cards[0][2] if round_cards else None,
+                    manual=manual)
+    journal.result(engine.winner)
+
+def show_result():
+    """Reflect the round the engine just decided in scores, counters, road and popup."""
+    if not engine.game_over:
+        return  # board was reset before the result came up
+    winner = engine.winner
+    if engine.dealt:
+        player_score.configure(text=f"Score: {engine.player_total}")
+        banker_score.configure(text=f"Score: {engine.banker_total}")
+
+    update_counters()
+
+    # append to bead grid (also records the symbol in baccarat_history.txt)
     short = "P" if winner == "PLAYER" else ("B" if winner == "BANKER" else "T")
     append_bead(short)
+    road_board.add(short)  # only the changed road cells are drawn
+    ask_label.configure(text=road_board.ask_text())
 
-    # show popup and visual
+    # popup and glow
     show_popup(f"{winner} WINS!" if winner != "TIE" else "TIE GAME")
     if winner == "PLAYER":
         player_label.configure(text="PLAYER ★", text_color="#b8ffd8")
     elif winner == "BANKER":
         banker_label.configure(text="BANKER ★", text_color="#ffd0d0")
-    root.after(900, lambda: player_label.configure(text="PLAYER", text_color="#8ef0c6"))
-    root.after(900, lambda: banker_label.configure(text="BANKER", text_color="#ff9c9c"))
-
-    # log a compact history symbol to file only
-    save_history_compact(short)
+    # small visual reset to plain after delay
+    animator.delay(900, lambda: player_label.configure(text="PLAYER", text_color="#8ef0c6"), key="player_label")
+    animator.delay(900, lambda: banker_label.configure(text="BANKER", text_color="#ff9c9c"), key="banker_label")
 
-    game_over = True
-    game_counter += 1
-    game_num_label.configure(text=f"Game: {game_counter}")
+    game_num_label.configure(text=f"Game: {engine.rounds}")
 
 def reset_board():
-    global deal_cards, player_cards, banker_cards, game_over
-    deal_cards.clear()
-    player_cards.clear()
-    banker_cards.clear()
     for lbl in p_card_labels + b_card_labels:
         try:
             lbl.configure(image=None, text="")
+            lbl.card_name = None  # an image still decoding is not shown
             lbl.image = None
         except Exception:
             pass
     player_score.configure(text="Score: -")
     banker_score.configure(text="Score: -")
     status_label.configure(text="🎲 New round started – waiting for cards or manual result…")
-    game_over = False
+    engine.reset()
+    journal.begin()
+    round_cards.clear()
 
 def manual_result(winner):
-    global game_over
-    if game_over:
-        return
-    # create placeholder cards to compute derived results
-    if winner == "PLAYER":
-        deal_cards[:] = ["hearts_9", "clubs_1", "diamonds_2", "spades_1"]
-    elif winner == "BANKER":
-        deal_cards[:] = ["hearts_1", "clubs_1", "diamonds_8", "spades_8"]
-    else:
-        deal_cards[:] = ["hearts_4", "clubs_4", "diamonds_4", "spades_4"]
-    game_over = False
-    evaluate_round()
+    if engine.declare(winner):
+        record_round(manual=True)
+        show_result()
 
 # ------------------ Keybinds ------------------
 root.bind("/", lambda e: reset_board())
@@ -381,41 +344,24 @@ root.bind("3", lambda e: manual_result("TIE"))
 
 # ------------------ Serial Thread ------------------
 def serial_reader():
-    global game_over
-    while not stop_event.is_set():
-        if not ser:
-            time.sleep(1)
-            continue
+    for data, t_arrival in iter_chunks(ser, stop_event):
         try:
-            try:
-                waiting = ser.in_waiting
-            except Exception:
-                waiting = 0
-            if waiting > 0:
-                raw = ser.readline().decode(errors="ignore").strip()
-                if not raw:
-                    continue
-                if raw in card_map and not game_over:
-                    card_name = card_map[raw]
-                    deal_cards.append(card_name)
-                    root.after(0, lambda name=card_name: status_label.configure(text=f"Dealt {name} ({len(deal_cards)}/4)"))
-                    if len(deal_cards) <= 2:
-                        idx = len(deal_cards) - 1
-                        root.after(0, set_card_image, p_card_labels[idx], card_name)
-                    elif len(deal_cards) <= 4:
-                        idx = len(deal_cards) - 3
-                        root.after(0, set_card_image, b_card_labels[idx], card_name)
-                    if len(deal_cards) == 4:
-                        root.after(300, evaluate_round)
+            for raw in tokenizer.feed(data):
+                if raw in card_ids:
+                    root.after(0, on_card, card_ids[raw], card_map[raw])
+                    latency.add(t_arrival)
         except Exception as e:
             print("Serial read error:", e)
-            time.sleep(0.5)
-        time.sleep(0.05)
 
 # ------------------ Graceful Exit ------------------
 def on_close():
     print("🛑 Closing game...")
     stop_event.set()
+    print(latency.summary())
+    print(card_atlas.cache.summary())
+    history.close()
+    store.close()
+    journal.close()
     try:
         if ser and getattr(ser, "is_open", False):
             try:
@@ -435,7 +381,12 @@ root.protocol("WM_DELETE_WINDOW", on_close)
 _thread = threading.Thread(target=serial_reader, daemon=True)
 _thread.start()
 
+# odds tables take ~1 s to build; do it off the Tk thread, then show the fresh-shoe odds
+threading.Thread(target=lambda: (shoe.odds(), root.after(0, update_counters)), daemon=True).start()
+
 # initial draw
+restore_session()
+recover_round()
 draw_bead_plate() if 'draw_bead_plate' in globals() else None
 
 root.mainloop()
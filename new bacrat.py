@@ -1,7 +1,9 @@
 import tkinter as tk
-from tkinter import PhotoImage, Toplevel, Canvas, Frame, Scrollbar
+from tkinter import PhotoImage, Canvas, Frame, Scrollbar
 import threading, serial, json, os, time
 from PIL import Image, ImageTk  # Pillow for image scaling
+from animation import Animator
+from overlay import ResultOverlay
 
 # ------------------ Configuration ------------------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -22,6 +24,9 @@ root = tk.Tk()
 root.title("🎴 Mr. Pillai — Baccarat (Casino Edition) 🎴")
 root.state("zoomed")
 root.config(bg="#0f0f1a")
+animator = Animator(root)  # one frame clock for every animation (animation.py)
+result_overlay = ResultOverlay(root, size=(400, 120), fg="#FFD700", bg="#1a1a2e", font=("Arial Black", 26),
+                               duration=2000, slide=480, slide_ms=180, animator=animator)  # built once
 
 # Animated casino background shimmer
 def animate_background():
@@ -29,9 +34,8 @@ def animate_background():
     current = getattr(animate_background, "index", 0)
     root.config(bg=colors[current])
     animate_background.index = (current + 1) % len(colors)
-    root.after(4000, animate_background)
 animate_background.index = 0
-root.after(1000, animate_background)
+animator.delay(1000, lambda: (animate_background(), animator.every(4000, animate_background, key="background")))
 
 # ------------------ Scrollable Frame ------------------
 main_canvas = Canvas(root, bg="#0f0f1a", highlightthickness=0)
@@ -101,7 +105,6 @@ history_text.config(yscrollcommand=scrollbar_history.set)
 
 # ------------------ Baccarat State ------------------
 deal_cards, player_cards, banker_cards = [], [], []
-winner_popup = None
 game_over = False
 
 # ------------------ Helper Utilities ------------------
@@ -133,60 +136,32 @@ def set_card_image(label, card_name, slide_in=True, flip=True):
 
         if flip:
             label.config(text="", image="")
-            def reveal():
-                label.config(image=tk_img)
-            root.after(400, reveal)
+            animator.delay(400, lambda: label.config(image=tk_img), key=("reveal", label))
         else:
             label.config(image=tk_img)
 
         if slide_in:
-            x_pos = -150
-            label.place(x=x_pos)
+            label.place(x=-150)
             def slide():
-                nonlocal x_pos
-                x_pos += 15
-                label.place(x=x_pos)
-                if x_pos < 0:
-                    root.after(10, slide)
-                else:
-                    label.place(x=0)
-            root.after(100, slide)
+                animator.tween(100, lambda t: label.place(x=round(-150 * (1 - t))), key=("slide", label))
+            animator.delay(100, slide, key=("slide_start", label))
     except Exception as e:
         label.config(text=card_name, image="")
 
 def highlight_winner(winner):
     frame = player_frame if winner == "PLAYER" else banker_frame
     color = "#00ff99" if winner == "PLAYER" else "#ff4444"
-    def flash(times=6):
-        if times <= 0:
-            frame.config(highlightbackground="#FFD700")
-            return
-        frame.config(highlightbackground=color if times % 2 else "#FFD700")
-        root.after(200, lambda: flash(times - 1))
-    flash()
+    shown = [None]
+    def flash(t):
+        k = int(t * 6)  # six 200 ms phases, odd ones in the winner's colour, then gold
+        c = color if k < 6 and k % 2 else "#FFD700"
+        if c != shown[0]:
+            shown[0] = c
+            frame.config(highlightbackground=c)
+    animator.tween(1200, flash, key=("flash", frame))
 
 def show_result_popup(text):
-    global winner_popup
-    try:
-        if winner_popup and winner_popup.winfo_exists(): winner_popup.destroy()
-    except: pass
-    winner_popup = Toplevel(root)
-    winner_popup.overrideredirect(True)
-    winner_popup.config(bg="#1a1a2e")
-    label = tk.Label(winner_popup, text=text, fg="#FFD700", bg="#1a1a2e", font=("Arial Black", 26))
-    label.pack(padx=20, pady=30)
-    # start offscreen and slide in
-    x = root.winfo_screenwidth()
-    y = root.winfo_screenheight() // 2 - 60
-    winner_popup.geometry(f"400x120+{x}+{y}")
-    def slide_in():
-        nonlocal x
-        x -= 40
-        winner_popup.geometry(f"400x120+{x}+{y}")
-        if x > root.winfo_screenwidth() - 450:
-            root.after(15, slide_in)
-    slide_in()
-    root.after(2000, winner_popup.destroy)
+    result_overlay.show(text)
 
 def reset_board():
     global deal_cards, player_cards, banker_cards
@@ -224,9 +199,7 @@ def evaluate_baccarat_round():
 # ------------------ Key Handlers ------------------
 def reset_all(event=None):
     global game_over
-    try:
-        if winner_popup and winner_popup.winfo_exists(): winner_popup.destroy()
-    except: pass
+    result_overlay.hide()
     game_over = False
     reset_board()
 root.bind("/", reset_all)
@@ -0,0 +1,119 @@
+# overlay.py
+"""
+Reusable result overlay ("PLAYER WINS!", "ANDAR WINS!") for every front-end.
+- ResultOverlay builds one borderless, topmost Toplevel with a Label once at
+  startup; show() only changes the label text / colour and the window
+  position, hide() moves it off screen again. No toplevel, font or widget
+  is created or destroyed per result
+- The window stays mapped the whole time (parked off screen when hidden),
+  so showing it never maps a new window: nothing steals keyboard focus from
+  the dealer's main window
+- It hides itself after `duration` ms; a new show() restarts the timer.
+  With an Animator (animation.py) the timer runs on the shared clock and
+  slide= px makes it slide in from the right edge over slide_ms; without
+  one it pops up centred and uses a single root.after
+- Plain tkinter widgets, so it works under tk.Tk and customtkinter.CTk roots
+
+Run this file directly (needs a display) to time show / hide.
+"""
+
+import tkinter as tk
+from animation import ease_out
+
+OFFSCREEN = -10000
+
+
+class ResultOverlay:
+    """A pre-built popup layer: show(text) / hide() reconfigure it in place."""
+
+    def __init__(self, root, size=(300, 100), fg="#ffd36e", bg="#00271f", font=("Arial", 22, "bold"),
+                 duration=1400, slide=0, slide_ms=250, animator=None):
+        self.root = root
+        self.width, self.height = size
+        self.fg = fg
+        self.duration = duration
+        self.slide = slide if animator is not None else 0
+        self.slide_ms = slide_ms
+        self.animator = animator
+        self.visible = False
+        self._after_id = None
+        self.win = tk.Toplevel(root)
+        self.win.overrideredirect(True)
+        self.win.configure(bg=bg)
+        try:
+            self.win.attributes("-topmost", True)
+        except tk.TclError:
+            pass
+        self.label = tk.Label(self.win, text="", fg=fg, bg=bg, font=font)
+        self.label.pack(expand=True, fill="both")
+        self._place(OFFSCREEN, OFFSCREEN)
+
+    def _place(self, x, y):
+        self.win.geometry(f"{self.width}x{self.height}+{x}+{y}")
+
+    def show(self, text, fg=None, duration=None):
+        """Show text (optionally in another colour) and hide again after duration ms."""
+        self.label.configure(text=text, fg=fg or self.fg)
+        sw = self.root.winfo_screenwidth()
+        y = self.root.winfo_screenheight() // 2 - self.height // 2
+        if self.slide:
+            self.animator.tween(self.slide_ms, lambda t: self._place(round(sw - self.slide * t), y),
+                                key=(id(self), "slide"), ease=ease_out)
+        else:
+            self._place(sw // 2 - self.width // 2, y)
+        self.win.lift()
+        self.visible = True
+        self._schedule_hide(self.duration if duration is None else duration)
+
+    def _schedule_hide(self, ms):
+        if self.animator is not None:
+            self.animator.delay(ms, self.hide, key=(id(self), "hide"))
+            return
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+        self._after_id = self.root.after(ms, self.hide)
+
+    def hide(self):
+        """Park the overlay off screen (cancels a pending hide and slide)."""
+        if self.animator is not None:
+            self.animator.cancel((id(self), "slide"))
+            self.animator.cancel((id(self), "hide"))
+        elif self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+        self._after_id = None
+        if self.visible:
+            self.visible = False
+            self._place(OFFSCREEN, OFFSCREEN)
+
+    def destroy(self):
+        self.hide()
+        self.win.destroy()
+
+
+if __name__ == "__main__":
+    import time
+
+    root = tk.Tk()
+    root.geometry("400x200")
+    t0 = time.perf_counter()
+    tmp = tk.Toplevel(root)
+    tmp.overrideredirect(True)
+    tk.Label(tmp, text="PLAYER WINS!", font=("Arial Black", 22)).pack()
+    root.update_idletasks()
+    tmp.destroy()
+    root.update_idletasks()
+    print(f"new Toplevel per result: {(time.perf_counter() - t0) * 1000:.2f} ms")
+    overlay = ResultOverlay(root)
+    root.update()
+    n = 200
+    t0 = time.perf_counter()
+    for i in range(n):
+        overlay.show("PLAYER WINS!" if i % 2 else "BANKER WINS!")
+        root.update_idletasks()
+        overlay.hide()
+        root.update_idletasks()
+    print(f"overlay show + hide: {(time.perf_counter() - t0) / n * 1000:.3f} ms")
+    root.destroy()
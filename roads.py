@@ -0,0 +1,304 @@
+# roads.py
+"""
+Baccarat scoreboard roads: Big Road, Big Eye Boy, Small Road, Cockroach Road.
+- Roads.add(result) is O(1) per result: the Big Road places the result
+  (ties are marked on the last bead), then each derived road computes its
+  one new red/blue entry from the Big Road's streak lengths only
+- Placement follows the table rules: a streak goes down its column and,
+  once it hits the bottom or an occupied cell, turns right (dragon tail);
+  the next streak starts at the top of the column after the previous
+  streak's start (or the first free one to the right of it)
+- Derived roads (offset k = 1, 2, 3): a new column compares the lengths of
+  the two columns k apart before it; a bead further down a column checks
+  column c-k: blue when that column stopped exactly one row above, red
+  otherwise. Each road starts once the Big Road reaches (k, 1) or (k+1, 0)
+- ask(side) previews the next entry of every derived road for P or B
+  without changing anything ("ask road")
+- Outcomes are kept as a compact bytearray (0 P, 1 B, 2 T); from_outcomes()
+  rebuilds every road from one
+- RoadView draws one road on a Tk canvas and only touches the cells a
+  result changed, one sprite image per cell (sprites.SPRITES); old columns
+  scroll off to the left and are deleted, so the item count stays bounded
+
+Run this file directly to time Roads.add over a long shoe sequence.
+"""
+
+from sprites import SPRITES
+
+PLAYER = 0
+BANKER = 1
+TIE = 2
+SYMBOLS = "PBT"
+_CODES = {"P": PLAYER, "B": BANKER, "T": TIE, "PLAYER": PLAYER, "BANKER": BANKER, "TIE": TIE}
+
+RED = "R"
+BLUE = "U"
+
+BIG_ROAD = "big_road"
+BIG_EYE = "big_eye_boy"
+SMALL = "small_road"
+COCKROACH = "cockroach_road"
+DERIVED = ((BIG_EYE, 1), (SMALL, 2), (COCKROACH, 3))
+
+
+class Grid:
+    """Cells of one road laid out in columns of `rows`, with dragon tails."""
+
+    def __init__(self, rows=6):
+        self.rows = rows
+        self.cells = {}  # (col, row) -> [symbol, ties]
+        self.streaks = []  # logical column lengths (streaks), left to right
+        self.symbol = None  # symbol of the current streak
+        self.last = None  # (col, row) of the newest cell
+        self._start = -1  # physical column where the current streak started
+        self._tail = False  # current streak has turned right
+
+    @property
+    def width(self):
+        """Physical columns used."""
+        return 1 + max(c for c, _ in self.cells) if self.cells else 0
+
+    def add(self, symbol):
+        """Place one entry; returns its (col, row)."""
+        cells = self.cells
+        if symbol != self.symbol:
+            col = self._start + 1
+            while (col, 0) in cells:
+                col += 1
+            self._start = col
+            pos = (col, 0)
+            self._tail = False
+            self.symbol = symbol
+            self.streaks.append(1)
+        else:
+            col, row = self.last
+            below = (col, row + 1)
+            if not self._tail and row + 1 < self.rows and below not in cells:
+                pos = below
+            else:
+                self._tail = True
+                pos = (col + 1, row)
+            self.streaks[-1] += 1
+        cells[pos] = [symbol, 0]
+        self.last = pos
+        return pos
+
+
+def _derived(streaks, c, r, k):
+    """Red/blue entry of the derived road with offset k for a Big Road entry at streak c, depth r (or None)."""
+    if r == 0:
+        if c < k + 1:
+            return None
+        return RED if streaks[c - 1] == streaks[c - 1 - k] else BLUE
+    if c < k:
+        return None
+    return BLUE if streaks[c - k] == r else RED
+
+
+class Roads:
+    """All four roads for one shoe."""
+
+    def __init__(self, rows=6):
+        self.rows = rows
+        self.outcomes = bytearray()
+        self.big = Grid(rows)
+        self.derived = {name: Grid(rows) for name, _ in DERIVED}
+        self.pending_ties = 0  # ties before the first P/B; shown on the first bead
+
+    @classmethod
+    def from_outcomes(cls, outcomes, rows=6):
+        roads = cls(rows)
+        for code in outcomes:
+            roads.add(code)
+        return roads
+
+    def add(self, result):
+        """Add one result (code, symbol or name); returns [(road, col, row)] of the cells that changed."""
+        code = _CODES[result] if isinstance(result, str) else result
+        self.outcomes.append(code)
+        big = self.big
+        if code == TIE:
+            if big.last is None:
+                self.pending_ties += 1
+                return []
+            big.cells[big.last][1] += 1
+            return [(BIG_ROAD, *big.last)]
+        pos = big.add(SYMBOLS[code])
+        if self.pending_ties:
+            big.cells[pos][1] += self.pending_ties
+            self.pending_ties = 0
+        changes = [(BIG_ROAD, *pos)]
+        c = len(big.streaks) - 1
+        r = big.streaks[c] - 1
+        for name, k in DERIVED:
+            colour = _derived(big.streaks, c, r, k)
+            if colour is not None:
+                changes.append((name, *self.derived[name].add(colour)))
+        return changes
+
+    def ask(self, side):
+        """{derived road: RED / BLUE / None} that a P or B next would add; nothing is changed."""
+        symbol = SYMBOLS[_CODES[side]]
+        streaks = self.big.streaks
+        if not streaks:
+            return {name: None for name, _ in DERIVED}
+        if symbol == self.big.symbol:
+            c, r = len(streaks) - 1, streaks[-1]
+        else:
+            c, r = len(streaks), 0
+        return {name: _derived(streaks, c, r, k) for name, k in DERIVED}
+
+    def counts(self):
+        """Results so far per symbol."""
+        return {s: self.outcomes.count(i) for i, s in enumerate(SYMBOLS)}
+
+
+# ------------------ Tk renderer ------------------
+ROAD_COLOURS = {"P": "#2bd6a6", "B": "#ff6b6b", RED: "#ff6b6b", BLUE: "#4aa3ff"}
+GRID_COLOUR = "#0b3a30"
+
+
+class RoadView:
+    """Draws one Grid on a canvas area; only the cells passed to update() are touched.
+
+    style: "ring" (Big Road, Big Eye Boy), "dot" (Small Road) or "slash"
+    (Cockroach Road). The area is `cols` columns wide; when the road grows
+    past it, everything shifts left and the columns that fall off are deleted;
+    a new cell left of the view (a streak under a long dragon tail) scrolls it
+    back so that cell is shown.
+    """
+
+    def __init__(self, canvas, grid, x, y, cols, cell, style="ring"):
+        self.canvas = canvas
+        self.grid = grid
+        self.x = x
+        self.y = y
+        self.cols = cols
+        self.cell = cell
+        self.style = style
+        self.tag = f"road{id(self)}"
+        self.first = 0  # road column shown at the left edge
+        self._items = {}  # (col, row) -> image item
+        self._by_col = {}  # col -> [(col, row)]
+        self.draw_grid()
+
+    def draw_grid(self):
+        c, x, y, s = self.canvas, self.x, self.y, self.cell
+        for i in range(self.cols + 1):
+            c.create_line(x + i * s, y, x + i * s, y + self.grid.rows * s, fill=GRID_COLOUR)
+        for j in range(self.grid.rows + 1):
+            c.create_line(x, y + j * s, x + self.cols * s, y + j * s, fill=GRID_COLOUR)
+
+    def _scroll_to(self, col):
+        """Make column col the rightmost in view (drops columns that fall off the left)."""
+        shift = col - (self.first + self.cols) + 1
+        if shift <= 0:
+            return
+        for old in range(self.first, self.first + shift):
+            for key in self._by_col.pop(old, ()):
+                self.canvas.delete(self._items.pop(key))
+        self.first += shift
+        self.canvas.move(self.tag, -shift * self.cell, 0)
+
+    def _scroll_back(self, col):
+        """Make column col the leftmost in view: redraw the view from the grid (rare, see update)."""
+        self.canvas.delete(self.tag)
+        self._items.clear()
+        self._by_col.clear()
+        self.first = col
+        for key in sorted(k for k in self.grid.cells if col <= k[0] < col + self.cols):
+            self._draw(key)
+
+    def _draw(self, key):
+        col, row = key
+        symbol, ties = self.grid.cells[key]
+        image = SPRITES.road(self.canvas, self.style, ROAD_COLOURS[symbol], self.cell, ties)
+        item = self._items.get(key)
+        if item is None:
+            self._by_col.setdefault(col, []).append(key)
+            self._items[key] = self.canvas.create_image(self.x + (col - self.first) * self.cell,
+                                                        self.y + row * self.cell, image=image,
+                                                        anchor="nw", tags=self.tag)
+        else:  # a tie was added to this bead
+            self.canvas.itemconfigure(item, image=image)
+
+    def update(self, cells):
+        """Redraw the given (col, row) cells from the grid, scrolling so each one is in view."""
+        for col, row in cells:
+            if col < self.first:
+                # a new streak starting under a dragon tail that already scrolled the view
+                self._scroll_back(col)
+                continue
+            self._scroll_to(col)
+            self._draw((col, row))
+
+
+class RoadBoard:
+    """Big Road on top, the three derived roads side by side under it, on one canvas."""
+
+    def __init__(self, canvas, roads, width=900, big_cell=20, small_cell=10, x=8, y=8):
+        self.canvas = canvas
+        self.roads = roads
+        big_cols = (width - 2 * x) // big_cell
+        small_cols = ((width - 2 * x) // 3 - 4) // small_cell
+        sub_y = y + roads.rows * big_cell + 8
+        self.views = {BIG_ROAD: RoadView(canvas, roads.big, x, y, big_cols, big_cell, "ring")}
+        for i, (name, style) in enumerate(((BIG_EYE, "ring"), (SMALL, "dot"), (COCKROACH, "slash"))):
+            sx = x + i * (small_cols * small_cell + 6)
+            self.views[name] = RoadView(canvas, roads.derived[name], sx, sub_y, small_cols, small_cell, style)
+        self.height = sub_y + roads.rows * small_cell + y
+
+    def add(self, result):
+        """Add one result to the roads and draw just the changed cells."""
+        changes = self.roads.add(result)
+        for name, col, row in changes:
+            self.views[name].update(((col, row),))
+        return changes
+
+    def reset(self, outcomes=()):
+        """New shoe (or a restored one): rebuild the roads from outcomes and draw them once."""
+        self.roads = Roads.from_outcomes(outcomes, self.roads.rows)
+        self.redraw()
+
+    def ask_text(self):
+        """One-line ask-road preview, e.g. "Ask P: red blue red   Ask B: blue red blue"."""
+        names = {RED: "red", BLUE: "blue", None: "-"}
+        parts = []
+        for side in "PB":
+            preview = self.roads.ask(side)
+            parts.append(f"Ask {side}: " + " ".join(names[preview[name]] for name, _ in DERIVED))
+        return "   ".join(parts)
+
+    def redraw(self):
+        """Draw every road from scratch (after the Roads object was rebuilt or replaced)."""
+        self.canvas.delete("all")
+        views = self.views
+        self.views = {}
+        for name, v in views.items():
+            grid = self.roads.big if name == BIG_ROAD else self.roads.derived[name]
+            self.views[name] = nv = RoadView(self.canvas, grid, v.x, v.y, v.cols, v.cell, v.style)
+            nv.update(sorted(grid.cells))
+
+
+if __name__ == "__main__":
+    import time
+    import random
+
+    rnd = random.Random(18)
+    outcomes = bytes(rnd.choices((PLAYER, BANKER, TIE), (0.4462, 0.4586, 0.0952), k=1_000_000))
+    t0 = time.perf_counter()
+    roads = Roads.from_outcomes(outcomes)
+    dt = time.perf_counter() - t0
+    print(f"{len(outcomes):,} results: {dt / len(outcomes) * 1e6:.2f} us per Roads.add()")
+    for name, grid in (("Big Road", roads.big), *((n, roads.derived[n]) for n, _ in DERIVED)):
+        print(f"  {name:<15} {len(grid.cells):>8,} cells in {grid.width:>7,} columns")
+
+    # a short shoe, drawn as text
+    roads = Roads()
+    for sym in "BBBPPBTPBBBBBBBPPBPPPTB":
+        roads.add(sym)
+    for name, grid in (("big road", roads.big), *((n, roads.derived[n]) for n, _ in DERIVED)):
+        print(name)
+        for row in range(grid.rows):
+            print("   " + "".join((grid.cells[(c, row)][0] if (c, row) in grid.cells else ".") for c in range(grid.width)))
+    print("ask P:", roads.ask("P"), " ask B:", roads.ask("B"))
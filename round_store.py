@@ -0,0 +1,245 @@
+# round_store.py
+"""
+SQLite round store shared by the Andar Bahar and baccarat front-ends.
+- One row per round: game, table id, shoe id, round number, joker (card id
+  and rank), result, manual flag, start/finish timestamps, card count
+- One row per dealt card: card id, side (ANDAR/BAHAR or PLAYER/BANKER) and
+  the time it was reported
+- add_round() only queues the round; a writer thread commits whatever has
+  queued up in one transaction, so the Tk thread never waits on the disk
+- WAL journal, so queries run while the writer is committing
+- Indexed on time, table, joker rank, result and shoe; the query helpers below
+  stay in the millisecond range over millions of rounds
+
+Run this file directly to fill a scratch database and time the queries, e.g.
+    python round_store.py 2000000
+"""
+
+import time
+import queue
+import sqlite3
+import threading
+
+from cards import RANK
+
+DB_NAME = "rounds.db"
+QUEUE_SIZE = 10000
+BATCH_MAX = 500  # rounds per transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rounds (
+    id          INTEGER PRIMARY KEY,
+    game        TEXT NOT NULL,          -- 'AB' or 'BACCARAT'
+    table_id    TEXT NOT NULL,
+    shoe_id     TEXT,
+    round_no    INTEGER,
+    joker       INTEGER,                -- card id (cards.py), AB only
+    joker_rank  INTEGER,                -- 0 = Ace .. 12 = King
+    result      TEXT NOT NULL,          -- ANDAR / BAHAR / PLAYER / BANKER / TIE
+    manual      INTEGER NOT NULL DEFAULT 0,
+    n_cards     INTEGER NOT NULL DEFAULT 0,
+    started     REAL,
+    finished    REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    round_id    INTEGER NOT NULL REFERENCES rounds(id),
+    seq         INTEGER NOT NULL,
+    card_id     INTEGER NOT NULL,
+    side        TEXT NOT NULL,
+    ts          REAL,
+    PRIMARY KEY (round_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rounds_finished ON rounds(finished);
+CREATE INDEX IF NOT EXISTS idx_rounds_table ON rounds(table_id, finished);
+CREATE INDEX IF NOT EXISTS idx_rounds_joker ON rounds(joker_rank, finished, result);
+CREATE INDEX IF NOT EXISTS idx_rounds_result ON rounds(result, finished);
+CREATE INDEX IF NOT EXISTS idx_rounds_shoe ON rounds(shoe_id);
+"""
+
+_STOP = object()
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class RoundStore:
+    """Queue rounds from the UI, commit them in batches, query them from anywhere."""
+
+    def __init__(self, path, queue_size=QUEUE_SIZE):
+        self.path = path
+        self.dropped = 0
+        conn = _connect(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._read = _connect(path)
+        self._read_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="round-store", daemon=True)
+        self._thread.start()
+
+    # ------------------ writing (any thread) ------------------
+    def add_round(self, game, table_id, result, cards=(), joker=None, shoe_id=None,
+                  round_no=None, started=None, finished=None, manual=False):
+        """Queue one finished round. cards is a sequence of (card_id, side, ts). Never blocks."""
+        row = (game, table_id, shoe_id, round_no, joker,
+               None if joker is None else RANK[joker], result, int(manual), len(cards),
+               started, time.time() if finished is None else finished)
+        try:
+            self._queue.put_nowait((row, list(cards)))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1:
+                print(f"Round store queue full, dropping rounds for {self.path}")
+            return False
+
+    def flush(self, timeout=None):
+        """Block until every round queued before this call is committed."""
+        done = threading.Event()
+        self._queue.put(done, timeout=timeout)
+        return done.wait(timeout)
+
+    def close(self, timeout=2.0):
+        """Commit what is queued and stop the writer thread."""
+        if self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+                self._thread.join(timeout)
+            except queue.Full:
+                print("Round store: queue still full at close")
+        with self._read_lock:
+            self._read.close()
+
+    def _run(self):
+        conn = _connect(self.path)
+        stop = False
+        while not stop:
+            batch, waiters = [], []
+            item = self._queue.get()
+            while True:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= BATCH_MAX:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    with conn:  # one transaction per batch
+                        for row, cards in batch:
+                            cur = conn.execute(
+                                "INSERT INTO rounds (game, table_id, shoe_id, round_no, joker, joker_rank,"
+                                " result, manual, n_cards, started, finished)"
+                                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+                            if cards:
+                                rid = cur.lastrowid
+                                conn.executemany(
+                                    "INSERT INTO cards (round_id, seq, card_id, side, ts) VALUES (?, ?, ?, ?, ?)",
+                                    [(rid, i, c, side, ts) for i, (c, side, ts) in enumerate(cards)])
+                except Exception as e:
+                    print("Round store write error:", e)
+            for w in waiters:
+                w.set()
+        conn.close()
+
+    # ------------------ queries (any thread) ------------------
+    def _query(self, sql, args=()):
+        with self._read_lock:
+            return self._read.execute(sql, args).fetchall()
+
+    @staticmethod
+    def _where(table_id=None, joker_rank=None, result=None, since=None, until=None, game=None):
+        clauses, args = [], []
+        for col, val in (("game", game), ("table_id", table_id), ("joker_rank", joker_rank), ("result", result)):
+            if val is not None:
+                clauses.append(f"{col} = ?")
+                args.append(val)
+        if since is not None:
+            clauses.append("finished >= ?")
+            args.append(since)
+        if until is not None:
+            clauses.append("finished < ?")
+            args.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def result_counts(self, **filters):
+        """{result: rounds} for the filtered rounds (table_id, joker_rank, result, since, until, game)."""
+        where, args = self._where(**filters)
+        return dict(self._query(f"SELECT result, COUNT(*) FROM rounds{where} GROUP BY result", args))
+
+    def joker_summary(self, since=None, until=None, table_id=None):
+        """{joker rank: {result: rounds}} for Andar Bahar rounds, e.g. how joker 7s played out last month."""
+        out = {}
+        for rank in range(13):
+            # one covering-index range per rank beats a GROUP BY over the whole time window
+            counts = self.result_counts(joker_rank=rank, since=since, until=until, table_id=table_id)
+            if counts:
+                out[rank] = counts
+        return out
+
+    def rounds(self, limit=100, **filters):
+        """Most recent rounds (newest first) as tuples of the rounds columns."""
+        where, args = self._where(**filters)
+        return self._query(f"SELECT * FROM rounds{where} ORDER BY finished DESC LIMIT ?", args + [limit])
+
+    def cards(self, round_id):
+        """[(card_id, side, ts)] of one round in dealing order."""
+        return self._query("SELECT card_id, side, ts FROM cards WHERE round_id = ? ORDER BY seq", (round_id,))
+
+    def shoe_cards(self, shoe_id, game=None, table_id=None):
+        """Card ids dealt in every stored round of one shoe, e.g. to rebuild the shoe after a restart."""
+        where, args = self._where(table_id=table_id, game=game)
+        where = (where + " AND" if where else " WHERE") + " shoe_id = ?"
+        rows = self._query(f"SELECT c.card_id FROM rounds JOIN cards c ON c.round_id = rounds.id{where} "
+                           f"ORDER BY rounds.id, c.seq", args + [shoe_id])
+        return [cid for (cid,) in rows]
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import random
+    import tempfile
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    path = os.path.join(tempfile.mkdtemp(), DB_NAME)
+    store = RoundStore(path, queue_size=n + 1)
+    rnd = random.Random(11)
+    now = time.time()
+    t0 = time.perf_counter()
+    for i in range(n):
+        joker = rnd.randrange(52)
+        t = now - (n - i) * 30.0  # one round every 30 s
+        cards = [(rnd.randrange(52), "ANDAR" if k % 2 == 0 else "BAHAR", t) for k in range(rnd.randrange(1, 6))] \
+            if i % 100 == 0 else ()
+        store.add_round("AB", f"AB-{i % 4 + 1}", rnd.choice(("ANDAR", "BAHAR")), cards, joker=joker,
+                        shoe_id=str(i // 50), round_no=i % 50, started=t - 20, finished=t)
+    queued = time.perf_counter() - t0
+    store.flush()
+    total = time.perf_counter() - t0
+    print(f"{n:,} rounds: {queued / n * 1e6:.1f} us per add_round() on the caller, "
+          f"{n / total:,.0f} rounds/s committed")
+
+    month = now - 30 * 86400
+    for label, fn in (
+        ("joker 7s, last month", lambda: store.result_counts(joker_rank=6, since=month)),
+        ("table AB-2, last day", lambda: store.result_counts(table_id="AB-2", since=now - 86400)),
+        ("joker summary, last month", lambda: store.joker_summary(since=month)),
+        ("latest 20 BAHAR rounds", lambda: store.rounds(limit=20, result="BAHAR")),
+    ):
+        t0 = time.perf_counter()
+        res = fn()
+        dt = time.perf_counter() - t0
+        shown = res if isinstance(res, dict) and len(res) < 4 else f"{len(res)} rows"
+        print(f"  {label:<28} {dt * 1000:7.2f} ms  {shown}")
+    store.close()
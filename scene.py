@@ -0,0 +1,238 @@
+# scene.py
+"""
+Retained-mode scene on one Tk canvas for the full-screen Andar Bahar front-ends.
+- Scene(canvas) draws titles, counters, status lines and card slots as
+  native canvas text / image items over the background image, instead of
+  a transparent CTkLabel (frame + canvas + label, redrawn and re-composited
+  over the 1080x1920 background) per value
+- Items are placed like .place(relx=, rely=, anchor=) plus a pixel offset;
+  a resize of the canvas moves them (canvas.coords), nothing is recreated
+- text() and card_slot() return nodes whose configure(text=..., image=...)
+  keeps the old call sites: it sends the canvas only the options that
+  changed (one itemconfigure), and a value that is already shown costs no
+  Tk call at all (counted in .updates / .skipped)
+- Card slots take PIL images (card_atlas with wrap=None) and turn them into
+  PhotoImages on the Tk thread through a small LRU; a slot keeps its
+  current PhotoImage alive even after the LRU has dropped it
+- window() embeds the real widgets that stay widgets (buttons, the bead
+  plate canvas); set_background() keeps the background the lowest item
+- scaling is CustomTkinter's widget scaling: font sizes and offsets are in
+  CTk units, as in CTkFont(size=...)
+
+Run this file directly (needs a display) to time counter updates as
+labels embedded over the background against canvas text items.
+"""
+
+from collections import OrderedDict
+from PIL import ImageTk
+
+PHOTO_CACHE = 32  # card PhotoImages kept for reuse (each slot also holds its own)
+_KEEP = object()  # CardSlot.configure(): leave the image as it is
+
+
+class Text:
+    """A canvas text item; configure() only touches Tk for options that changed."""
+
+    def __init__(self, scene, item, **state):
+        self.scene = scene
+        self.item = item
+        self._state = state
+
+    def configure(self, cnf=None, **kw):
+        if cnf:
+            kw = {**cnf, **kw}
+        if "text_color" in kw:  # CTkLabel name for the colour
+            kw["fill"] = kw.pop("text_color")
+        changed = {k: v for k, v in kw.items() if self._state.get(k) != v}
+        if not changed:
+            self.scene.skipped += 1
+            return
+        self._state.update(changed)
+        self.scene.canvas.itemconfigure(self.item, **changed)
+        self.scene.updates += 1
+
+    def cget(self, key):
+        return self._state.get(key)
+
+
+class CardSlot:
+    """A card position: an image item over an optional box, with a text item for the fallback."""
+
+    card_name = None  # the card the slot is meant to show (see the front-ends' set_card_widget)
+
+    def __init__(self, scene, image_item, text_item, box_item=None):
+        self.scene = scene
+        self.image_item = image_item
+        self.text_item = text_item
+        self.box_item = box_item
+        self.items = tuple(i for i in (box_item, image_item, text_item) if i is not None)
+        self.image = None  # the PIL image shown
+        self._photo = None
+        self._text = None
+
+    def configure(self, image=_KEEP, text=None):
+        """Show a PIL image (None clears it) and/or a text; unchanged values cost nothing."""
+        canvas = self.scene.canvas
+        changed = False
+        if image is not _KEEP and image is not self.image:
+            self.image = image
+            self._photo = self.scene.photo(image) if image is not None else None
+            canvas.itemconfigure(self.image_item, image=self._photo or "")
+            changed = True
+        if text is not None and text != self._text:
+            self._text = text
+            canvas.itemconfigure(self.text_item, text=text)
+            changed = True
+        if changed:
+            self.scene.updates += 1
+        else:
+            self.scene.skipped += 1
+
+
+class Scene:
+    """Text, card slots and embedded widgets on one canvas, laid out relative to its size."""
+
+    def __init__(self, canvas, scaling=1.0, family="Arial", photo_cache=PHOTO_CACHE):
+        self.canvas = canvas
+        self.scaling = scaling
+        self.family = family
+        self.photo_cache = photo_cache
+        self.updates = 0
+        self.skipped = 0
+        self._places = {}  # item -> (relx, rely, dx, dy)
+        self._boxes = {}  # rounded panel item -> (relx, rely, (w, h), radius)
+        self._photos = OrderedDict()  # id(PIL image) -> (image, PhotoImage)
+        self._background = None
+        self._bg_photo = None
+        self.width = int(canvas.cget("width"))
+        self.height = int(canvas.cget("height"))
+        canvas.bind("<Configure>", self._on_resize, add="+")
+
+    # ------------------ layout ------------------
+    def font(self, size, weight="normal"):
+        """The tkinter font for CTkFont(size=size, weight=weight) at this scaling."""
+        return (self.family, -round(size * self.scaling), weight)
+
+    def _xy(self, relx, rely, dx, dy):
+        return self.width * relx + dx * self.scaling, self.height * rely + dy * self.scaling
+
+    def _place(self, item, relx, rely, dx=0, dy=0):
+        self._places[item] = (relx, rely, dx, dy)
+        return item
+
+    def _on_resize(self, event):
+        if (event.width, event.height) == (self.width, self.height):
+            return
+        self.width, self.height = event.width, event.height
+        for item, (relx, rely, dx, dy) in self._places.items():
+            self.canvas.coords(item, *self._xy(relx, rely, dx, dy))
+        for item, (relx, rely, box, radius) in self._boxes.items():
+            self.canvas.coords(item, *self._rounded(relx, rely, box, radius))
+
+    # ------------------ items ------------------
+    def text(self, relx, rely, text="", size=14, weight="normal", fill="#ffffff", anchor="center", dx=0, dy=0):
+        font = self.font(size, weight)
+        item = self.canvas.create_text(*self._xy(relx, rely, dx, dy), text=text, font=font, fill=fill,
+                                       anchor=anchor)
+        self._place(item, relx, rely, dx, dy)
+        return Text(self, item, text=text, font=font, fill=fill)
+
+    def card_slot(self, relx, rely, text="", size=14, fill="#ffffff", box=None, box_fill=None, radius=10):
+        """A card position at (relx, rely); box=(w, h) with box_fill draws a rounded panel under it."""
+        box_item = None
+        if box and box_fill:
+            box_item = self.canvas.create_polygon(*self._rounded(relx, rely, box, radius), smooth=True,
+                                                  fill=box_fill, outline="")
+        image_item = self._place(self.canvas.create_image(*self._xy(relx, rely, 0, 0), anchor="center"),
+                                 relx, rely)
+        text_item = self._place(self.canvas.create_text(*self._xy(relx, rely, 0, 0), text=text, fill=fill,
+                                                        font=self.font(size)), relx, rely)
+        slot = CardSlot(self, image_item, text_item, box_item)
+        slot._text = text
+        if box_item is not None:
+            self._boxes[box_item] = (relx, rely, box, radius)
+        return slot
+
+    def _rounded(self, relx, rely, box, radius):
+        """Control points of a rounded rectangle (for create_polygon(smooth=True))."""
+        cx, cy = self._xy(relx, rely, 0, 0)
+        w, h = box[0] * self.scaling / 2, box[1] * self.scaling / 2
+        r = radius * self.scaling
+        x0, y0, x1, y1 = cx - w, cy - h, cx + w, cy + h
+        return (x0 + r, y0, x1 - r, y0, x1, y0, x1, y0 + r, x1, y1 - r, x1, y1,
+                x1 - r, y1, x0 + r, y1, x0, y1, x0, y1 - r, x0, y0 + r, x0, y0)
+
+    def window(self, relx, rely, widget, dx=0, dy=0, anchor="center", **kw):
+        """Embed a real widget (button, bead plate canvas) at (relx, rely)."""
+        item = self.canvas.create_window(*self._xy(relx, rely, dx, dy), window=widget, anchor=anchor, **kw)
+        return self._place(item, relx, rely, dx, dy)
+
+    def set_background(self, img):
+        """Show a PIL image centred under every other item (None keeps the plain canvas)."""
+        if img is None:
+            return
+        self._bg_photo = ImageTk.PhotoImage(img, master=self.canvas)
+        if self._background is None:
+            self._background = self._place(self.canvas.create_image(*self._xy(0.5, 0.5, 0, 0), anchor="center"),
+                                           0.5, 0.5)
+        self.canvas.itemconfigure(self._background, image=self._bg_photo)
+        self.canvas.tag_lower(self._background)
+
+    # ------------------ images ------------------
+    def photo(self, img):
+        """The PhotoImage for a PIL image, made once per image while it stays in the LRU."""
+        key = id(img)
+        entry = self._photos.get(key)
+        if entry is not None and entry[0] is img:
+            self._photos.move_to_end(key)
+            return entry[1]
+        photo = ImageTk.PhotoImage(img, master=self.canvas)
+        self._photos[key] = (img, photo)  # holding img keeps its id from being reused
+        while len(self._photos) > self.photo_cache:
+            self._photos.popitem(last=False)
+        return photo
+
+
+if __name__ == "__main__":
+    import time
+    import tkinter as tk
+    from PIL import Image
+
+    root = tk.Tk()
+    root.geometry("1080x1920")
+    bg = Image.effect_noise((1080, 1920), 40).convert("RGB")
+    n = 300
+
+    holder = tk.Canvas(root, width=1080, height=1920, highlightthickness=0)
+    holder.pack(fill="both", expand=True)
+    bg_photo = ImageTk.PhotoImage(bg, master=holder)
+    holder.create_image(540, 960, image=bg_photo)
+    labels = [tk.Label(holder, text="0", font=("Arial", -80, "bold"), fg="#8ef0c6", bg="#000000")
+              for _ in range(12)]
+    for i, lbl in enumerate(labels):
+        holder.create_window(270 + 540 * (i % 2), 120 + 150 * (i // 2), window=lbl)
+    root.update()
+    t0 = time.perf_counter()
+    for i in range(n):
+        for lbl in labels:
+            lbl.configure(text=str(i))
+        root.update()
+    t_widgets = (time.perf_counter() - t0) / n
+    holder.destroy()
+
+    canvas = tk.Canvas(root, width=1080, height=1920, highlightthickness=0)
+    canvas.pack(fill="both", expand=True)
+    scene = Scene(canvas)
+    scene.set_background(bg)
+    texts = [scene.text(0.25 + 0.5 * (i % 2), 0.06 + 0.08 * (i // 2), "0", size=80, weight="bold",
+                        fill="#8ef0c6") for i in range(12)]
+    root.update()
+    t0 = time.perf_counter()
+    for i in range(n):
+        for node in texts:
+            node.configure(text=str(i // 2))  # every other pass repeats the shown value
+        root.update()
+    t_scene = (time.perf_counter() - t0) / n
+    print(f"12 counters per frame: labels {t_widgets * 1000:.2f} ms, canvas items {t_scene * 1000:.2f} ms "
+          f"({scene.updates} itemconfigure, {scene.skipped} skipped)")
+    root.destroy()
@@ -0,0 +1,191 @@
+# serial_ingest.py
+"""
+Event-driven serial ingest shared by every front-end.
+- Blocks inside the driver until bytes arrive (no sleep polling, no idle CPU spin)
+- Drains everything the driver has buffered in one read call
+- Configurable read timeout so the reader thread still notices stop_event
+- Fixed-capacity RingBuffer filled with readinto(); chunks are handed out as
+  memoryviews so nothing is decoded or copied before the tokenizer sees it
+- LatencyMeter: bytes-to-token latency figures (mean / p50 / p99 in ms)
+
+Run this file directly to compare the old 10 ms polling loop against the
+blocking ingest over pyserial's loop:// port.
+"""
+
+import time
+import threading
+import serial
+
+# ------------------ Configuration ------------------
+SERIAL_PORT = "COM3"
+BAUDRATE = 9600
+READ_TIMEOUT = 0.25  # seconds a read may block waiting for the first byte
+RING_CAPACITY = 4096  # receive buffer; a full shoe backlog is well under this
+
+
+def open_serial(port=SERIAL_PORT, baudrate=BAUDRATE, read_timeout=READ_TIMEOUT):
+    """Open the shoe port in blocking mode; returns None if it is not available."""
+    try:
+        ser = serial.Serial(port, baudrate, timeout=read_timeout)
+        print(f"✅ Connected to serial port {port}")
+    except Exception as e:
+        print("⚠️ Serial not connected:", e)
+        ser = None
+    return ser
+
+
+class RingBuffer:
+    """Fixed-capacity receive buffer the serial driver reads straight into.
+
+    fill() returns a memoryview over the bytes just read (always contiguous);
+    it stays valid until consume() releases those bytes.
+    """
+
+    def __init__(self, capacity=RING_CAPACITY):
+        self.capacity = capacity
+        self.buf = bytearray(capacity)
+        self.view = memoryview(self.buf)
+        self.head = 0  # first unconsumed byte
+        self.tail = 0  # next byte to write
+        self.used = 0
+
+    def _writable(self):
+        """Largest contiguous free region starting at tail."""
+        if self.used == self.capacity:
+            return self.view[0:0]
+        if self.tail >= self.head:
+            if self.tail == self.capacity:
+                self.tail = 0
+                return self._writable()
+            return self.view[self.tail:self.capacity]
+        return self.view[self.tail:self.head]
+
+    def fill(self, ser):
+        """Wait (up to the port timeout) for the first byte, then drain the driver buffer.
+
+        Returns an empty view on timeout. Never sleeps while data is pending;
+        whatever does not fit contiguously is picked up by the next call.
+        """
+        region = self._writable()
+        if not region:
+            raise BufferError("serial ring buffer full; consume() was not called")
+        n = ser.readinto(region[:1])
+        if not n:
+            return region[:0]
+        waiting = ser.in_waiting
+        if waiting and len(region) > 1:
+            n += ser.readinto(region[1:1 + waiting])
+        self.tail += n
+        self.used += n
+        return region[:n]
+
+    def consume(self, n):
+        self.used -= n
+        self.head = (self.head + n) % self.capacity
+        if not self.used:
+            self.head = self.tail = 0
+
+
+def iter_chunks(ser, stop_event, ring=None):
+    """Yield (view, t_arrival) for every chunk read until stop_event is set.
+
+    view is a memoryview into the ring buffer, valid until the next iteration;
+    feed it to ShoeTokenizer.feed() (or copy it) before asking for more.
+    t_arrival is time.perf_counter() taken as soon as the read returned, so
+    callers can feed it to LatencyMeter.add() once the chunk's tokens are handled.
+    """
+    ring = ring or RingBuffer()
+    while not stop_event.is_set():
+        if not ser:
+            stop_event.wait(1)
+            continue
+        try:
+            view = ring.fill(ser)
+        except Exception as e:
+            print("Serial Read Error:", e)
+            stop_event.wait(0.1)
+            continue
+        if view:
+            yield view, time.perf_counter()
+            ring.consume(len(view))
+
+
+# ------------------ Latency measurement ------------------
+class LatencyMeter:
+    """Collects bytes-to-token latencies (seconds) in a bounded window."""
+
+    def __init__(self, window=1024):
+        self.window = window
+        self.samples = []
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, t_arrival, t_done=None):
+        if t_done is None:
+            t_done = time.perf_counter()
+        with self._lock:
+            self.samples.append(t_done - t_arrival)
+            if len(self.samples) > self.window:
+                del self.samples[: len(self.samples) - self.window]
+            self.count += 1
+
+    def summary(self):
+        with self._lock:
+            data = sorted(self.samples)
+        if not data:
+            return "latency: no tokens yet"
+        mean = sum(data) / len(data)
+        p50 = data[len(data) // 2]
+        p99 = data[min(len(data) - 1, int(len(data) * 0.99))]
+        return (f"bytes→token latency over {len(data)} tokens: "
+                f"mean {mean * 1000:.2f} ms, p50 {p50 * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms")
+
+
+# ------------------ Benchmark ------------------
+def _bench(mode, codes, gap=0.037):
+    """Write codes into loop:// from a feeder thread; measure send-to-token latency."""
+    port = serial.serial_for_url("loop://", timeout=0 if mode == "poll" else READ_TIMEOUT)
+    stop = threading.Event()
+    meter = LatencyMeter(window=len(codes))
+    sent = {}
+
+    def feeder():
+        for code in codes:
+            time.sleep(gap)
+            sent[code] = time.perf_counter()
+            port.write(code.encode() + b"\n")
+
+    threading.Thread(target=feeder, daemon=True).start()
+    buffer = ""
+    seen = 0
+    if mode == "poll":
+        # the loop every front-end used before: poll, read, sleep 10 ms
+        while seen < len(codes):
+            n = port.in_waiting or 1
+            data = port.read(n).decode(errors="ignore")
+            if not data:
+                time.sleep(0.02)
+                continue
+            buffer += data
+            while "\n" in buffer:
+                token, buffer = buffer.split("\n", 1)
+                meter.add(sent[token])
+                seen += 1
+            time.sleep(0.01)
+    else:
+        for data, _ in iter_chunks(port, stop):
+            buffer += bytes(data).decode(errors="ignore")
+            while "\n" in buffer:
+                token, buffer = buffer.split("\n", 1)
+                meter.add(sent[token])
+                seen += 1
+            if seen >= len(codes):
+                stop.set()
+    port.close()
+    return meter
+
+
+if __name__ == "__main__":
+    codes = [f"*0D{i:04X}" for i in range(100)]
+    for mode in ("poll", "blocking"):
+        print(f"{mode:>8}: {_bench(mode, codes).summary()}")
@@ -0,0 +1,112 @@
+# session_restore.py
+"""
+Startup restore of the bead plate and win counters from a history file.
+- The history file is memory-mapped; only its tail is touched, so restore
+  time does not grow with the file (hundreds of MB stay well under 50 ms)
+- A session starts after the last "#SESSION ..." marker line (written by
+  session_marker() at startup or when the dealer starts a new session /
+  shoe). A file with no marker in its last MAX_TAIL bytes has no session
+  to restore: its rounds are older history, not the current counters
+- One regex pass collects the single-symbol result lines (A/B, P/B/T) in
+  order; other lines (free-text logs) are skipped
+- bead_columns_from() rebuilds the bead plate columns from those symbols;
+  session_label() is the last marker's label (the restored session's id)
+
+Run this file directly to time a restore from a ~300 MB scratch history file.
+"""
+
+import os
+import re
+import mmap
+import time
+
+SESSION_MARK = b"#SESSION"
+MAX_TAIL = 1 << 18  # bytes; ~87k compact rounds, far more than one session can hold
+
+_SYMBOL_LINE = re.compile(rb"^([A-Z])\r?$", re.M)
+
+
+def session_marker(label=None):
+    """History line that starts a new session."""
+    return f"{SESSION_MARK.decode()} {label or time.strftime('%Y-%m-%d %H:%M:%S')}"
+
+
+def read_session_tail(path, max_tail=MAX_TAIL):
+    """Bytes of the file after its last session marker (looked for in the last max_tail bytes); b"" without one."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return b""
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return b""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            lo = max(0, size - max_tail)
+            i = mm.rfind(SESSION_MARK, lo)
+            if i < 0:
+                return b""  # no marker: nothing belongs to the current session
+            start = mm.find(b"\n", i) + 1 or size
+            return mm[start:]
+
+
+def session_label(path, max_tail=MAX_TAIL):
+    """Label of the last session marker (looked for in the last max_tail bytes), or None."""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            i = mm.rfind(SESSION_MARK, max(0, size - max_tail))
+            if i < 0:
+                return None
+            end = mm.find(b"\n", i)
+            line = mm[i + len(SESSION_MARK):end if end >= 0 else size]
+    return line.strip().decode("utf-8", "replace") or None
+
+
+def session_symbols(path, symbols, max_tail=MAX_TAIL):
+    """Result symbols of the current session, oldest first, e.g. "ABBA..." (only those in `symbols`)."""
+    found = b"".join(_SYMBOL_LINE.findall(read_session_tail(path, max_tail)))
+    drop = bytes(c for c in range(256) if chr(c) not in symbols)
+    return found.translate(None, drop).decode("ascii")
+
+
+def bead_columns_from(symbols, rows):
+    """Bead plate columns (top to bottom, then the next column) for a symbol sequence."""
+    return [list(symbols[i:i + rows]) for i in range(0, len(symbols), rows)]
+
+
+if __name__ == "__main__":
+    import random
+    import tempfile
+
+    path = os.path.join(tempfile.mkdtemp(), "history.txt")
+    rnd = random.Random(5)
+    block = "".join(rnd.choice("AB") + "\r\n" for _ in range(1 << 16)).encode()
+    with open(path, "wb") as f:
+        for _ in range(300 * (1 << 20) // len(block)):
+            f.write(block)
+        f.write(session_marker().encode() + b"\r\n")
+        f.write(block[:3 * 700])  # a 700-round session in progress
+    size = os.path.getsize(path)
+
+    t0 = time.perf_counter()
+    syms = session_symbols(path, "AB")
+    cols = bead_columns_from(syms, 6)
+    dt = time.perf_counter() - t0
+    print(f"{size / 1e6:.0f} MB file, session marker near the end: "
+          f"{len(syms)} rounds, {len(cols)} columns in {dt * 1000:.2f} ms")
+
+    with open(path, "ab") as f:
+        f.write(block * 4)  # ~0.8 MB of rounds after the marker: no marker in the window
+    t0 = time.perf_counter()
+    syms = session_symbols(path, "AB")
+    cols = bead_columns_from(syms, 6)
+    dt = time.perf_counter() - t0
+    print(f"{os.path.getsize(path) / 1e6:.0f} MB file, marker outside the window: "
+          f"{len(syms)} rounds restored in {dt * 1000:.2f} ms")
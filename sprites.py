@@ -0,0 +1,143 @@
+# sprites.py
+"""
+Pre-rendered bead and road sprites, so each board cell is one canvas image.
+- render_bead() / render_road_cell() draw a whole cell with PIL: background
+  square, antialiased circle (or dot / slash) and letter or tie mark,
+  rendered at SUPERSAMPLE x and downsampled, so edges stay smooth
+- SpriteCache turns them into Tk PhotoImages once per (kind, symbol,
+  pixel size, colours) and keeps them referenced; a cell is then a single
+  create_image / itemconfigure(image=...) instead of rectangle + oval + text
+- Sizes are in pixels: a resize or a DPI-scaling change asks for a new
+  pixel size and only then is anything rendered again; clear() drops them
+- The letter font is Consolas Bold where available (as in the Tk code),
+  else DejaVu Sans Mono Bold, else PIL's built-in font
+
+Needs Pillow (already used for the card images). Run this file directly
+to time sprite rendering and write a preview strip to a temp file.
+"""
+
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFont
+
+SUPERSAMPLE = 4
+FONT_FILES = ("consolab.ttf", "Consolas Bold.ttf", "DejaVuSansMono-Bold.ttf")
+
+
+@lru_cache(maxsize=64)
+def _font(px):
+    for name in FONT_FILES:
+        try:
+            return ImageFont.truetype(name, px)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(px)
+    except TypeError:  # Pillow < 10.1: fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def pt_to_px(points, dpi=96):
+    """Tk font points -> pixels."""
+    return round(points * dpi / 72)
+
+
+def _text(draw, xy, text, px, fill):
+    draw.text(xy, text, fill=fill, font=_font(px), anchor="mm")
+
+
+def render_bead(symbol, cell, fill, text_color, font_px, bg="#02221b", outline="#00160f", ring="#001614"):
+    """One bead plate cell as an RGBA image: background square, bead, letter (symbol None = empty cell)."""
+    s = SUPERSAMPLE
+    size = cell * s
+    img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    d = ImageDraw.Draw(img)
+    d.rectangle((0, 0, size - 1, size - 1), fill=bg, outline=outline, width=s)
+    if symbol is not None:
+        r = (cell // 2 - 4) * s
+        c = size // 2
+        d.ellipse((c - r, c - r, c + r, c + r), fill=fill, outline=ring, width=s)
+        _text(d, (c, c), symbol, font_px * s, text_color)
+    return img.resize((cell, cell), Image.LANCZOS)
+
+
+def render_road_cell(style, colour, cell, ties=0, tie_colour="#cdd9b6"):
+    """One road cell on a transparent background: "ring", "dot" or "slash", plus a tie slash / count."""
+    s = SUPERSAMPLE
+    size = cell * s
+    img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    d = ImageDraw.Draw(img)
+    pad = max(1, cell // 8) * s
+    box = (pad, pad, size - pad, size - pad)
+    if style == "dot":
+        d.ellipse(box, fill=colour)
+    elif style == "slash":
+        d.line((pad, size - pad, size - pad, pad), fill=colour, width=max(1, cell // 6) * s)
+    else:
+        d.ellipse(box, outline=colour, width=max(1, cell // 7) * s)
+    if ties:
+        d.line((pad, size - pad, size - pad, pad), fill=tie_colour, width=max(1, cell // 8) * s)
+        if ties > 1:
+            _text(d, (size // 2, size // 2), str(ties), max(7, cell // 2) * s, tie_colour)
+    return img.resize((cell, cell), Image.LANCZOS)
+
+
+class SpriteCache:
+    """PhotoImages by key, rendered on first use; one instance per Tk app (see SPRITES)."""
+
+    def __init__(self):
+        self._images = {}
+        self.rendered = 0
+
+    def _get(self, key, render, master):
+        img = self._images.get(key)
+        if img is None:
+            from PIL import ImageTk  # needs tkinter; only the Tk side imports it
+            img = self._images[key] = ImageTk.PhotoImage(render(), master=master)
+            self.rendered += 1
+        return img
+
+    def bead(self, master, symbol, cell, fill=None, text_color=None, font_px=16, **colours):
+        """Bead plate cell sprite (symbol None = empty cell)."""
+        key = ("bead", symbol, cell, fill, text_color, font_px, tuple(sorted(colours.items())))
+        return self._get(key, lambda: render_bead(symbol, cell, fill, text_color, font_px, **colours), master)
+
+    def road(self, master, style, colour, cell, ties=0):
+        """Road cell sprite; tie counts above 9 share the "9" sprite."""
+        ties = min(ties, 9)
+        key = ("road", style, colour, cell, ties)
+        return self._get(key, lambda: render_road_cell(style, colour, cell, ties), master)
+
+    def clear(self):
+        self._images.clear()
+
+
+SPRITES = SpriteCache()
+
+
+if __name__ == "__main__":
+    import os
+    import time
+    import tempfile
+
+    t0 = time.perf_counter()
+    n = 0
+    for cell in (34, 36, 48):
+        for sym, fill, txt in (("A", "#2bd6a6", "#002218"), ("B", "#ff6b6b", "#3a0000"), ("T", "#cdd9b6", "#07240f")):
+            render_bead(sym, cell, fill, txt, pt_to_px(20))
+            n += 1
+        for style in ("ring", "dot", "slash"):
+            for ties in (0, 1, 2):
+                render_road_cell(style, "#ff6b6b", cell // 2, ties)
+                n += 1
+    dt = time.perf_counter() - t0
+    print(f"{n} sprites in {dt * 1000:.1f} ms ({dt / n * 1000:.2f} ms each, once per size and theme)")
+
+    strip = Image.new("RGBA", (34 * 4 + 20 * 6, 34), "#011814")
+    for i, (sym, fill, txt) in enumerate((("A", "#2bd6a6", "#002218"), ("B", "#ff6b6b", "#3a0000"),
+                                          ("T", "#cdd9b6", "#07240f"), (None, None, None))):
+        strip.alpha_composite(render_bead(sym, 34, fill, txt, pt_to_px(20)), (i * 34, 0))
+    for i, (style, ties) in enumerate((("ring", 0), ("ring", 1), ("ring", 3), ("dot", 0), ("slash", 0), ("ring", 0))):
+        strip.alpha_composite(render_road_cell(style, "#4aa3ff", 20, ties), (34 * 4 + i * 20, 7))
+    path = os.path.join(tempfile.mkdtemp(), "bead_sprites.png")
+    strip.save(path)
+    print("preview written to", path)